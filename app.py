@@ -6,32 +6,79 @@ Routes are organized in separate blueprint modules in the routes package.
 """
 
 from flask import Flask
-from database import init_database, add_sample_data
+import database
+import metrics
+import slow_query_log
+import migrations
+from database import add_sample_data
+import routes
 from routes import register_blueprints
+from cli import register_commands
+from services import async_service
 
 
-def create_app():
+class LibraryApp(Flask):
+    """Flask app whose async views share one event loop per process."""
+
+    def async_to_sync(self, func):
+        return async_service.async_to_sync(func)
+
+
+def create_app(config=None):
     """
     Application factory function to create and configure Flask app.
     
+    Args:
+        config: Optional settings applied before anything is configured,
+            e.g. {'API_ASYNC': True}
+    
     Returns:
         Flask: Configured Flask application instance
     """
-    app = Flask(__name__)
+    app = LibraryApp(__name__)
     app.secret_key = "super secret key"
+    app.config.update(config or {})
+    app.config.setdefault('DATABASE_POOL_MAX_IDLE', database.DATABASE_POOL_MAX_IDLE)
+    app.config.setdefault('METRICS_ENABLED', metrics.METRICS_ENABLED)
+    app.config.setdefault('WRITE_QUEUE_ENABLED', database.WRITE_QUEUE_ENABLED)
+    app.config.setdefault('READ_REPLICA_ENABLED', database.READ_REPLICA_ENABLED)
+    app.config.setdefault('API_ASYNC', routes.API_ASYNC)
+    app.config.setdefault('AUTO_MIGRATE', migrations.AUTO_MIGRATE)
+    app.config.setdefault('SEED_SAMPLE_DATA', database.SEED_SAMPLE_DATA)
     
-    # Initialize the database
-    init_database()
+    # Pooled connections, released at the end of each request; writes go
+    # through the group-commit writer thread when WRITE_QUEUE_ENABLED is set
+    # and catalog reads to an in-memory copy when READ_REPLICA_ENABLED is set
+    database.init_app(app)
     
-    # Add sample data for testing and demonstration
-    add_sample_data()
+    # Request latency hooks; collection is off unless METRICS_ENABLED is set
+    metrics.init_app(app)
     
-    # Register all route blueprints
+    # Slow statements are logged only when SLOW_QUERY_LOG names a file
+    slow_query_log.init_app(app)
+    
+    # Apply pending schema migrations; when the database is up to date this
+    # is a single version check. With AUTO_MIGRATE off they are only
+    # reported and left to `flask --app app migrate`
+    if app.config['AUTO_MIGRATE']:
+        migrations.migrate()
+    elif migrations.get_schema_version() < migrations.LATEST_VERSION:
+        app.logger.warning('Database schema is behind; run `flask --app app migrate`.')
+    
+    # Sample data for testing and demonstration is opt-in
+    if app.config['SEED_SAMPLE_DATA']:
+        add_sample_data()
+    
+    # Register all route blueprints; /api is served by asyncio views when
+    # API_ASYNC is set
     register_blueprints(app)
     
+    # Register flask CLI commands
+    register_commands(app)
+    
     return app
 
 
 if __name__ == '__main__':
-    app = create_app()
+    app = create_app({'SEED_SAMPLE_DATA': True})
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,6 @@
+"""
+Benchmark suite for the Library Management System.
+
+Measures the main service functions and Flask routes against seeded
+databases of realistic size. Run with ``python -m benchmarks --help``.
+"""
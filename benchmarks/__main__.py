@@ -0,0 +1,67 @@
+"""
+Command line entry point for the benchmark suite.
+
+    python -m benchmarks --sizes 1k,100k,1M --output bench.json
+    python -m benchmarks --baseline bench.json
+    python -m benchmarks --clients 32 --only 'concurrent /api (sync)' --only 'concurrent /api (async)'
+
+Exits with status 1 when a baseline is given and a benchmark regressed.
+"""
+
+import argparse
+import json
+import sys
+
+from benchmarks.suite import (
+    DEFAULT_CLIENTS, DEFAULT_ITERATIONS, DEFAULT_THRESHOLD, HEAVY_ITERATIONS, compare, parse_size,
+    run_suite
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Benchmark service functions and routes.')
+    parser.add_argument('--sizes', default='1k',
+                        help='Comma separated dataset sizes, e.g. 1k,100k,1M (default: 1k)')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS,
+                        help='Calls per benchmark (default: %(default)s)')
+    parser.add_argument('--heavy-iterations', type=int, default=HEAVY_ITERATIONS,
+                        help='Calls per full-table benchmark (default: %(default)s)')
+    parser.add_argument('--clients', type=int, default=DEFAULT_CLIENTS,
+                        help='Also drive the JSON API with this many concurrent clients, '
+                             'with sync and async views (default: off)')
+    parser.add_argument('--only', action='append',
+                        help='Run only the named benchmark (repeatable)')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    parser.add_argument('--baseline', help='Earlier JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed slowdown as a fraction (default: %(default)s)')
+    parser.add_argument('--data-dir', help='Directory for the temporary benchmark databases')
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = run_suite(sizes, args.iterations, args.heavy_iterations, args.only, args.data_dir,
+                       args.clients)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = compare(report, json.load(f), args.threshold)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+    for regression in report.get('regressions', []):
+        print(f"REGRESSION {regression['size']} {regression['benchmark']} {regression['metric']}: "
+              f"{regression['baseline']} -> {regression['current']}", file=sys.stderr)
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Benchmark definitions, measurement and baseline comparison.
+
+Each benchmark runs against its own database file seeded with the requested
+number of books. Results are plain dicts so they can be written as JSON and
+compared with an earlier run.
+"""
+
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+import database
+from database import get_all_books
+from services.library_service import (
+    add_book_to_catalog, borrow_book_by_patron, calculate_late_fee_for_book,
+    get_overdue_late_fees, search_books_in_catalog
+)
+from services.synthetic_data import NOUNS, generate_dataset
+
+DEFAULT_SIZES = (1000,)
+DEFAULT_ITERATIONS = 200
+# Full-table reads are far slower than point lookups at 1M rows
+HEAVY_ITERATIONS = 5
+DEFAULT_THRESHOLD = 0.25
+DATASET_SEED = 2024
+PATRONS_PER_BOOKS = 20
+# Concurrent API clients are only simulated when asked for (--clients)
+DEFAULT_CLIENTS = 0
+
+
+def parse_size(value: str) -> int:
+    """Parse a dataset size such as '1000', '100k' or '1M'."""
+    text = value.strip().lower()
+    multiplier = 1
+    if text.endswith('k'):
+        multiplier, text = 1000, text[:-1]
+    elif text.endswith('m'):
+        multiplier, text = 1000000, text[:-1]
+    size = int(float(text) * multiplier)
+    if size <= 0:
+        raise ValueError(f"Dataset size must be positive: {value}")
+    return size
+
+
+def seed_database(rows: int, seed: int = DATASET_SEED) -> Dict:
+    """
+    Fill the current database with a synthetic catalog of `rows` books and as
+    many loans, generated deterministically from `seed`.
+
+    Returns the identifiers the benchmarks use.
+    """
+    database.init_database()
+    generate_dataset(books=rows, patrons=max(1, rows // PATRONS_PER_BOOKS), loans=rows,
+                     overdue_ratio=0.5, seed=seed)
+    loan = get_overdue_late_fees(limit=1)['loans'][0]
+    return {'rows': rows, 'loan_patron': loan['patron_id'], 'loan_book': loan['book_id']}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples) + 0.5)) - 1))
+    return samples[index]
+
+
+def measure(operation: Callable[[int], object], iterations: int) -> Dict:
+    """
+    Call operation(i) for i in range(iterations) and summarize the latencies.
+
+    Returns:
+        dict: iterations, ops_per_sec and p50/p95/p99 latency in milliseconds
+    """
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        operation(i)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    total = sum(samples)
+    return {
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / total, 2) if total else 0.0,
+        'p50_ms': round(percentile(samples, 0.50) * 1000, 4),
+        'p95_ms': round(percentile(samples, 0.95) * 1000, 4),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 4),
+    }
+
+
+def _summarize(samples: List[float], elapsed: float) -> Dict:
+    samples.sort()
+    return {
+        'iterations': len(samples),
+        'ops_per_sec': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(samples, 0.50) * 1000, 4),
+        'p95_ms': round(percentile(samples, 0.95) * 1000, 4),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 4),
+    }
+
+
+def measure_concurrent(operation: Callable[[int, int], object], clients: int, iterations: int) -> Dict:
+    """
+    Call operation(client, i) from `clients` threads at once, `iterations`
+    calls in total, and summarize the latencies.
+
+    ops_per_sec is the aggregate throughput over the wall-clock time of the run.
+    """
+    per_client = max(1, iterations // clients)
+    samples: List[float] = []
+    lock = threading.Lock()
+    start_line = threading.Barrier(clients + 1)
+
+    def run(client):
+        own = []
+        start_line.wait()
+        for i in range(per_client):
+            start = time.perf_counter()
+            operation(client, i)
+            own.append(time.perf_counter() - start)
+        with lock:
+            samples.extend(own)
+
+    threads = [threading.Thread(target=run, args=(client,)) for client in range(clients)]
+    for thread in threads:
+        thread.start()
+    start_line.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    result = _summarize(samples, time.perf_counter() - started)
+    result['clients'] = clients
+    return result
+
+
+def _api_mix(seed: Dict, clients: List) -> Callable[[int, int], object]:
+    """A read-mostly mix of JSON API calls, one test client per thread."""
+    patron, book = seed['loan_patron'], seed['loan_book']
+    paths = [
+        f'/api/patron/{patron}/status',
+        f'/api/late_fee/{patron}/{book}',
+        '/api/search?q={noun}&type=title&limit=20',
+        '/api/books?limit=50',
+    ]
+
+    def operation(client, i):
+        path = paths[(client + i) % len(paths)].format(noun=NOUNS[i % len(NOUNS)])
+        response = clients[client].get(path)
+        assert response.status_code == 200, path
+
+    return operation
+
+
+def _benchmarks(seed: Dict, client) -> Dict[str, tuple]:
+    """Map benchmark names to (operation, heavy) pairs for a seeded database."""
+    rows = seed['rows']
+    patron, book = seed['loan_patron'], seed['loan_book']
+
+    def lookup_book(i):
+        return (i * 7919) % rows + 1
+
+    return {
+        'add_book_to_catalog': (
+            lambda i: add_book_to_catalog(f"Added Title {i}", "Added Author",
+                                          f"{9780000000000 + i}", 1), False),
+        'borrow_book_by_patron': (
+            lambda i: borrow_book_by_patron(f"{900000 + i:06d}", lookup_book(i)), False),
+        'calculate_late_fee_for_book': (
+            lambda i: calculate_late_fee_for_book(patron, book), False),
+        'search_books_in_catalog': (
+            lambda i: search_books_in_catalog(NOUNS[i % len(NOUNS)], 'title'), False),
+        # The most frequent title word matches a large share of the catalog
+        'search_books_in_catalog (frequent term)': (
+            lambda i: search_books_in_catalog(NOUNS[0], 'title'), False),
+        'get_all_books': (lambda i: get_all_books(), True),
+        'GET /catalog': (lambda i: client.get('/catalog'), False),
+        'GET /search': (lambda i: client.get(f'/search?q={NOUNS[i % len(NOUNS)]}&type=title'), False),
+        'GET /api/books': (lambda i: client.get('/api/books?limit=50'), False),
+        'GET /api/late_fee': (lambda i: client.get(f'/api/late_fee/{patron}/{book}'), False),
+        'GET /api/patron/status': (lambda i: client.get(f'/api/patron/{patron}/status'), False),
+    }
+
+
+def run_size(rows: int, iterations: int = DEFAULT_ITERATIONS,
+             heavy_iterations: int = HEAVY_ITERATIONS,
+             only: Optional[Iterable[str]] = None, data_dir: Optional[str] = None,
+             clients: int = DEFAULT_CLIENTS) -> Dict:
+    """
+    Seed a fresh database with `rows` books and run every benchmark on it.
+
+    With `clients` > 0 the JSON API is also driven by that many concurrent
+    clients, once with the synchronous views and once with the async ones
+    (API_ASYNC), so the two modes can be compared on the same data.
+
+    The database module is pointed at a temporary file for the duration of
+    the run and restored afterwards.
+    """
+    from app import create_app
+
+    previous = database.DATABASE
+    with tempfile.TemporaryDirectory(dir=data_dir) as directory:
+        database.DATABASE = os.path.join(directory, f"bench_{rows}.db")
+        try:
+            seed = seed_database(rows)
+            app = create_app()
+            app.config['TESTING'] = True
+            results = {}
+            with app.test_client() as client:
+                for name, (operation, heavy) in _benchmarks(seed, client).items():
+                    if only and name not in only:
+                        continue
+                    results[name] = measure(operation, heavy_iterations if heavy else iterations)
+            if clients > 0:
+                for mode, api_async in (('sync', False), ('async', True)):
+                    name = f'concurrent /api ({mode})'
+                    if only and name not in only:
+                        continue
+                    mode_app = create_app({'TESTING': True, 'API_ASYNC': api_async})
+                    test_clients = [mode_app.test_client() for _ in range(clients)]
+                    results[name] = measure_concurrent(_api_mix(seed, test_clients), clients,
+                                                       iterations * clients)
+            return results
+        finally:
+            database.get_pool().close_all()
+            database.get_book_cache().close()
+            database.get_read_replica().close()
+            database.get_write_queue().close()  # drains queued writes and joins the writer thread
+            database.DATABASE = previous
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes: Iterable[int] = DEFAULT_SIZES, iterations: int = DEFAULT_ITERATIONS,
+              heavy_iterations: int = HEAVY_ITERATIONS,
+              only: Optional[Iterable[str]] = None, data_dir: Optional[str] = None,
+              clients: int = DEFAULT_CLIENTS) -> Dict:
+    """
+    Run the benchmarks at each dataset size.
+
+    Returns:
+        dict: {'meta': {...}, 'results': {size: {benchmark: stats}}}
+    """
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'sqlite': database.sqlite3.sqlite_version,
+            'created_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'iterations': iterations,
+            'clients': clients,
+        },
+        'results': {
+            str(rows): run_size(rows, iterations, heavy_iterations, only, data_dir, clients)
+            for rows in sizes
+        },
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """
+    Compare two suite results and list the regressions.
+
+    A benchmark regresses when its p95 latency grew, or its throughput fell,
+    by more than `threshold` (a fraction) relative to the baseline. Benchmarks
+    missing from either run are ignored.
+    """
+    regressions = []
+    for size, benchmarks in current.get('results', {}).items():
+        previous = baseline.get('results', {}).get(size, {})
+        for name, stats in benchmarks.items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            if before['p95_ms'] and stats['p95_ms'] > before['p95_ms'] * (1 + threshold):
+                regressions.append({'size': size, 'benchmark': name, 'metric': 'p95_ms',
+                                    'baseline': before['p95_ms'], 'current': stats['p95_ms']})
+            if stats['ops_per_sec'] < before['ops_per_sec'] / (1 + threshold):
+                regressions.append({'size': size, 'benchmark': name, 'metric': 'ops_per_sec',
+                                    'baseline': before['ops_per_sec'],
+                                    'current': stats['ops_per_sec']})
+    return regressions
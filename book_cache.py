@@ -0,0 +1,147 @@
+"""
+Book cache module for Library Management System
+In-process read-through LRU cache for rows of the books table
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+
+class BookCache:
+    """
+    Bounded LRU cache of book rows keyed by id, with an ISBN -> id index.
+
+    Small derived values (such as the catalog version) can be memoized with
+    get_value(); they are dropped whenever any book is invalidated.
+
+    Writers in this process invalidate the rows they change. Commits from
+    other processes (or anything that bypasses the database helpers) are
+    noticed through PRAGMA data_version on a dedicated watch connection,
+    checked at most once per check_interval seconds; any change clears the
+    whole cache, so data is never staler than that interval.
+    """
+
+    def __init__(self, database: str, max_size: int = 1024, check_interval: float = 1.0):
+        self.database = database
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._rows = OrderedDict()
+        self._isbn_to_id = {}
+        self._values = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._watch = None
+        self._data_version = None
+        self._next_check = 0.0
+
+    def _check_data_version(self):
+        """Clear the cache if the database file changed since the last check."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        if self._watch is None:
+            self._watch = sqlite3.connect(self.database, check_same_thread=False)
+        version = self._watch.execute('PRAGMA data_version').fetchone()[0]
+        if self._data_version is not None and version != self._data_version:
+            self._clear_locked()
+        self._data_version = version
+
+    def _clear_locked(self):
+        self._rows.clear()
+        self._isbn_to_id.clear()
+        self._values.clear()
+        self._generation += 1
+
+    def _store_locked(self, book: Dict):
+        self._rows[book['id']] = book
+        self._rows.move_to_end(book['id'])
+        self._isbn_to_id[book['isbn']] = book['id']
+        while len(self._rows) > self.max_size:
+            _, evicted = self._rows.popitem(last=False)
+            self._isbn_to_id.pop(evicted['isbn'], None)
+
+    def _lookup(self, find: Callable[[], Optional[int]], load: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        with self._lock:
+            self._check_data_version()
+            book_id = find()
+            if book_id is not None and book_id in self._rows:
+                self._rows.move_to_end(book_id)
+                self.hits += 1
+                return dict(self._rows[book_id])
+            self.misses += 1
+            generation = self._generation
+
+        book = load()
+
+        with self._lock:
+            # Skip the store if a write invalidated anything while we were reading
+            if book is not None and generation == self._generation:
+                self._store_locked(dict(book))
+        return book
+
+    def get_by_id(self, book_id: int, load: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """Return a copy of the cached row, calling load() on a miss."""
+        return self._lookup(lambda: book_id, load)
+
+    def get_by_isbn(self, isbn: str, load: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """Return a copy of the cached row for an ISBN, calling load() on a miss."""
+        return self._lookup(lambda: self._isbn_to_id.get(isbn), load)
+
+    def get_value(self, name: str, load: Callable[[], object]):
+        """Return a memoized value, calling load() if it was dropped since."""
+        with self._lock:
+            self._check_data_version()
+            if name in self._values:
+                return self._values[name]
+            generation = self._generation
+
+        value = load()
+
+        with self._lock:
+            if generation == self._generation:
+                self._values[name] = value
+        return value
+
+    def invalidate(self, book_id: Optional[int] = None, isbn: Optional[str] = None):
+        """Drop one book, looked up by id and/or ISBN."""
+        with self._lock:
+            if isbn is not None and book_id is None:
+                book_id = self._isbn_to_id.get(isbn)
+            if book_id is not None:
+                book = self._rows.pop(book_id, None)
+                if book is not None:
+                    self._isbn_to_id.pop(book['isbn'], None)
+            if isbn is not None:
+                self._isbn_to_id.pop(isbn, None)
+            self._values.clear()
+            self._generation += 1
+
+    def clear(self):
+        """Drop every cached row."""
+        with self._lock:
+            self._clear_locked()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._rows),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def close(self):
+        """Close the watch connection."""
+        with self._lock:
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = None
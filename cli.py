@@ -0,0 +1,143 @@
+"""
+Command line interface for the Library Management System.
+
+Commands are registered on the Flask app and run with the flask CLI,
+e.g. ``flask --app app import-books feed.csv``.
+"""
+
+import json
+import sqlite3
+import sys
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from database import add_sample_data
+from migrations import LATEST_VERSION, get_schema_version, migrate, migration_status
+from slow_query_log import iter_entries, log_files, summarize
+
+from services.catalog_import import detect_format, import_books, iter_book_rows
+from services.library_service import run_late_fee_accrual
+from services.synthetic_data import generate_dataset
+
+
+@click.command('import-books')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='Feed format (defaults to the file extension).')
+@click.option('--batch-size', default=1000, show_default=True,
+              help='Rows inserted per transaction.')
+def import_books_command(path, fmt, batch_size):
+    """Bulk import books from a CSV or JSON-lines file."""
+    fmt = fmt or detect_format(path)
+    if fmt is None:
+        raise click.UsageError('Cannot detect the format; pass --format csv or --format jsonl.')
+
+    def report(entry):
+        click.echo(f"line {entry['line']}: {entry['isbn'] or '-'}: {entry['reason']}", err=True)
+
+    with open(path, 'rb') as stream:
+        summary = import_books(iter_book_rows(stream, fmt), batch_size=batch_size,
+                               on_reject=report)
+    click.echo(f"Imported {summary['imported']} books, rejected {summary['rejected']}.")
+    if summary['rejected']:
+        sys.exit(1)
+
+
+@click.command('accrue-late-fees')
+def accrue_late_fees_command():
+    """Advance the late-fee ledger for all overdue loans (run daily)."""
+    changed = run_late_fee_accrual()
+    click.echo(f"Accrued late fees for {changed} loans.")
+
+
+@click.command('generate-data')
+@click.option('--books', default=10000, show_default=True, help='Books to add.')
+@click.option('--patrons', default=2000, show_default=True, help='Distinct patron IDs.')
+@click.option('--loans', default=50000, show_default=True, help='Total loans, open ones included.')
+@click.option('--years', default=3, show_default=True, help='Years of returned-loan history.')
+@click.option('--open-loans', type=int, help='Loans still out (default: one per patron).')
+@click.option('--overdue-ratio', default=0.15, show_default=True,
+              help='Fraction of open loans that are overdue.')
+@click.option('--skew', default=1.1, show_default=True,
+              help='Zipf exponent for book and patron popularity.')
+@click.option('--seed', default=42, show_default=True, help='Random seed.')
+@click.option('--now', 'now', type=click.DateTime(), help='Reference time for all dates.')
+def generate_data_command(books, patrons, loans, years, open_loans, overdue_ratio, skew, seed, now):
+    """Fill the database with a reproducible synthetic catalog and loan history."""
+    try:
+        summary = generate_dataset(books=books, patrons=patrons, loans=loans, years=years,
+                                   open_loans=open_loans, overdue_ratio=overdue_ratio,
+                                   popularity_skew=skew, seed=seed, now=now)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    except sqlite3.IntegrityError as e:
+        raise click.ClickException(f"Generated rows clash with existing data ({e}); "
+                                   f"nothing was loaded. Try another --seed.")
+    rows = summary['books'] + summary['loans']
+    click.echo(f"Generated {summary['books']} books and {summary['loans']} loans "
+               f"({summary['open_loans']} open, {summary['overdue_loans']} overdue) "
+               f"in {summary['seconds']}s, {int(rows / max(summary['seconds'], 0.001))} rows/s.")
+
+
+@click.command('slow-queries')
+@click.argument('path', required=False)
+@click.option('--top', default=20, show_default=True, help='Queries to show.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the summary as JSON.')
+@with_appcontext
+def slow_queries_command(path, top, as_json):
+    """Summarize a slow query log (and its rotated files) by query fingerprint."""
+    path = path or current_app.config.get('SLOW_QUERY_LOG')
+    if not path:
+        raise click.UsageError('Pass the log path or configure SLOW_QUERY_LOG.')
+    files = log_files(path)
+    if not files:
+        raise click.UsageError(f'No slow query log found at {path}.')
+
+    summary = summarize(iter_entries(files))[:top]
+    if as_json:
+        click.echo(json.dumps(summary, indent=2))
+        return
+    for query in summary:
+        click.echo(f"{query['fingerprint']}  count={query['count']}  total={query['total_ms']}ms  "
+                   f"p99={query['p99_ms']}ms  max={query['max_ms']}ms")
+        click.echo(f"  {query['sql']}")
+        for caller in query['callers']:
+            click.echo(f"  caller: {caller}")
+        for step in query['plan'] or ():
+            click.echo(f"  plan: {step}")
+
+
+@click.command('migrate')
+@click.option('--to', 'target', type=click.IntRange(min=1, max=LATEST_VERSION),
+              help='Stop at this schema version (default: the latest).')
+@click.option('--status', is_flag=True, help='List migrations and whether they are applied.')
+def migrate_command(target, status):
+    """Apply pending schema migrations, or list them with --status."""
+    if status:
+        for migration in migration_status():
+            applied = migration['applied_at'] or 'pending'
+            click.echo(f"{migration['version']:04d}  {applied:<24}  {migration['description']}")
+        return
+    applied = migrate(target)
+    for migration in applied:
+        click.echo(f"Applied {migration.name}")
+    click.echo(f"Database is at schema version {get_schema_version()} of {LATEST_VERSION}.")
+
+
+@click.command('seed-sample-data')
+def seed_sample_data_command():
+    """Add the demo books and loan if the catalog is empty."""
+    add_sample_data()
+    click.echo("Sample data is in place.")
+
+
+def register_commands(app):
+    """Register all CLI commands with the Flask app."""
+    app.cli.add_command(import_books_command)
+    app.cli.add_command(accrue_late_fees_command)
+    app.cli.add_command(generate_data_command)
+    app.cli.add_command(slow_queries_command)
+    app.cli.add_command(migrate_command)
+    app.cli.add_command(seed_sample_data_command)
@@ -3,57 +3,856 @@ Database module for Library Management System
 Handles all database operations and connections
 """
 
+import calendar
+import os
+import queue
+import re
 import sqlite3
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from flask import g, has_app_context
+
+import metrics
+from book_cache import BookCache
+from read_replica import ReadReplica, ReplicaConnection
+from slow_query_log import slow_log
+from write_queue import GROUP_COMMIT_MAX_BATCH, GROUP_COMMIT_WINDOW, WriteQueue
+
+T = TypeVar('T')
 
 # Database configuration
 DATABASE = 'library.db'
+# Most idle connections kept for reuse; callers never wait for one, extra
+# connections are opened on demand and closed when released
+DATABASE_POOL_MAX_IDLE = 8
+BOOK_CACHE_SIZE = 1024
+BOOK_CACHE_CHECK_INTERVAL = 1.0  # seconds between PRAGMA data_version checks
+# Route writes through one writer thread with group commit (LIBRARY_WRITE_QUEUE=1
+# or WRITE_QUEUE_ENABLED in app.config)
+WRITE_QUEUE_ENABLED = os.environ.get('LIBRARY_WRITE_QUEUE', '').lower() in ('1', 'true', 'yes')
+WRITE_QUEUE_WINDOW = GROUP_COMMIT_WINDOW
+WRITE_QUEUE_MAX_BATCH = GROUP_COMMIT_MAX_BATCH
+# Serve catalog, search and late-fee reads from an in-memory copy of the file
+# (LIBRARY_READ_REPLICA=1 or READ_REPLICA_ENABLED in app.config)
+READ_REPLICA_ENABLED = os.environ.get('LIBRARY_READ_REPLICA', '').lower() in ('1', 'true', 'yes')
+READ_REPLICA_STALENESS = 1.0  # seconds between PRAGMA data_version checks
+# Matches of a search term ranked by bm25: a broad term is ranked among its
+# first matches in rowid order only, so its cost does not grow with the catalog
+SEARCH_RANK_CANDIDATES = 1000
+# Add the demo books and loan to an empty database when the app starts
+# (LIBRARY_SAMPLE_DATA=1 or SEED_SAMPLE_DATA in app.config)
+SEED_SAMPLE_DATA = os.environ.get('LIBRARY_SAMPLE_DATA', '').lower() in ('1', 'true', 'yes')
 
-def get_db_connection():
-    """Get a database connection."""
-    conn = sqlite3.connect(DATABASE)
+# Pragmas applied once when a pooled connection is opened
+CONNECTION_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', 5000),
+    ('cache_size', -16000),      # negative value = size in KiB (~16 MB)
+    ('mmap_size', 134217728),    # 128 MB
+)
+
+
+# borrow_records dates are stored as integer wall-clock seconds: the naive
+# local datetime encoded as if it were UTC, so that integer division by
+# SECONDS_PER_DAY gives the same calendar day Python's datetime.date() does.
+SECONDS_PER_DAY = 86400
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(moment: datetime) -> int:
+    """Convert a naive local datetime to stored wall-clock seconds."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return calendar.timegm(moment.timetuple())
+
+
+def from_epoch(seconds: Optional[int]) -> Optional[datetime]:
+    """Convert stored wall-clock seconds back to a naive local datetime."""
+    if seconds is None:
+        return None
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+def epoch_to_iso(seconds: Optional[int]) -> Optional[str]:
+    """Format stored wall-clock seconds as an ISO 8601 string."""
+    moment = from_epoch(seconds)
+    return moment.isoformat() if moment is not None else None
+
+
+def _iso_dates(row, columns: Tuple[str, ...] = ('borrow_date', 'due_date', 'return_date')) -> Dict:
+    """Convert a row to a dict with its stored epoch date columns as ISO strings."""
+    record = dict(row)
+    for column in columns:
+        if column in record:
+            record[column] = epoch_to_iso(record[column])
+    return record
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that goes back to its pool when closed.
+
+    Helpers keep calling conn.close() as before; the underlying handle stays
+    open and is reused. A connection pinned to a Flask app context ignores
+    close() until the context is torn down.
+
+    While metrics or the slow query log are enabled every execute() and
+    executemany() is timed.
+    """
+
+    pool = None
+    pinned = False
+    instrumented = False
+
+    def execute(self, sql, parameters=()):
+        if not (metrics.registry.enabled or slow_log.enabled):
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._observe(sql, parameters, time.perf_counter() - start, False)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not (metrics.registry.enabled or slow_log.enabled):
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._observe(sql, (), time.perf_counter() - start, True)
+
+    def _observe(self, sql, parameters, seconds, many):
+        if metrics.registry.enabled:
+            metrics.observe_sql(sql, seconds)
+        if slow_log.enabled:
+            slow_log.maybe_record(self, sql, parameters, seconds, many)
+
+    def close(self):
+        if self.pinned:
+            return
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    def discard(self):
+        """Close the underlying sqlite3 handle for real."""
+        super().close()
+
+
+def open_connection(database: str, uri: bool = False) -> PooledConnection:
+    """Open a connection with the row factory and CONNECTION_PRAGMAS applied."""
+    conn = sqlite3.connect(database, factory=PooledConnection, check_same_thread=False, uri=uri)
     conn.row_factory = sqlite3.Row  # This enables column access by name
+    for name, value in CONNECTION_PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
     return conn
 
-def init_database():
-    """Initialize the database with required tables."""
+
+class ConnectionPool:
+    """
+    Thread-safe LIFO pool of sqlite3 connections to a single database file.
+
+    acquire() never blocks: it opens a new connection when none is idle.
+    `max_idle` bounds only the connections kept open for reuse; any released
+    beyond it are closed.
+    """
+
+    def __init__(self, database: str, max_idle: int = DATABASE_POOL_MAX_IDLE):
+        self.database = database
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+
+    def _open(self) -> PooledConnection:
+        conn = open_connection(self.database)
+        conn.pool = self
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        if conn.instrumented != metrics.registry.enabled:
+            metrics.instrument_connection(conn, metrics.registry.enabled)
+        return conn
+
+    def release(self, conn: PooledConnection):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.discard()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().discard()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the connection pool for the current DATABASE path."""
+    global _pool
+    pool = _pool
+    if pool is None or pool.database != DATABASE:
+        with _pool_lock:
+            if _pool is None or _pool.database != DATABASE:
+                if _pool is not None:
+                    _pool.close_all()
+                _pool = ConnectionPool(DATABASE, DATABASE_POOL_MAX_IDLE)
+            pool = _pool
+    return pool
+
+
+_book_cache = None
+_book_cache_lock = threading.Lock()
+
+
+def get_book_cache() -> BookCache:
+    """Return the book row cache for the current DATABASE path."""
+    global _book_cache
+    cache = _book_cache
+    if cache is None or cache.database != DATABASE:
+        with _book_cache_lock:
+            if _book_cache is None or _book_cache.database != DATABASE:
+                if _book_cache is not None:
+                    _book_cache.close()
+                _book_cache = BookCache(DATABASE, BOOK_CACHE_SIZE, BOOK_CACHE_CHECK_INTERVAL)
+            cache = _book_cache
+    return cache
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> WriteQueue:
+    """Return the write queue for the current DATABASE path."""
+    global _write_queue
+    writer = _write_queue
+    if writer is None or writer.database != DATABASE:
+        with _write_queue_lock:
+            if _write_queue is None or _write_queue.database != DATABASE:
+                if _write_queue is not None:
+                    _write_queue.close()
+                _write_queue = WriteQueue(DATABASE, open_connection,
+                                          WRITE_QUEUE_WINDOW, WRITE_QUEUE_MAX_BATCH)
+            writer = _write_queue
+    return writer
+
+
+_read_replica = None
+_read_replica_lock = threading.Lock()
+
+
+def get_read_replica() -> ReadReplica:
+    """Return the in-memory read replica for the current DATABASE path."""
+    global _read_replica
+    replica = _read_replica
+    if replica is None or replica.database != DATABASE:
+        with _read_replica_lock:
+            if _read_replica is None or _read_replica.database != DATABASE:
+                if _read_replica is not None:
+                    _read_replica.close()
+                _read_replica = ReadReplica(DATABASE, lambda name: open_connection(name, uri=True),
+                                            READ_REPLICA_STALENESS)
+            replica = _read_replica
+    return replica
+
+
+_primary_reads = ContextVar('primary_reads', default=False)
+
+
+@contextmanager
+def read_from_primary():
+    """Send the read helpers called inside the block to the database file, not the replica."""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+def get_read_connection():
+    """
+    Get a connection for read-only helpers: the in-memory replica when
+    READ_REPLICA_ENABLED is set (outside read_from_primary()), otherwise the
+    same as get_db_connection().
+    """
+    if READ_REPLICA_ENABLED and not _primary_reads.get():
+        return get_read_replica().connection()
+    return get_db_connection()
+
+
+def get_db_connection():
+    """
+    Get a database connection.
+
+    Inside a Flask app context the same pooled connection is returned for the
+    whole request and released on teardown; elsewhere a connection is taken
+    from the pool and returned to it by conn.close().
+    """
+    if has_app_context():
+        conn = g.get('_database')
+        if conn is None:
+            conn = get_pool().acquire()
+            conn.pinned = True
+            g._database = conn
+        return conn
+    return get_pool().acquire()
+
+
+def close_db_connection(exception=None):
+    """Release the app-context connection back to the pool."""
+    conn = g.pop('_database', None)
+    if conn is not None:
+        conn.pinned = False
+        conn.close()
+
+
+def init_app(app):
+    """
+    Configure the pool, book cache, write queue and read replica from
+    app.config and register the teardown hook.
+    """
+    global DATABASE_POOL_MAX_IDLE, BOOK_CACHE_SIZE, BOOK_CACHE_CHECK_INTERVAL, _pool, _book_cache
+    global WRITE_QUEUE_ENABLED, WRITE_QUEUE_WINDOW, WRITE_QUEUE_MAX_BATCH, _write_queue
+    global READ_REPLICA_ENABLED, READ_REPLICA_STALENESS, _read_replica
+    DATABASE_POOL_MAX_IDLE = app.config.get('DATABASE_POOL_MAX_IDLE', DATABASE_POOL_MAX_IDLE)
+    BOOK_CACHE_SIZE = app.config.get('BOOK_CACHE_SIZE', BOOK_CACHE_SIZE)
+    BOOK_CACHE_CHECK_INTERVAL = app.config.get('BOOK_CACHE_CHECK_INTERVAL', BOOK_CACHE_CHECK_INTERVAL)
+    WRITE_QUEUE_ENABLED = bool(app.config.get('WRITE_QUEUE_ENABLED', WRITE_QUEUE_ENABLED))
+    WRITE_QUEUE_WINDOW = app.config.get('WRITE_QUEUE_WINDOW', WRITE_QUEUE_WINDOW)
+    WRITE_QUEUE_MAX_BATCH = app.config.get('WRITE_QUEUE_MAX_BATCH', WRITE_QUEUE_MAX_BATCH)
+    READ_REPLICA_ENABLED = bool(app.config.get('READ_REPLICA_ENABLED', READ_REPLICA_ENABLED))
+    READ_REPLICA_STALENESS = app.config.get('READ_REPLICA_STALENESS', READ_REPLICA_STALENESS)
+    with _pool_lock:
+        if _pool is not None and _pool.max_idle != DATABASE_POOL_MAX_IDLE:
+            _pool.close_all()
+            _pool = None
+    with _book_cache_lock:
+        if _book_cache is not None and (_book_cache.max_size != BOOK_CACHE_SIZE or
+                                        _book_cache.check_interval != BOOK_CACHE_CHECK_INTERVAL):
+            _book_cache.close()
+            _book_cache = None
+    with _write_queue_lock:
+        if _write_queue is not None and (_write_queue.window != WRITE_QUEUE_WINDOW or
+                                         _write_queue.max_batch != WRITE_QUEUE_MAX_BATCH):
+            _write_queue.close()
+            _write_queue = None
+    with _read_replica_lock:
+        if _read_replica is not None and _read_replica.staleness != READ_REPLICA_STALENESS:
+            _read_replica.close()
+            _read_replica = None
+    app.teardown_appcontext(close_db_connection)
+
+@contextmanager
+def write_transaction():
+    """
+    Run a block of statements as one write transaction.
+
+    Takes the write lock up front with BEGIN IMMEDIATE, commits once when the
+    block finishes and rolls back if it raises. If the connection already has
+    a transaction open (a nested block on the request's pinned connection),
+    the block runs in a savepoint instead and its owner commits.
+    """
     conn = get_db_connection()
-    
-    # Create books table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS books (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            author TEXT NOT NULL,
-            isbn TEXT UNIQUE NOT NULL,
-            total_copies INTEGER NOT NULL,
-            available_copies INTEGER NOT NULL
-        )
-    ''')
-    
-    # Create borrow_records table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS borrow_records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            patron_id TEXT NOT NULL,
-            book_id INTEGER NOT NULL,
-            borrow_date TEXT NOT NULL,
-            due_date TEXT NOT NULL,
-            return_date TEXT,
-            FOREIGN KEY (book_id) REFERENCES books (id)
+    try:
+        if conn.in_transaction:
+            conn.execute('SAVEPOINT write_transaction')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK TO write_transaction')
+                raise
+            finally:
+                conn.execute('RELEASE write_transaction')
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    finally:
+        conn.close()
+
+def run_write(operation: Callable[[sqlite3.Connection], T]) -> T:
+    """
+    Run operation(conn) as a write and return its result once committed.
+
+    With the write queue enabled the operation runs on the writer thread,
+    sharing one commit with the writes queued alongside it; otherwise it
+    runs in its own write_transaction(). Either way it must not commit.
+    """
+    if WRITE_QUEUE_ENABLED:
+        def instrumented(conn):
+            if conn.instrumented != metrics.registry.enabled:
+                metrics.instrument_connection(conn, metrics.registry.enabled)
+            return operation(conn)
+        return get_write_queue().run(instrumented)
+    with write_transaction() as conn:
+        return operation(conn)
+
+# The live schema's indexes, dropped and rebuilt by bulk_load(); a new index
+# ships as a migration and is added here too
+INDEXES = (
+    # Open loans by patron: borrow count (covering), borrowed list in
+    # borrow_date order, return lookup. Replaces idx_borrow_open_patron.
+    'DROP INDEX IF EXISTS idx_borrow_open_patron',
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_open_patron_date
+       ON borrow_records (patron_id, borrow_date, book_id, return_date)
+       WHERE return_date IS NULL''',
+    # Open loans by patron in due_date order: current loans, overdue fees
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_open_patron_due
+       ON borrow_records (patron_id, due_date, borrow_date, book_id)
+       WHERE return_date IS NULL''',
+    # Open loans by book
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_open_book
+       ON borrow_records (book_id) WHERE return_date IS NULL''',
+    # Patron borrowing history, newest (highest id) first
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_patron_history
+       ON borrow_records (patron_id)''',
+    # Overdue sweeps
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_open_due
+       ON borrow_records (due_date) WHERE return_date IS NULL''',
+    # Catalog listing and keyset pagination on (title, id)
+    '''CREATE INDEX IF NOT EXISTS idx_books_title_id
+       ON books (title, id)''',
+    # Incremental exports ("updated since")
+    '''CREATE INDEX IF NOT EXISTS idx_books_updated_at
+       ON books (updated_at)''',
+    # Case-insensitive title/author lookups
+    '''CREATE INDEX IF NOT EXISTS idx_books_title_nocase
+       ON books (title COLLATE NOCASE)''',
+    '''CREATE INDEX IF NOT EXISTS idx_books_author_nocase
+       ON books (author COLLATE NOCASE)''',
+    # Ledger fees by patron (and book), without walking the loan history
+    '''CREATE INDEX IF NOT EXISTS idx_late_fee_ledger_patron_book
+       ON late_fee_ledger (patron_id, book_id)''',
+    # Payments already made against a loan
+    '''CREATE INDEX IF NOT EXISTS idx_late_fee_payments_record
+       ON late_fee_payments (record_id)''',
+    # Duplicate payment and refund checks
+    '''CREATE INDEX IF NOT EXISTS idx_late_fee_payments_key
+       ON late_fee_payments (idempotency_key)''',
+    '''CREATE INDEX IF NOT EXISTS idx_late_fee_payments_transaction
+       ON late_fee_payments (transaction_id)''',
+)
+
+# UTC timestamp in the format stored in books.updated_at
+SQL_UTC_NOW = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+# Keep books.updated_at current on every insert and change
+TOUCH_TRIGGERS = (
+    f'''CREATE TRIGGER IF NOT EXISTS books_touch_ai AFTER INSERT ON books BEGIN
+           UPDATE books SET updated_at = {SQL_UTC_NOW} WHERE id = new.id;
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS books_touch_au
+       AFTER UPDATE OF title, author, isbn, total_copies, available_copies ON books BEGIN
+           UPDATE books SET updated_at = {SQL_UTC_NOW} WHERE id = new.id;
+       END''',
+)
+
+# Bump the catalog version on every change to the books table
+VERSION_TRIGGERS = (
+    '''CREATE TRIGGER IF NOT EXISTS books_version_ai AFTER INSERT ON books BEGIN
+           UPDATE catalog_version SET version = version + 1, updated_at = {now} WHERE id = 1;
+       END'''.format(now=SQL_UTC_NOW),
+    '''CREATE TRIGGER IF NOT EXISTS books_version_ad AFTER DELETE ON books BEGIN
+           UPDATE catalog_version SET version = version + 1, updated_at = {now} WHERE id = 1;
+       END'''.format(now=SQL_UTC_NOW),
+    '''CREATE TRIGGER IF NOT EXISTS books_version_au
+       AFTER UPDATE OF title, author, isbn, total_copies, available_copies ON books BEGIN
+           UPDATE catalog_version SET version = version + 1, updated_at = {now} WHERE id = 1;
+       END'''.format(now=SQL_UTC_NOW),
+)
+
+# Keep patron_summary in step with every borrow and return
+PATRON_SUMMARY_TRIGGERS = (
+    '''CREATE TRIGGER IF NOT EXISTS patron_summary_borrow AFTER INSERT ON borrow_records BEGIN
+           INSERT INTO patron_summary (patron_id, open_loans, total_loans, last_activity)
+           VALUES (new.patron_id, new.return_date IS NULL, 1, new.borrow_date)
+           ON CONFLICT (patron_id) DO UPDATE SET
+               open_loans = open_loans + excluded.open_loans,
+               total_loans = total_loans + 1,
+               last_activity = MAX(COALESCE(last_activity, 0), excluded.last_activity);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS patron_summary_return AFTER UPDATE OF return_date ON borrow_records
+       WHEN old.return_date IS NULL AND new.return_date IS NOT NULL BEGIN
+           UPDATE patron_summary SET
+               open_loans = open_loans - 1,
+               last_activity = MAX(COALESCE(last_activity, 0), new.return_date)
+           WHERE patron_id = new.patron_id;
+       END''',
+)
+
+# Full-text index over books(title, author), kept in sync by triggers
+FTS_TRIGGERS = (
+    '''CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+           INSERT INTO books_fts (rowid, title, author)
+           VALUES (new.id, new.title, new.author);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+           INSERT INTO books_fts (books_fts, rowid, title, author)
+           VALUES ('delete', old.id, old.title, old.author);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author ON books BEGIN
+           INSERT INTO books_fts (books_fts, rowid, title, author)
+           VALUES ('delete', old.id, old.title, old.author);
+           INSERT INTO books_fts (rowid, title, author)
+           VALUES (new.id, new.title, new.author);
+       END''',
+)
+
+SQL_PATRON_BORROWED_BOOKS = '''
+    SELECT br.*, b.title, b.author, br.due_date < :now AS is_overdue
+    FROM borrow_records br 
+    JOIN books b ON br.book_id = b.id 
+    WHERE br.patron_id = :patron_id AND br.return_date IS NULL
+    ORDER BY br.borrow_date
+'''
+
+SQL_PATRON_BORROW_COUNT = '''
+    SELECT COUNT(*) as count FROM borrow_records 
+    WHERE patron_id = ? AND return_date IS NULL
+'''
+
+SQL_CLOSE_BORROW_RECORD = '''
+    UPDATE borrow_records 
+    SET return_date = ? 
+    WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+'''
+
+# Close a patron's oldest open loan of a book and return its due date with
+# the days overdue and tiered late fee as of the return
+SQL_RETURN_BORROW_RECORD = '''
+    UPDATE borrow_records SET return_date = :now
+    WHERE id = (
+        SELECT id FROM borrow_records
+        WHERE patron_id = :patron_id AND book_id = :book_id AND return_date IS NULL
+        ORDER BY borrow_date
+        LIMIT 1
+    )
+    RETURNING id AS record_id, patron_id, book_id, due_date,
+              MAX(:today - due_date / 86400, 0) AS days_overdue,
+              MIN(:max_fee,
+                  :first_rate * MIN(MAX(:today - due_date / 86400, 0), :first_days)
+                  + :later_rate * MAX(:today - due_date / 86400 - :first_days, 0)) AS fee_amount
+'''
+
+# A patron's open loans, oldest first, with the days overdue and tiered late
+# fee as of a return; the batch return closes them with executemany
+SQL_PATRON_LOANS_TO_RETURN = '''
+    SELECT record_id, patron_id, book_id, title, due_date, days_overdue,
+           MIN(:max_fee,
+               :first_rate * MIN(days_overdue, :first_days)
+               + :later_rate * MAX(days_overdue - :first_days, 0)) AS fee_amount
+    FROM (
+        SELECT br.id AS record_id, br.patron_id, br.book_id, b.title, br.due_date, br.borrow_date,
+               CASE WHEN br.due_date < :now
+                    THEN :today - br.due_date / 86400
+                    ELSE 0 END AS days_overdue
+        FROM borrow_records br
+        JOIN books b ON b.id = br.book_id
+        WHERE br.patron_id = :patron_id AND br.return_date IS NULL
+    )
+    ORDER BY borrow_date
+'''
+
+# Freeze a returned loan's late fee in the ledger
+SQL_RECORD_FINAL_FEE = '''
+    INSERT INTO late_fee_ledger (record_id, patron_id, book_id, days_overdue, fee_amount, accrued_on)
+    VALUES (:record_id, :patron_id, :book_id, :days_overdue, :fee_amount, :accrued_on)
+    ON CONFLICT (record_id) DO UPDATE SET
+        days_overdue = excluded.days_overdue,
+        fee_amount = excluded.fee_amount,
+        accrued_on = excluded.accrued_on
+'''
+
+SQL_BOOKS_PAGE_AFTER = '''
+    SELECT * FROM books
+    WHERE (title, id) > (?, ?)
+    ORDER BY title, id
+    LIMIT ?
+'''
+
+SQL_BOOKS_PAGE_BEFORE = '''
+    SELECT * FROM books
+    WHERE (title, id) < (?, ?)
+    ORDER BY title DESC, id DESC
+    LIMIT ?
+'''
+
+# Open overdue loans with days overdue and tiered fee, paged by (due_date, id)
+SQL_OVERDUE_LOANS_WITH_FEES = '''
+    SELECT record_id, patron_id, book_id, title, due_date, days_overdue,
+           MIN(:max_fee,
+               :first_rate * MIN(days_overdue, :first_days)
+               + :later_rate * MAX(days_overdue - :first_days, 0)) AS fee_amount
+    FROM (
+        SELECT br.id AS record_id, br.patron_id, br.book_id, b.title, br.due_date,
+               :today - br.due_date / 86400 AS days_overdue
+        FROM borrow_records br
+        JOIN books b ON b.id = br.book_id
+        WHERE br.return_date IS NULL AND br.due_date < :now
+          AND (br.due_date, br.id) > (:after_due, :after_id)
+        ORDER BY br.due_date, br.id
+        LIMIT :limit
+    )
+'''
+
+# A patron's open loans with days overdue and tiered fee
+SQL_PATRON_CURRENT_LOANS = '''
+    SELECT book_id, title, author, borrow_date, due_date, days_overdue,
+           MIN(:max_fee,
+               :first_rate * MIN(days_overdue, :first_days)
+               + :later_rate * MAX(days_overdue - :first_days, 0)) AS fee_amount
+    FROM (
+        SELECT br.book_id, b.title, b.author, br.borrow_date, br.due_date,
+               CASE WHEN br.due_date < :now
+                    THEN :today - br.due_date / 86400
+                    ELSE 0 END AS days_overdue
+        FROM borrow_records br
+        JOIN books b ON b.id = br.book_id
+        WHERE br.patron_id = :patron_id AND br.return_date IS NULL
+    )
+    ORDER BY due_date
+'''
+
+# A patron's loan history, newest first, paged by record id
+SQL_PATRON_HISTORY = '''
+    SELECT br.id AS record_id, br.book_id, b.title, b.author,
+           br.borrow_date, br.due_date, br.return_date
+    FROM borrow_records br
+    JOIN books b ON b.id = br.book_id
+    WHERE br.patron_id = ? AND br.id < ?
+    ORDER BY br.id DESC
+    LIMIT ?
+'''
+
+# Advance the ledger for open overdue loans that are new or not yet
+# accrued today, skipping loans whose fee has already reached the cap
+SQL_ACCRUE_LATE_FEES = '''
+    INSERT INTO late_fee_ledger (record_id, patron_id, book_id, days_overdue, fee_amount, accrued_on)
+    SELECT record_id, patron_id, book_id, days_overdue,
+           MIN(:max_fee,
+               :first_rate * MIN(days_overdue, :first_days)
+               + :later_rate * MAX(days_overdue - :first_days, 0)),
+           :accrued_on
+    FROM (
+        SELECT br.id AS record_id, br.patron_id, br.book_id,
+               :today - br.due_date / 86400 AS days_overdue
+        FROM borrow_records br
+        LEFT JOIN late_fee_ledger l ON l.record_id = br.id
+        WHERE br.return_date IS NULL AND br.due_date < :now
+          AND (l.record_id IS NULL OR (l.accrued_on < :accrued_on AND l.fee_amount < :max_fee))
+    ) WHERE true
+    ON CONFLICT (record_id) DO UPDATE SET
+        days_overdue = excluded.days_overdue,
+        fee_amount = excluded.fee_amount,
+        accrued_on = excluded.accrued_on
+'''
+
+# The ledger row for a patron's open loan of a book
+SQL_LEDGER_FEE = '''
+    SELECT l.* FROM borrow_records br
+    JOIN late_fee_ledger l ON l.record_id = br.id
+    WHERE br.patron_id = ? AND br.book_id = ? AND br.return_date IS NULL
+    ORDER BY br.borrow_date
+    LIMIT 1
+'''
+
+# The final ledger row of a patron's latest returned loan of a book; read
+# from the ledger so the cost does not grow with the patron's loan history
+SQL_RETURNED_LEDGER_FEE = '''
+    SELECT l.* FROM late_fee_ledger l
+    JOIN borrow_records br ON br.id = l.record_id
+    WHERE l.patron_id = ? AND l.book_id = ? AND br.return_date IS NOT NULL
+    ORDER BY l.record_id DESC
+    LIMIT 1
+'''
+
+# A patron's overdue open loans with the tiered fee, and returned loans with
+# the final fee frozen in the ledger, with what is still owed after earlier
+# payments. Returned loans come from the ledger, so neither part walks the
+# patron's loan history; rows come in no particular order
+SQL_PATRON_OUTSTANDING_FEES = '''
+    SELECT record_id, book_id, title, days_overdue, fee_amount,
+           ROUND(fee_amount - paid, 2) AS outstanding
+    FROM (
+        SELECT record_id, book_id, title, days_overdue, paid,
+               MIN(:max_fee,
+                   :first_rate * MIN(days_overdue, :first_days)
+                   + :later_rate * MAX(days_overdue - :first_days, 0)) AS fee_amount
+        FROM (
+            SELECT br.id AS record_id, br.book_id, b.title,
+                   :today - br.due_date / 86400 AS days_overdue,
+                   (SELECT COALESCE(SUM(p.amount), 0) FROM late_fee_payments p
+                    WHERE p.record_id = br.id) AS paid
+            FROM borrow_records br
+            JOIN books b ON b.id = br.book_id
+            WHERE br.patron_id = :patron_id AND br.return_date IS NULL AND br.due_date < :now
         )
-    ''')
-    
-    conn.commit()
+        UNION ALL
+        SELECT l.record_id, l.book_id, b.title, l.days_overdue,
+               (SELECT COALESCE(SUM(p.amount), 0) FROM late_fee_payments p
+                WHERE p.record_id = l.record_id),
+               l.fee_amount
+        FROM late_fee_ledger l
+        JOIN borrow_records br ON br.id = l.record_id
+        JOIN books b ON b.id = l.book_id
+        WHERE l.patron_id = :patron_id AND br.return_date IS NOT NULL
+    )
+    WHERE fee_amount - paid >= 0.005
+'''
+
+# A patron's open loan of a book with the late fees already paid against it
+SQL_OPEN_LOAN_PAYMENTS = '''
+    SELECT br.id AS record_id,
+           (SELECT COALESCE(SUM(p.amount), 0) FROM late_fee_payments p
+            WHERE p.record_id = br.id) AS paid
+    FROM borrow_records br
+    WHERE br.patron_id = ? AND br.book_id = ? AND br.return_date IS NULL
+    ORDER BY br.borrow_date
+    LIMIT 1
+'''
+
+# The latest returned loan of a book with a final fee in the ledger (which
+# stays payable after the return) and the late fees paid against it
+SQL_RETURNED_LOAN_PAYMENTS = '''
+    SELECT l.record_id,
+           (SELECT COALESCE(SUM(p.amount), 0) FROM late_fee_payments p
+            WHERE p.record_id = l.record_id) AS paid
+    FROM late_fee_ledger l
+    JOIN borrow_records br ON br.id = l.record_id
+    WHERE l.patron_id = ? AND l.book_id = ? AND br.return_date IS NOT NULL
+    ORDER BY l.record_id DESC
+    LIMIT 1
+'''
+
+SQL_LATE_FEE_PAYMENT = '''
+    SELECT * FROM late_fee_payments
+    WHERE idempotency_key = ? AND record_id = ?
+    ORDER BY id
+    LIMIT 1
+'''
+
+# Queries checked by verify_hot_queries_use_indexes(), with sample parameters
+HOT_QUERIES = {
+    'get_patron_borrowed_books': (SQL_PATRON_BORROWED_BOOKS, {'patron_id': '123456', 'now': 0}),
+    'get_patron_borrow_count': (SQL_PATRON_BORROW_COUNT, ('123456',)),
+    'get_patron_summary': ('SELECT * FROM patron_summary WHERE patron_id = ?', ('123456',)),
+    'get_patron_history': (SQL_PATRON_HISTORY, ('123456', 2 ** 62, 20)),
+    'get_ledger_fee': (SQL_LEDGER_FEE, ('123456', 1)),
+    'get_patron_current_loans': (SQL_PATRON_CURRENT_LOANS, {
+        'patron_id': '123456', 'today': 0, 'now': 0, 'first_days': 7,
+        'first_rate': 0.5, 'later_rate': 1.0, 'max_fee': 15.0}),
+    'get_patron_outstanding_fees': (SQL_PATRON_OUTSTANDING_FEES, {
+        'patron_id': '123456', 'today': 0, 'now': 0, 'first_days': 7,
+        'first_rate': 0.5, 'later_rate': 1.0, 'max_fee': 15.0}),
+    'get_open_loan_payments': (SQL_OPEN_LOAN_PAYMENTS, ('123456', 1)),
+    'get_returned_loan_payments': (SQL_RETURNED_LOAN_PAYMENTS, ('123456', 1)),
+    'get_late_fee_payment': (SQL_LATE_FEE_PAYMENT, ('', 1)),
+    'get_payments_by_transaction': (
+        'SELECT * FROM late_fee_payments WHERE transaction_id = ? ORDER BY id', ('',)),
+    'update_borrow_record_return_date': (SQL_CLOSE_BORROW_RECORD, (0, '123456', 1)),
+    'return_book_transaction': (SQL_RETURN_BORROW_RECORD, {
+        'patron_id': '123456', 'book_id': 1, 'today': 0, 'now': 0, 'first_days': 7,
+        'first_rate': 0.5, 'later_rate': 1.0, 'max_fee': 15.0}),
+    'get_returned_ledger_fee': (SQL_RETURNED_LEDGER_FEE, ('123456', 1)),
+    'return_books_transaction': (SQL_PATRON_LOANS_TO_RETURN, {
+        'patron_id': '123456', 'today': 0, 'now': 0, 'first_days': 7,
+        'first_rate': 0.5, 'later_rate': 1.0, 'max_fee': 15.0}),
+    'get_book_by_id': ('SELECT * FROM books WHERE id = ?', (1,)),
+    'get_books_page': (SQL_BOOKS_PAGE_AFTER, ('', 0, 50)),
+    'get_book_by_isbn': ('SELECT * FROM books WHERE isbn = ?', ('9780743273565',)),
+    'open_loans_by_book': (
+        'SELECT COUNT(*) FROM borrow_records WHERE book_id = ? AND return_date IS NULL', (1,)),
+    'overdue_loans': (
+        'SELECT id FROM borrow_records WHERE return_date IS NULL AND due_date < ?', (0,)),
+    'get_overdue_loans_with_fees': (SQL_OVERDUE_LOANS_WITH_FEES, {
+        'today': 0, 'now': 0, 'after_due': 0, 'after_id': 0, 'first_days': 7,
+        'first_rate': 0.5, 'later_rate': 1.0, 'max_fee': 15.0, 'limit': 100}),
+}
+
+# Indexes a hot query's plan must use: the per-patron queries must stay on
+# the open-loan and ledger indexes rather than walk the loan history
+HOT_QUERY_INDEXES = {
+    'get_patron_borrowed_books': ('idx_borrow_open_patron_date',),
+    'get_patron_borrow_count': ('idx_borrow_open_patron_date',),
+    'get_ledger_fee': ('idx_borrow_open_patron_date',),
+    'get_patron_current_loans': ('idx_borrow_open_patron_due',),
+    'get_patron_outstanding_fees': ('idx_borrow_open_patron_due', 'idx_late_fee_ledger_patron_book'),
+    'get_open_loan_payments': ('idx_borrow_open_patron_date',),
+    'get_returned_loan_payments': ('idx_late_fee_ledger_patron_book',),
+    'get_returned_ledger_fee': ('idx_late_fee_ledger_patron_book',),
+    'return_books_transaction': ('idx_borrow_open_patron_date',),
+}
+
+def init_database():
+    """
+    Bring the database schema up to date by applying any pending migrations
+    (see the migrations package). Costs one query when nothing is pending.
+    """
+    from migrations import migrate
+    migrate()
+
+def explain_hot_queries() -> Dict[str, str]:
+    """
+    Run EXPLAIN QUERY PLAN for each query in HOT_QUERIES.
+
+    Returns:
+        dict: query name -> plan detail lines joined with '; '
+    """
+    conn = get_db_connection()
+    plans = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+        plans[name] = '; '.join(row['detail'] for row in rows)
     conn.close()
+    return plans
+
+def verify_hot_queries_use_indexes() -> List[str]:
+    """
+    Return the names of hot queries whose plan contains a full table scan or
+    a temporary sort, or does not use the index HOT_QUERY_INDEXES lists for it.
+    """
+    unindexed = []
+    for name, plan in explain_hot_queries().items():
+        steps = plan.split('; ')
+        # Scans of an already-filtered subquery result are not table scans
+        if any(step.startswith('SCAN') and 'INDEX' not in step and '(subquery' not in step
+               for step in steps):
+            unindexed.append(name)
+        elif any(step.startswith('USE TEMP B-TREE') for step in steps):
+            unindexed.append(name)
+        elif any(f'INDEX {index} ' not in plan for index in HOT_QUERY_INDEXES.get(name, ())):
+            unindexed.append(name)
+    return unindexed
 
 def add_sample_data():
     """Add sample data to the database if it's empty."""
     conn = get_db_connection()
-    book_count = conn.execute('SELECT COUNT(*) as count FROM books').fetchone()['count']
+    # One index probe instead of counting every row of a large catalog
+    has_books = conn.execute('SELECT EXISTS (SELECT 1 FROM books)').fetchone()[0]
     
-    if book_count == 0:
+    if not has_books:
         # Add sample books
         sample_books = [
             ('The Great Gatsby', 'F. Scott Fitzgerald', '9780743273565', 3),
@@ -72,13 +871,14 @@ def add_sample_data():
             INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
             VALUES (?, ?, ?, ?)
         ''', ('123456', 3, 
-              (datetime.now() - timedelta(days=5)).isoformat(),
-              (datetime.now() + timedelta(days=9)).isoformat()))
+              to_epoch(datetime.now() - timedelta(days=5)),
+              to_epoch(datetime.now() + timedelta(days=9))))
         
         # Update available copies for 1984
         conn.execute('UPDATE books SET available_copies = 0 WHERE id = 3')
         
         conn.commit()
+        get_book_cache().clear()
     
     conn.close()
 
@@ -86,35 +886,155 @@ def add_sample_data():
 
 def get_all_books() -> List[Dict]:
     """Get all books from the database."""
-    conn = get_db_connection()
+    conn = get_read_connection()
     books = conn.execute('SELECT * FROM books ORDER BY title').fetchall()
     conn.close()
     return [dict(book) for book in books]
 
-def get_book_by_id(book_id: int) -> Optional[Dict]:
-    """Get a specific book by ID."""
+def get_books_page(after: Optional[Tuple[str, int]] = None,
+                   before: Optional[Tuple[str, int]] = None,
+                   limit: int = 50) -> List[Dict]:
+    """
+    Get one page of books ordered by (title, id) using keyset pagination.
+
+    Args:
+        after: (title, id) of the last row of the previous page
+        before: (title, id) of the first row of the next page, to page backwards
+        limit: maximum number of rows
+
+    Returns:
+        list: books in (title, id) order; the cost does not depend on the page number
+    """
+    conn = get_read_connection()
+    if before is not None:
+        books = conn.execute(SQL_BOOKS_PAGE_BEFORE, (*before, limit)).fetchall()
+        books.reverse()
+    elif after is not None:
+        books = conn.execute(SQL_BOOKS_PAGE_AFTER, (*after, limit)).fetchall()
+    else:
+        books = conn.execute('SELECT * FROM books ORDER BY title, id LIMIT ?', (limit,)).fetchall()
+    conn.close()
+    return [dict(book) for book in books]
+
+def iter_books(available_only: bool = False, updated_since: Optional[str] = None) -> Iterator[sqlite3.Row]:
+    """
+    Stream books in id order straight from an SQLite cursor.
+
+    Rows are yielded one at a time and never collected into a list. The
+    connection is taken from the pool directly (never pinned to the app
+    context) and returned when the generator is exhausted or closed.
+
+    Args:
+        available_only: only books with available_copies > 0
+        updated_since: UTC ISO timestamp; only books changed at or after it
+    """
+    clauses, params = [], []
+    if available_only:
+        clauses.append('available_copies > 0')
+    if updated_since:
+        clauses.append('updated_at >= ?')
+        params.append(updated_since)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    
+    conn = get_pool().acquire()
+    try:
+        cursor = conn.execute(f'SELECT * FROM books {where} ORDER BY id', params)
+        yield from cursor
+    finally:
+        conn.close()
+
+def _load_book(column: str, value) -> Optional[Dict]:
     conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,)).fetchone()
+    book = conn.execute(f'SELECT * FROM books WHERE {column} = ?', (value,)).fetchone()
     conn.close()
     return dict(book) if book else None
 
+def get_book_by_id(book_id: int) -> Optional[Dict]:
+    """Get a specific book by ID (served from the book cache when possible)."""
+    return get_book_cache().get_by_id(book_id, lambda: _load_book('id', book_id))
+
 def get_book_by_isbn(isbn: str) -> Optional[Dict]:
-    """Get a specific book by ISBN."""
-    conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE isbn = ?', (isbn,)).fetchone()
+    """Get a specific book by ISBN (served from the book cache when possible)."""
+    return get_book_cache().get_by_isbn(isbn, lambda: _load_book('isbn', isbn))
+
+def _load_catalog_version() -> Tuple[int, datetime]:
+    conn = get_read_connection()
+    row = conn.execute('SELECT version, updated_at FROM catalog_version WHERE id = 1').fetchone()
     conn.close()
-    return dict(book) if book else None
+    modified = datetime.strptime(row['updated_at'], '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc)
+    return row['version'], modified
+
+def get_catalog_version() -> Tuple[int, datetime]:
+    """
+    Get the catalog version and the UTC time of the last change to books.
+
+    The version is bumped by triggers on every insert, update and delete of
+    books. It is memoized in the book cache, so repeated calls do not query
+    the database until a write invalidates it.
+
+    With the read replica enabled it is read from the replica on every call
+    instead, so the version always matches the pages the replica serves.
+    """
+    if READ_REPLICA_ENABLED and not _primary_reads.get():
+        return _load_catalog_version()
+    return get_book_cache().get_value('catalog_version', _load_catalog_version)
+
+def get_book_cache_stats() -> Dict:
+    """Get hit/miss counters for the book cache."""
+    return get_book_cache().stats()
+
+def build_fts_query(search_term: str, column: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 prefix query restricted to one column.
+
+    "Great gat" -> 'title : ("great"* "gat"*)'. Returns None if the term has
+    no searchable tokens.
+    """
+    tokens = re.findall(r'\w+', search_term.lower())
+    if not tokens:
+        return None
+    phrases = ' '.join(f'"{token}"*' for token in tokens)
+    return f'{column} : ({phrases})'
+
+def search_books(search_term: str, column: str, limit: int = 50, offset: int = 0) -> List[Dict]:
+    """
+    Full-text search on books.title or books.author, best matches first (bm25).
+
+    bm25 has to score every candidate before the LIMIT applies, so a term
+    matching more than SEARCH_RANK_CANDIDATES books (or offset + limit, if
+    larger) is ranked among that many of its matches, taken in rowid order.
+
+    Args:
+        search_term: free text; every word must prefix-match a word in the column
+        column: 'title' or 'author'
+        limit: maximum number of rows to return
+        offset: number of ranked rows to skip
+    """
+    if column not in ('title', 'author'):
+        raise ValueError(f'Unsupported search column: {column}')
+    fts_query = build_fts_query(search_term, column)
+    if fts_query is None:
+        return []
+    conn = get_read_connection()
+    books = conn.execute('''
+        SELECT b.* FROM (
+            SELECT rowid, bm25(books_fts) AS score FROM books_fts
+            WHERE books_fts MATCH ?
+            ORDER BY rowid
+            LIMIT ?
+        ) candidate
+        JOIN books b ON b.id = candidate.rowid
+        ORDER BY candidate.score, b.title
+        LIMIT ? OFFSET ?
+    ''', (fts_query, max(SEARCH_RANK_CANDIDATES, offset + limit), limit, offset)).fetchall()
+    conn.close()
+    return [dict(book) for book in books]
 
 def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
     """Get currently borrowed books for a patron."""
-    conn = get_db_connection()
-    records = conn.execute('''
-        SELECT br.*, b.title, b.author 
-        FROM borrow_records br 
-        JOIN books b ON br.book_id = b.id 
-        WHERE br.patron_id = ? AND br.return_date IS NULL
-        ORDER BY br.borrow_date
-    ''', (patron_id,)).fetchall()
+    conn = get_read_connection()
+    records = conn.execute(SQL_PATRON_BORROWED_BOOKS, {
+        'patron_id': patron_id, 'now': to_epoch(datetime.now())}).fetchall()
     conn.close()
     
     borrowed_books = []
@@ -123,9 +1043,9 @@ def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
             'book_id': record['book_id'],
             'title': record['title'],
             'author': record['author'],
-            'borrow_date': datetime.fromisoformat(record['borrow_date']),
-            'due_date': datetime.fromisoformat(record['due_date']),
-            'is_overdue': datetime.now() > datetime.fromisoformat(record['due_date'])
+            'borrow_date': from_epoch(record['borrow_date']),
+            'due_date': from_epoch(record['due_date']),
+            'is_overdue': bool(record['is_overdue'])
         })
     
     return borrowed_books
@@ -133,69 +1053,561 @@ def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
 def get_patron_borrow_count(patron_id: str) -> int:
     """Get the number of books currently borrowed by a patron."""
     conn = get_db_connection()
-    count = conn.execute('''
-        SELECT COUNT(*) as count FROM borrow_records 
-        WHERE patron_id = ? AND return_date IS NULL
-    ''', (patron_id,)).fetchone()['count']
+    count = conn.execute(SQL_PATRON_BORROW_COUNT, (patron_id,)).fetchone()['count']
     conn.close()
     return count
 
 def insert_book(title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
     """Insert a new book into the database."""
-    conn = get_db_connection()
     try:
-        conn.execute('''
+        run_write(lambda conn: conn.execute('''
             INSERT INTO books (title, author, isbn, total_copies, available_copies)
             VALUES (?, ?, ?, ?, ?)
-        ''', (title, author, isbn, total_copies, available_copies))
-        conn.commit()
-        conn.close()
+        ''', (title, author, isbn, total_copies, available_copies)).rowcount)
+        get_book_cache().invalidate(isbn=isbn)
         return True
     except Exception as e:
-        conn.close()
         return False
 
+def insert_books_batch(books: List[Tuple[str, str, str, int, int]]) -> List[str]:
+    """
+    Insert many books in one transaction, skipping ISBNs already in the catalog.
+
+    Args:
+        books: (title, author, isbn, total_copies, available_copies) tuples with
+            ISBNs unique within the batch
+
+    Returns:
+        list: ISBNs that were skipped because they already exist
+    """
+    isbns = [book[2] for book in books]
+    with write_transaction() as conn:
+        existing = set()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(isbns), 500):
+            chunk = isbns[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            existing.update(row['isbn'] for row in conn.execute(
+                f'SELECT isbn FROM books WHERE isbn IN ({placeholders})', chunk))
+        conn.executemany('''
+            INSERT INTO books (title, author, isbn, total_copies, available_copies)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (book for book in books if book[2] not in existing))
+    cache = get_book_cache()
+    for isbn in isbns:
+        if isbn not in existing:
+            cache.invalidate(isbn=isbn)
+    return [isbn for isbn in isbns if isbn in existing]
+
+def get_open_loan_counts() -> Dict[str, int]:
+    """Get the number of open loans of every patron that has any."""
+    conn = get_db_connection()
+    rows = conn.execute('SELECT patron_id, open_loans FROM patron_summary WHERE open_loans > 0').fetchall()
+    conn.close()
+    return {row['patron_id']: row['open_loans'] for row in rows}
+
+def get_max_book_id() -> int:
+    """Get the highest book id in use (0 for an empty catalog)."""
+    conn = get_db_connection()
+    row = conn.execute(
+        "SELECT MAX(COALESCE((SELECT MAX(id) FROM books), 0),"
+        " COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'books'), 0))").fetchone()
+    conn.close()
+    return row[0]
+
+def bulk_load(books: List[Tuple], borrow_records: List[Tuple]):
+    """
+    Insert pre-built books and borrow records in one transaction.
+
+    The per-row insert triggers are dropped for the duration of the load and
+    their work (updated_at, catalog version, full-text index, patron summary)
+    is done once with set-based statements before they are recreated, all in
+    the same transaction. When the load is larger than the existing tables the
+    secondary indexes are dropped too and rebuilt afterwards, which is much
+    faster than updating them row by row.
+
+    Args:
+        books: (id, title, author, isbn, total_copies, available_copies) tuples
+        borrow_records: (patron_id, book_id, borrow_date, due_date, return_date)
+            tuples with dates in epoch seconds (see to_epoch)
+    """
+    row_triggers = {
+        'books_touch_ai': TOUCH_TRIGGERS[0],
+        'books_version_ai': VERSION_TRIGGERS[0],
+        'books_fts_ai': FTS_TRIGGERS[0],
+        'patron_summary_borrow': PATRON_SUMMARY_TRIGGERS[0],
+    }
+    with write_transaction() as conn:
+        for name in row_triggers:
+            conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+        first_book = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM books').fetchone()[0]
+        first_record = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM borrow_records').fetchone()[0]
+        rebuild_indexes = len(books) + len(borrow_records) > first_book + first_record
+        if rebuild_indexes:
+            for statement in INDEXES:
+                match = re.match(r'\s*CREATE INDEX IF NOT EXISTS (\w+)', statement)
+                if match:
+                    conn.execute(f'DROP INDEX IF EXISTS {match.group(1)}')
+
+        # One timestamp for the whole load instead of strftime() per row
+        now = conn.execute(f'SELECT {SQL_UTC_NOW}').fetchone()[0]
+        conn.executemany('''
+            INSERT INTO books (id, title, author, isbn, total_copies, available_copies, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (book + (now,) for book in books))
+        conn.executemany('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+            VALUES (?, ?, ?, ?, ?)
+        ''', borrow_records)
+
+        if books:
+            conn.execute('''
+                INSERT INTO books_fts (rowid, title, author)
+                SELECT id, title, author FROM books WHERE id >= ?
+            ''', (first_book,))
+            conn.execute(f'UPDATE catalog_version SET version = version + 1, updated_at = {SQL_UTC_NOW} WHERE id = 1')
+        conn.execute('''
+            INSERT INTO patron_summary (patron_id, open_loans, total_loans, last_activity)
+            SELECT patron_id, SUM(return_date IS NULL), COUNT(*),
+                   MAX(MAX(borrow_date), COALESCE(MAX(return_date), 0))
+            FROM borrow_records WHERE id >= ? GROUP BY patron_id
+            ON CONFLICT (patron_id) DO UPDATE SET
+                open_loans = open_loans + excluded.open_loans,
+                total_loans = total_loans + excluded.total_loans,
+                last_activity = MAX(COALESCE(last_activity, 0), excluded.last_activity)
+        ''', (first_record,))
+
+        if rebuild_indexes:
+            for statement in INDEXES:
+                conn.execute(statement)
+        for statement in row_triggers.values():
+            conn.execute(statement)
+    get_book_cache().clear()
+
 def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
     """Insert a new borrow record into the database."""
-    conn = get_db_connection()
     try:
-        conn.execute('''
+        run_write(lambda conn: conn.execute('''
             INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
             VALUES (?, ?, ?, ?)
-        ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat()))
-        conn.commit()
-        conn.close()
+        ''', (patron_id, book_id, to_epoch(borrow_date), to_epoch(due_date))).rowcount)
         return True
     except Exception as e:
-        conn.close()
         return False
 
 def update_book_availability(book_id: int, change: int) -> bool:
     """Update the available copies of a book by a given amount (+1 for return, -1 for borrow)."""
-    conn = get_db_connection()
     try:
-        conn.execute('''
+        run_write(lambda conn: conn.execute('''
             UPDATE books SET available_copies = available_copies + ? WHERE id = ?
-        ''', (change, book_id))
-        conn.commit()
-        conn.close()
+        ''', (change, book_id)).rowcount)
+        get_book_cache().invalidate(book_id)
         return True
     except Exception as e:
-        conn.close()
         return False
 
 def update_borrow_record_return_date(patron_id: str, book_id: int, return_date: datetime) -> bool:
     """Update the return date for a borrow record."""
-    conn = get_db_connection()
     try:
-        conn.execute('''
-            UPDATE borrow_records 
-            SET return_date = ? 
-            WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
-        ''', (return_date.isoformat(), patron_id, book_id))
-        conn.commit()
-        conn.close()
+        run_write(lambda conn: conn.execute(
+            SQL_CLOSE_BORROW_RECORD, (to_epoch(return_date), patron_id, book_id)).rowcount)
         return True
     except Exception as e:
-        conn.close()
         return False
+
+# Outcomes of borrow_book_transaction()
+BORROW_OK = 'ok'
+BORROW_BOOK_NOT_FOUND = 'book_not_found'
+BORROW_UNAVAILABLE = 'unavailable'
+BORROW_LIMIT_REACHED = 'limit_reached'
+BORROW_DB_ERROR = 'db_error'
+
+def borrow_book_transaction(patron_id: str, book_id: int, borrow_date: datetime,
+                            due_date: datetime, max_borrowed: int) -> Tuple[str, Optional[Dict]]:
+    """
+    Check availability and the patron's limit, decrement availability and
+    insert the borrow record in a single IMMEDIATE transaction.
+
+    The decrement is conditional on available_copies > 0, so two concurrent
+    borrows can never both take the last copy.
+
+    Returns:
+        tuple: (one of the BORROW_* outcomes, book row or None)
+    """
+    def borrow(conn):
+        book = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,)).fetchone()
+        if book is None:
+            return BORROW_BOOK_NOT_FOUND, None
+        book = dict(book)
+        if book['available_copies'] <= 0:
+            return BORROW_UNAVAILABLE, book
+        
+        count = conn.execute(SQL_PATRON_BORROW_COUNT, (patron_id,)).fetchone()['count']
+        if count >= max_borrowed:
+            return BORROW_LIMIT_REACHED, book
+        
+        cursor = conn.execute('''
+            UPDATE books SET available_copies = available_copies - 1
+            WHERE id = ? AND available_copies > 0
+        ''', (book_id,))
+        if cursor.rowcount != 1:
+            return BORROW_UNAVAILABLE, book
+        
+        conn.execute('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+            VALUES (?, ?, ?, ?)
+        ''', (patron_id, book_id, to_epoch(borrow_date), to_epoch(due_date)))
+        book['available_copies'] -= 1
+        return BORROW_OK, book
+
+    try:
+        outcome, book = run_write(borrow)
+    except sqlite3.Error:
+        return BORROW_DB_ERROR, None
+    if outcome == BORROW_OK:
+        get_book_cache().invalidate(book_id)
+    return outcome, book
+
+# Outcomes of return_book_transaction()
+RETURN_OK = 'ok'
+RETURN_NOT_BORROWED = 'not_borrowed'
+RETURN_DB_ERROR = 'db_error'
+
+def return_book_transaction(patron_id: str, book_id: int, return_date: datetime,
+                            first_tier_days: int, first_tier_rate: float, later_rate: float,
+                            max_fee: float) -> Tuple[str, Optional[Dict]]:
+    """
+    Close the patron's open loan of a book, increment availability and
+    compute the late fee in a single IMMEDIATE transaction.
+
+    The loan is closed with UPDATE ... RETURNING, which hands back the due
+    date and the fee as of return_date without a separate read. A fee owed
+    is written to the late-fee ledger as the loan's final amount.
+
+    Returns:
+        tuple: (one of the RETURN_* outcomes, dict with record_id, title,
+        due_date, days_overdue and fee_amount, or None)
+    """
+    now = to_epoch(return_date)
+
+    def close_loan(conn):
+        loan = conn.execute(SQL_RETURN_BORROW_RECORD, {
+            'patron_id': patron_id, 'book_id': book_id,
+            'now': now, 'today': now // SECONDS_PER_DAY,
+            'first_days': first_tier_days, 'first_rate': first_tier_rate,
+            'later_rate': later_rate, 'max_fee': max_fee
+        }).fetchone()
+        if loan is None:
+            return RETURN_NOT_BORROWED, None
+        loan = dict(loan)
+
+        book = conn.execute('''
+            UPDATE books SET available_copies = available_copies + 1
+            WHERE id = ?
+            RETURNING title
+        ''', (book_id,)).fetchone()
+        loan['title'] = book['title']
+
+        if loan['days_overdue'] > 0:
+            conn.execute(SQL_RECORD_FINAL_FEE, dict(loan, accrued_on=return_date.date().isoformat()))
+        return RETURN_OK, loan
+
+    try:
+        outcome, loan = run_write(close_loan)
+    except sqlite3.Error:
+        return RETURN_DB_ERROR, None
+    if outcome == RETURN_OK:
+        get_book_cache().invalidate(book_id)
+        loan['due_date'] = from_epoch(loan['due_date'])
+    return outcome, loan
+
+def borrow_books_transaction(patron_id: str, book_ids: List[int], borrow_date: datetime,
+                             due_date: datetime, max_borrowed: int) -> Tuple[str, List[Tuple[int, str, Optional[Dict]]]]:
+    """
+    Borrow several books for one patron in a single IMMEDIATE transaction.
+
+    The borrowing limit is checked once against the whole batch. Books that
+    are missing or have no copy left are skipped; the rest are decremented
+    and get their borrow records with one executemany each.
+
+    Args:
+        book_ids: distinct book IDs
+
+    Returns:
+        tuple: (BORROW_OK, BORROW_LIMIT_REACHED or BORROW_DB_ERROR for the
+        batch, and (book_id, BORROW_* outcome, book row or None) per book in
+        the given order; empty unless the batch outcome is BORROW_OK)
+    """
+    def borrow_all(conn):
+        count = conn.execute(SQL_PATRON_BORROW_COUNT, (patron_id,)).fetchone()['count']
+        if count + len(book_ids) > max_borrowed:
+            return BORROW_LIMIT_REACHED, []
+
+        placeholders = ', '.join('?' * len(book_ids))
+        books = {row['id']: dict(row) for row in conn.execute(
+            f'SELECT * FROM books WHERE id IN ({placeholders})', book_ids)}
+        results = []
+        for book_id in book_ids:
+            book = books.get(book_id)
+            if book is None:
+                results.append((book_id, BORROW_BOOK_NOT_FOUND, None))
+            elif book['available_copies'] <= 0:
+                results.append((book_id, BORROW_UNAVAILABLE, book))
+            else:
+                book['available_copies'] -= 1
+                results.append((book_id, BORROW_OK, book))
+
+        # Availability was read under the write lock, so every decrement applies
+        borrowed = [book_id for book_id, outcome, _ in results if outcome == BORROW_OK]
+        conn.executemany('''
+            UPDATE books SET available_copies = available_copies - 1
+            WHERE id = ? AND available_copies > 0
+        ''', [(book_id,) for book_id in borrowed])
+        conn.executemany('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+            VALUES (?, ?, ?, ?)
+        ''', [(patron_id, book_id, to_epoch(borrow_date), to_epoch(due_date)) for book_id in borrowed])
+        return BORROW_OK, results
+
+    try:
+        outcome, results = run_write(borrow_all)
+    except sqlite3.Error:
+        return BORROW_DB_ERROR, []
+    cache = get_book_cache()
+    for book_id, item_outcome, _ in results:
+        if item_outcome == BORROW_OK:
+            cache.invalidate(book_id)
+    return outcome, results
+
+def return_books_transaction(patron_id: str, book_ids: List[int], return_date: datetime,
+                             first_tier_days: int, first_tier_rate: float, later_rate: float,
+                             max_fee: float) -> Tuple[str, List[Tuple[int, str, Optional[Dict]]]]:
+    """
+    Return several books for one patron in a single IMMEDIATE transaction.
+
+    The patron's open loans and their fees as of return_date come from one
+    query; the oldest loan of each book is closed, availability incremented
+    and late fees frozen in the ledger with one executemany each.
+
+    Args:
+        book_ids: distinct book IDs
+
+    Returns:
+        tuple: (RETURN_OK or RETURN_DB_ERROR for the batch, and (book_id,
+        RETURN_* outcome, loan dict or None) per book in the given order,
+        loans shaped as in return_book_transaction)
+    """
+    now = to_epoch(return_date)
+
+    def close_loans(conn):
+        open_loans = {}
+        for row in conn.execute(SQL_PATRON_LOANS_TO_RETURN, {
+            'patron_id': patron_id, 'now': now, 'today': now // SECONDS_PER_DAY,
+            'first_days': first_tier_days, 'first_rate': first_tier_rate,
+            'later_rate': later_rate, 'max_fee': max_fee
+        }):
+            open_loans.setdefault(row['book_id'], dict(row))
+
+        results = []
+        for book_id in book_ids:
+            loan = open_loans.get(book_id)
+            results.append((book_id, RETURN_OK if loan else RETURN_NOT_BORROWED, loan))
+        returned = [loan for _, outcome, loan in results if outcome == RETURN_OK]
+
+        conn.executemany('UPDATE borrow_records SET return_date = ? WHERE id = ?',
+                         [(now, loan['record_id']) for loan in returned])
+        conn.executemany('UPDATE books SET available_copies = available_copies + 1 WHERE id = ?',
+                         [(loan['book_id'],) for loan in returned])
+        accrued_on = return_date.date().isoformat()
+        conn.executemany(SQL_RECORD_FINAL_FEE, [dict(loan, accrued_on=accrued_on)
+                                                for loan in returned if loan['days_overdue'] > 0])
+        return results
+
+    try:
+        results = run_write(close_loans)
+    except sqlite3.Error:
+        return RETURN_DB_ERROR, []
+    cache = get_book_cache()
+    for book_id, outcome, loan in results:
+        if outcome == RETURN_OK:
+            cache.invalidate(book_id)
+            loan['due_date'] = from_epoch(loan['due_date'])
+    return RETURN_OK, results
+
+def get_overdue_loans_with_fees(now: datetime, first_tier_days: int, first_tier_rate: float,
+                                later_rate: float, max_fee: float,
+                                after: Optional[Tuple[str, int]] = None,
+                                limit: int = 100) -> List[Dict]:
+    """
+    Get open overdue loans with days overdue and the tiered late fee,
+    computed by SQLite in a single pass over the open-loan due_date index.
+
+    Args:
+        now: current local time; loans with due_date before it are overdue
+        first_tier_days, first_tier_rate, later_rate, max_fee: fee schedule
+        after: (ISO due_date, record id) of the last loan on the previous page
+        limit: maximum number of loans
+
+    Returns:
+        list: loans ordered by (due_date, record_id)
+    """
+    after_due, after_id = after if after is not None else (None, 0)
+    after_due = to_epoch(datetime.fromisoformat(after_due)) if after_due else 0
+    conn = get_db_connection()
+    loans = conn.execute(SQL_OVERDUE_LOANS_WITH_FEES, {
+        'today': to_epoch(now) // SECONDS_PER_DAY, 'now': to_epoch(now),
+        'after_due': after_due, 'after_id': after_id,
+        'first_days': first_tier_days, 'first_rate': first_tier_rate,
+        'later_rate': later_rate, 'max_fee': max_fee, 'limit': limit
+    }).fetchall()
+    conn.close()
+    return [_iso_dates(loan) for loan in loans]
+
+def get_patron_summary(patron_id: str) -> Optional[Dict]:
+    """Get the incrementally maintained summary row for a patron."""
+    conn = get_db_connection()
+    summary = conn.execute('SELECT * FROM patron_summary WHERE patron_id = ?', (patron_id,)).fetchone()
+    conn.close()
+    return _iso_dates(summary, ('last_activity',)) if summary else None
+
+def get_patron_current_loans(patron_id: str, now: datetime, first_tier_days: int,
+                             first_tier_rate: float, later_rate: float,
+                             max_fee: float) -> List[Dict]:
+    """
+    Get a patron's open loans joined with their books, with days overdue and
+    the tiered late fee computed in the same query.
+    """
+    conn = get_db_connection()
+    loans = conn.execute(SQL_PATRON_CURRENT_LOANS, {
+        'patron_id': patron_id, 'today': to_epoch(now) // SECONDS_PER_DAY, 'now': to_epoch(now),
+        'first_days': first_tier_days, 'first_rate': first_tier_rate,
+        'later_rate': later_rate, 'max_fee': max_fee
+    }).fetchall()
+    conn.close()
+    return [_iso_dates(loan) for loan in loans]
+
+def get_patron_history(patron_id: str, before_id: Optional[int] = None,
+                       limit: int = 20) -> List[Dict]:
+    """
+    Get one page of a patron's loans (open and returned), newest first.
+
+    Args:
+        before_id: record id of the last loan on the previous page
+        limit: maximum number of loans
+    """
+    conn = get_db_connection()
+    records = conn.execute(SQL_PATRON_HISTORY, (
+        patron_id, before_id if before_id is not None else 2 ** 62, limit)).fetchall()
+    conn.close()
+    return [_iso_dates(record) for record in records]
+
+def accrue_late_fees(now: datetime, first_tier_days: int, first_tier_rate: float,
+                     later_rate: float, max_fee: float) -> int:
+    """
+    Bring the late-fee ledger up to date for today in one transaction.
+
+    Idempotent: running it again on the same day touches nothing, and loans
+    whose fee has reached max_fee are never rewritten.
+
+    Returns:
+        int: number of ledger rows inserted or advanced
+    """
+    with write_transaction() as conn:
+        cursor = conn.execute(SQL_ACCRUE_LATE_FEES, {
+            'today': to_epoch(now) // SECONDS_PER_DAY, 'now': to_epoch(now),
+            'accrued_on': now.date().isoformat(), 'first_days': first_tier_days, 'first_rate': first_tier_rate,
+            'later_rate': later_rate, 'max_fee': max_fee
+        })
+        return cursor.rowcount
+
+def get_ledger_fee(patron_id: str, book_id: int) -> Optional[Dict]:
+    """Get the accrued ledger row for a patron's open loan of a book, if any."""
+    conn = get_read_connection()
+    row = conn.execute(SQL_LEDGER_FEE, (patron_id, book_id)).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def get_returned_ledger_fee(patron_id: str, book_id: int) -> Optional[Dict]:
+    """Get the final ledger row for a patron's latest returned loan of a book, if any."""
+    conn = get_read_connection()
+    row = conn.execute(SQL_RETURNED_LEDGER_FEE, (patron_id, book_id)).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def get_patron_outstanding_fees(patron_id: str, now: datetime, first_tier_days: int,
+                                first_tier_rate: float, later_rate: float,
+                                max_fee: float) -> List[Dict]:
+    """
+    Get a patron's overdue open loans with the tiered fee, and returned loans
+    with their final ledger fee, each with the amount still outstanding after
+    earlier payments, in one query. Loans with nothing left to pay are omitted.
+    Loans are in record id order (sorted here: there are only a few).
+    """
+    conn = get_db_connection()
+    loans = conn.execute(SQL_PATRON_OUTSTANDING_FEES, {
+        'patron_id': patron_id, 'today': to_epoch(now) // SECONDS_PER_DAY, 'now': to_epoch(now),
+        'first_days': first_tier_days, 'first_rate': first_tier_rate,
+        'later_rate': later_rate, 'max_fee': max_fee
+    }).fetchall()
+    conn.close()
+    return sorted((dict(loan) for loan in loans), key=lambda loan: loan['record_id'])
+
+def get_open_loan_payments(patron_id: str, book_id: int) -> Optional[Dict]:
+    """
+    Get the record id of a patron's open loan of a book (or, without one,
+    their latest returned loan of it with a final fee) and the late fees
+    paid on it.
+    """
+    conn = get_db_connection()
+    row = conn.execute(SQL_OPEN_LOAN_PAYMENTS, (patron_id, book_id)).fetchone()
+    if row is None:
+        row = conn.execute(SQL_RETURNED_LOAN_PAYMENTS, (patron_id, book_id)).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def record_late_fee_payments(payments: List[Tuple[int, str, int, float, str, str]], paid_at: datetime):
+    """
+    Record settled late fee charges in one transaction.
+
+    Args:
+        payments: (record_id, patron_id, book_id, amount, transaction_id,
+            idempotency_key) tuples
+        paid_at: time of payment
+    """
+    if not payments:
+        return
+    with write_transaction() as conn:
+        conn.executemany('''
+            INSERT INTO late_fee_payments
+                (record_id, patron_id, book_id, amount, transaction_id, idempotency_key, paid_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [payment + (to_epoch(paid_at),) for payment in payments])
+
+def get_late_fee_payment(idempotency_key: str, record_id: int) -> Optional[Dict]:
+    """Get the payment recorded against a loan for an idempotency key, if any."""
+    conn = get_db_connection()
+    row = conn.execute(SQL_LATE_FEE_PAYMENT, (idempotency_key, record_id)).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def get_payments_by_transaction(transaction_id: str) -> List[Dict]:
+    """Get the recorded payments settled by a gateway transaction."""
+    conn = get_db_connection()
+    rows = conn.execute('SELECT * FROM late_fee_payments WHERE transaction_id = ? ORDER BY id',
+                        (transaction_id,)).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def record_late_fee_refund(payment_id: int, amount: float) -> bool:
+    """
+    Add a refund to a recorded payment, unless it would exceed the amount paid.
+
+    Returns:
+        bool: True if the refund was recorded
+    """
+    with write_transaction() as conn:
+        cursor = conn.execute('''
+            UPDATE late_fee_payments SET refunded_amount = ROUND(refunded_amount + ?, 2)
+            WHERE id = ? AND amount - refunded_amount >= ? - 0.005
+        ''', (amount, payment_id, amount))
+        return cursor.rowcount == 1
@@ -0,0 +1,251 @@
+"""
+Metrics module for Library Management System
+In-process counters and latency histograms, rendered in Prometheus text format
+"""
+
+import functools
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from flask import g, request
+
+# Off by default; set LIBRARY_METRICS=1 (or METRICS_ENABLED in app.config) to collect
+METRICS_ENABLED = os.environ.get('LIBRARY_METRICS', '').lower() in ('1', 'true', 'yes')
+# Latency bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# The SQLite progress handler runs once per this many virtual machine instructions
+PROGRESS_STEPS = 1000
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}'
+                    for labels, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative latency histogram with optional labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[index] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += seconds
+
+    def count(self, *labels) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[:-1]) if series else 0
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, hits in zip(self.buckets + (float('inf'),), series):
+                    cumulative += hits
+                    le = 'le="{}"'.format('+Inf' if bound == float('inf') else repr(bound))
+                    lines.append(f'{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(self.label_names, labels)} {series[-1]!r}')
+                lines.append(f'{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Set of metrics rendered together by render().
+
+    Collection is switched on and off with `enabled`; while it is off the
+    instrumentation hooks return before reading the clock or taking a lock.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def reset(self):
+        """Drop every recorded sample."""
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = [
+            '# HELP library_metrics_enabled Whether metrics collection is switched on.',
+            '# TYPE library_metrics_enabled gauge',
+            f'library_metrics_enabled {int(self.enabled)}',
+        ]
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    'library_http_request_duration_seconds', 'HTTP request latency by route.',
+    ('method', 'endpoint', 'status'))
+SERVICE_LATENCY = registry.histogram(
+    'library_service_call_duration_seconds', 'Service function latency.', ('function',))
+SQL_LATENCY = registry.histogram(
+    'library_sql_statement_duration_seconds', 'SQL statement latency by operation.', ('operation',))
+SQL_TRACED_STATEMENTS = registry.counter(
+    'library_sql_traced_statements_total',
+    'SQL statements run by SQLite, including statements inside triggers.', ('operation',))
+SQL_VM_STEPS = registry.counter(
+    'library_sql_vm_steps_total',
+    f'SQLite virtual machine instructions, counted in units of {PROGRESS_STEPS}.')
+
+
+def sql_operation(statement: str) -> str:
+    """Classify a statement by its first keyword (select, insert, ...)."""
+    words = statement.split(None, 1)
+    if not words:
+        return 'other'
+    keyword = words[0].lower()
+    if keyword == '--':
+        return 'trigger'
+    return keyword if keyword in ('select', 'insert', 'update', 'delete', 'begin',
+                                  'commit', 'rollback', 'pragma', 'with') else 'other'
+
+
+def observe_sql(statement: str, seconds: float):
+    """Record the duration of one statement run through a pooled connection."""
+    SQL_LATENCY.observe(seconds, sql_operation(statement))
+
+
+def _trace_statement(statement: str):
+    SQL_TRACED_STATEMENTS.inc(sql_operation(statement))
+
+
+def _progress() -> int:
+    SQL_VM_STEPS.inc()
+    return 0  # a non-zero return would interrupt the statement
+
+
+def instrument_connection(conn, enabled: bool):
+    """Install (or remove) the trace and progress callbacks on a connection."""
+    conn.set_trace_callback(_trace_statement if enabled else None)
+    conn.set_progress_handler(_progress if enabled else None, PROGRESS_STEPS)
+    conn.instrumented = enabled
+
+
+def timed(func: Callable) -> Callable:
+    """Record the latency of every call to a service function."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not registry.enabled:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            SERVICE_LATENCY.observe(time.perf_counter() - start, name)
+    return wrapper
+
+
+def _start_request_timer():
+    if registry.enabled:
+        g._metrics_start = time.perf_counter()
+
+
+def _note_response_status(response):
+    if '_metrics_start' in g:
+        g._metrics_status = response.status_code
+    return response
+
+
+def _record_request(exception=None):
+    # Runs on teardown, so requests that end in an unhandled exception (and
+    # never reach after_request) are counted too, as 500s
+    start = g.pop('_metrics_start', None)
+    if start is not None:
+        status = g.pop('_metrics_status', 500)
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - start, request.method, endpoint, status)
+
+
+def init_app(app):
+    """Read METRICS_ENABLED from app.config and register the request hooks."""
+    registry.enabled = bool(app.config.get('METRICS_ENABLED', registry.enabled))
+    app.before_request(_start_request_timer)
+    app.after_request(_note_response_status)
+    app.teardown_request(_record_request)
@@ -0,0 +1,285 @@
+"""
+Baseline schema: every table, trigger and index the application had before
+versioned migrations, created idempotently.
+
+Databases created before schema_version existed may be at any earlier
+layout, so this also upgrades them in place: books.updated_at, integer
+borrow dates, the payment idempotency columns and the patron summary and
+full-text backfills.
+"""
+
+DESCRIPTION = 'Baseline schema'
+
+# The DDL below is frozen as it was when this migration was released; later
+# schema changes ship as new migrations and never reach back into this one
+
+# UTC timestamp in the format stored in books.updated_at
+UTC_NOW = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+INDEXES = (
+    # Open loans by patron: borrow count (covering), borrowed list in
+    # borrow_date order, return lookup. Replaces idx_borrow_open_patron.
+    'DROP INDEX IF EXISTS idx_borrow_open_patron',
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_open_patron_date
+       ON borrow_records (patron_id, borrow_date, book_id, return_date)
+       WHERE return_date IS NULL''',
+    # Open loans by book
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_open_book
+       ON borrow_records (book_id) WHERE return_date IS NULL''',
+    # Patron borrowing history, newest (highest id) first
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_patron_history
+       ON borrow_records (patron_id)''',
+    # Overdue sweeps
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_open_due
+       ON borrow_records (due_date) WHERE return_date IS NULL''',
+    # Catalog listing and keyset pagination on (title, id)
+    '''CREATE INDEX IF NOT EXISTS idx_books_title_id
+       ON books (title, id)''',
+    # Incremental exports ("updated since")
+    '''CREATE INDEX IF NOT EXISTS idx_books_updated_at
+       ON books (updated_at)''',
+    # Case-insensitive title/author lookups
+    '''CREATE INDEX IF NOT EXISTS idx_books_title_nocase
+       ON books (title COLLATE NOCASE)''',
+    '''CREATE INDEX IF NOT EXISTS idx_books_author_nocase
+       ON books (author COLLATE NOCASE)''',
+    # Payments already made against a loan
+    '''CREATE INDEX IF NOT EXISTS idx_late_fee_payments_record
+       ON late_fee_payments (record_id)''',
+    # Duplicate payment and refund checks
+    '''CREATE INDEX IF NOT EXISTS idx_late_fee_payments_key
+       ON late_fee_payments (idempotency_key)''',
+    '''CREATE INDEX IF NOT EXISTS idx_late_fee_payments_transaction
+       ON late_fee_payments (transaction_id)''',
+)
+
+# Keep books.updated_at current on every insert and change
+TOUCH_TRIGGERS = (
+    f'''CREATE TRIGGER IF NOT EXISTS books_touch_ai AFTER INSERT ON books BEGIN
+           UPDATE books SET updated_at = {UTC_NOW} WHERE id = new.id;
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS books_touch_au
+       AFTER UPDATE OF title, author, isbn, total_copies, available_copies ON books BEGIN
+           UPDATE books SET updated_at = {UTC_NOW} WHERE id = new.id;
+       END''',
+)
+
+# Bump the catalog version on every change to the books table
+VERSION_TRIGGERS = (
+    '''CREATE TRIGGER IF NOT EXISTS books_version_ai AFTER INSERT ON books BEGIN
+           UPDATE catalog_version SET version = version + 1, updated_at = {now} WHERE id = 1;
+       END'''.format(now=UTC_NOW),
+    '''CREATE TRIGGER IF NOT EXISTS books_version_ad AFTER DELETE ON books BEGIN
+           UPDATE catalog_version SET version = version + 1, updated_at = {now} WHERE id = 1;
+       END'''.format(now=UTC_NOW),
+    '''CREATE TRIGGER IF NOT EXISTS books_version_au
+       AFTER UPDATE OF title, author, isbn, total_copies, available_copies ON books BEGIN
+           UPDATE catalog_version SET version = version + 1, updated_at = {now} WHERE id = 1;
+       END'''.format(now=UTC_NOW),
+)
+
+# Keep patron_summary in step with every borrow and return
+PATRON_SUMMARY_TRIGGERS = (
+    '''CREATE TRIGGER IF NOT EXISTS patron_summary_borrow AFTER INSERT ON borrow_records BEGIN
+           INSERT INTO patron_summary (patron_id, open_loans, total_loans, last_activity)
+           VALUES (new.patron_id, new.return_date IS NULL, 1, new.borrow_date)
+           ON CONFLICT (patron_id) DO UPDATE SET
+               open_loans = open_loans + excluded.open_loans,
+               total_loans = total_loans + 1,
+               last_activity = MAX(COALESCE(last_activity, 0), excluded.last_activity);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS patron_summary_return AFTER UPDATE OF return_date ON borrow_records
+       WHEN old.return_date IS NULL AND new.return_date IS NOT NULL BEGIN
+           UPDATE patron_summary SET
+               open_loans = open_loans - 1,
+               last_activity = MAX(COALESCE(last_activity, 0), new.return_date)
+           WHERE patron_id = new.patron_id;
+       END''',
+)
+
+# Full-text index over books(title, author), kept in sync by triggers
+FTS_TRIGGERS = (
+    '''CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+           INSERT INTO books_fts (rowid, title, author)
+           VALUES (new.id, new.title, new.author);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+           INSERT INTO books_fts (books_fts, rowid, title, author)
+           VALUES ('delete', old.id, old.title, old.author);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author ON books BEGIN
+           INSERT INTO books_fts (books_fts, rowid, title, author)
+           VALUES ('delete', old.id, old.title, old.author);
+           INSERT INTO books_fts (rowid, title, author)
+           VALUES (new.id, new.title, new.author);
+       END''',
+)
+
+
+def upgrade(conn):
+    """Create the baseline schema, upgrading a pre-migration database in place."""
+    # Create books table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            isbn TEXT UNIQUE NOT NULL,
+            total_copies INTEGER NOT NULL,
+            available_copies INTEGER NOT NULL,
+            updated_at TEXT
+        )
+    ''')
+    
+    # Databases created before updated_at existed get the column backfilled
+    book_columns = {row['name'] for row in conn.execute('PRAGMA table_info(books)')}
+    if 'updated_at' not in book_columns:
+        conn.execute('ALTER TABLE books ADD COLUMN updated_at TEXT')
+        conn.execute(f'UPDATE books SET updated_at = {UTC_NOW}')
+    for statement in TOUCH_TRIGGERS:
+        conn.execute(statement)
+    
+    # Create the single-row catalog version counter
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+    conn.execute(f'''
+        INSERT OR IGNORE INTO catalog_version (id, version, updated_at)
+        VALUES (1, 1, {UTC_NOW})
+    ''')
+    for statement in VERSION_TRIGGERS:
+        conn.execute(statement)
+    
+    # Create borrow_records table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS borrow_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            borrow_date INTEGER NOT NULL,
+            due_date INTEGER NOT NULL,
+            return_date INTEGER,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    
+    # Databases that still store ISO date strings are converted in place
+    dates_migrated = _convert_borrow_dates_to_epoch(conn)
+    
+    # Create the daily late-fee accrual ledger (one row per overdue loan)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS late_fee_ledger (
+            record_id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            days_overdue INTEGER NOT NULL,
+            fee_amount REAL NOT NULL,
+            accrued_on TEXT NOT NULL,
+            FOREIGN KEY (record_id) REFERENCES borrow_records (id)
+        )
+    ''')
+    
+    # Create the late fee payments table (one row per settled charge)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS late_fee_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            record_id INTEGER NOT NULL,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            transaction_id TEXT NOT NULL,
+            paid_at INTEGER NOT NULL,
+            idempotency_key TEXT,
+            refunded_amount REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY (record_id) REFERENCES borrow_records (id)
+        )
+    ''')
+    payment_columns = {row['name'] for row in conn.execute('PRAGMA table_info(late_fee_payments)')}
+    if 'idempotency_key' not in payment_columns:
+        conn.execute('ALTER TABLE late_fee_payments ADD COLUMN idempotency_key TEXT')
+        conn.execute('ALTER TABLE late_fee_payments ADD COLUMN refunded_amount REAL NOT NULL DEFAULT 0')
+    
+    # Create the per-patron summary, backfilling it on first creation
+    summary_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'patron_summary'"
+    ).fetchone()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS patron_summary (
+            patron_id TEXT PRIMARY KEY,
+            open_loans INTEGER NOT NULL DEFAULT 0,
+            total_loans INTEGER NOT NULL DEFAULT 0,
+            last_activity INTEGER
+        )
+    ''')
+    for statement in PATRON_SUMMARY_TRIGGERS:
+        conn.execute(statement)
+    if not summary_exists or dates_migrated:
+        conn.execute('DELETE FROM patron_summary')
+        conn.execute('''
+            INSERT INTO patron_summary (patron_id, open_loans, total_loans, last_activity)
+            SELECT patron_id, SUM(return_date IS NULL), COUNT(*),
+                   MAX(MAX(borrow_date), COALESCE(MAX(return_date), 0))
+            FROM borrow_records GROUP BY patron_id
+        ''')
+    
+    # Create secondary indexes for the hot lookup paths
+    for statement in INDEXES:
+        conn.execute(statement)
+    
+    # Create the full-text search index, backfilling it on first creation
+    fts_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'"
+    ).fetchone()
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            title, author,
+            content='books', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    ''')
+    for statement in FTS_TRIGGERS:
+        conn.execute(statement)
+    if not fts_exists:
+        conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+
+def _convert_borrow_dates_to_epoch(conn) -> bool:
+    """
+    Rebuild borrow_records with integer date columns if it still has the
+    original TEXT (ISO string) columns. Returns True if it migrated.
+
+    strftime('%s') reads the naive ISO strings as UTC, which is exactly the
+    wall-clock-seconds encoding used by to_epoch().
+    """
+    columns = {row['name']: row['type'] for row in conn.execute('PRAGMA table_info(borrow_records)')}
+    if columns.get('due_date', '').upper() != 'TEXT':
+        return False
+    
+    conn.execute('''
+        CREATE TABLE borrow_records_epoch (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            borrow_date INTEGER NOT NULL,
+            due_date INTEGER NOT NULL,
+            return_date INTEGER,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO borrow_records_epoch (id, patron_id, book_id, borrow_date, due_date, return_date)
+        SELECT id, patron_id, book_id,
+               CAST(strftime('%s', borrow_date) AS INTEGER),
+               CAST(strftime('%s', due_date) AS INTEGER),
+               CAST(strftime('%s', return_date) AS INTEGER)
+        FROM borrow_records
+    ''')
+    # Dropping the old table also drops its indexes and triggers; both are
+    # recreated by upgrade()
+    conn.execute('DROP TABLE borrow_records')
+    conn.execute('ALTER TABLE borrow_records_epoch RENAME TO borrow_records')
+    return True
@@ -0,0 +1,20 @@
+"""
+Indexes that keep a patron's current loans and outstanding late fees off
+the loan history: open loans in due_date order, and ledger rows by patron
+and book.
+"""
+
+DESCRIPTION = 'Open-loan due date and late fee ledger indexes'
+
+
+def upgrade(conn):
+    """Create the indexes."""
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_open_patron_due
+        ON borrow_records (patron_id, due_date, borrow_date, book_id)
+        WHERE return_date IS NULL
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_late_fee_ledger_patron_book
+        ON late_fee_ledger (patron_id, book_id)
+    ''')
@@ -0,0 +1,144 @@
+"""
+Versioned schema migrations for Library Management System
+
+Each migration is a module in this package named NNNN_description.py with
+a DESCRIPTION string and an upgrade(conn) function. Migrations are applied
+in version order, each in its own transaction together with its row in the
+schema_version table, so a database is always at exactly one version.
+
+A schema change (table, column, index, trigger) ships as a new migration;
+existing ones are never edited once released.
+"""
+
+import importlib
+import os
+import pkgutil
+import re
+import sqlite3
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from database import SQL_UTC_NOW, get_book_cache, get_db_connection
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    description: str
+    upgrade: Callable[[sqlite3.Connection], None]
+
+
+def _load_migrations() -> List[Migration]:
+    migrations = []
+    for module in pkgutil.iter_modules(__path__):
+        match = re.fullmatch(r'(\d{4})_\w+', module.name)
+        if not match:
+            continue
+        script = importlib.import_module(f'{__name__}.{module.name}')
+        migrations.append(Migration(int(match.group(1)), module.name,
+                                    script.DESCRIPTION, script.upgrade))
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if versions != list(range(1, len(versions) + 1)):
+        raise RuntimeError(f'Migration versions must run 1..N without gaps: {versions}')
+    return migrations
+
+
+# Apply pending migrations when the app starts (LIBRARY_AUTO_MIGRATE=0 or
+# AUTO_MIGRATE in app.config turns it off, e.g. to migrate in a deploy step)
+AUTO_MIGRATE = os.environ.get('LIBRARY_AUTO_MIGRATE', '1').lower() in ('1', 'true', 'yes')
+
+MIGRATIONS = _load_migrations()
+LATEST_VERSION = MIGRATIONS[-1].version
+
+SQL_CURRENT_VERSION = 'SELECT MAX(version) FROM schema_version'
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Return the database's schema version; 0 if no migration was ever applied."""
+    try:
+        return conn.execute(SQL_CURRENT_VERSION).fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        # No schema_version table yet
+        return 0
+
+
+def get_schema_version() -> int:
+    """Return the database's schema version with a single query."""
+    conn = get_db_connection()
+    try:
+        return current_version(conn)
+    finally:
+        conn.close()
+
+
+def migrate(target: Optional[int] = None) -> List[Migration]:
+    """
+    Apply the pending migrations up to `target` (default: all of them).
+
+    Costs one query when nothing is pending. Otherwise each migration runs
+    under BEGIN IMMEDIATE and re-checks the version once it holds the write
+    lock, so workers starting together apply every migration exactly once.
+
+    Returns:
+        list: the migrations applied by this call
+    """
+    target = LATEST_VERSION if target is None else target
+    conn = get_db_connection()
+    try:
+        if current_version(conn) >= target:
+            return []
+
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+        ''')
+        conn.commit()
+
+        applied = []
+        for migration in MIGRATIONS:
+            if migration.version > target:
+                break
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if current_version(conn) >= migration.version:
+                    conn.rollback()
+                    continue
+                migration.upgrade(conn)
+                conn.execute(f'INSERT INTO schema_version (version, name, applied_at) '
+                             f'VALUES (?, ?, {SQL_UTC_NOW})', (migration.version, migration.name))
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+            applied.append(migration)
+    finally:
+        conn.close()
+
+    if applied:
+        # Migrations may rewrite rows behind the book cache
+        get_book_cache().clear()
+    return applied
+
+
+def migration_status() -> List[Dict]:
+    """
+    List every known migration with when it was applied (None if pending).
+
+    Returns:
+        list: dicts with version, name, description and applied_at
+    """
+    conn = get_db_connection()
+    try:
+        try:
+            applied = {row['version']: row['applied_at'] for row in
+                       conn.execute('SELECT version, applied_at FROM schema_version')}
+        except sqlite3.OperationalError:
+            applied = {}
+    finally:
+        conn.close()
+    return [{'version': migration.version, 'name': migration.name,
+             'description': migration.description, 'applied_at': applied.get(migration.version)}
+            for migration in MIGRATIONS]
@@ -0,0 +1,161 @@
+"""
+Read replica module for Library Management System
+In-memory copy of the database file for read-only queries, refreshed with the
+sqlite3 backup API when the file changes
+"""
+
+import itertools
+import sqlite3
+import threading
+import time
+from typing import Callable, List
+
+
+# Tells apart the in-memory databases of all replicas in the process
+_copy_ids = itertools.count(1)
+
+
+class ReplicaCursor:
+    """Rows of a finished query against the replica, read like a cursor."""
+
+    def __init__(self, rows: List):
+        self._rows = rows
+        self._position = 0
+
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        row = self._rows[self._position]
+        self._position += 1
+        return row
+
+    def fetchall(self) -> List:
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+class ReplicaConnection:
+    """Connection-like handle for read helpers; close() is a no-op."""
+
+    def __init__(self, replica: 'ReadReplica'):
+        self._replica = replica
+
+    def execute(self, sql: str, parameters=()) -> ReplicaCursor:
+        return self._replica.execute(sql, parameters)
+
+    def close(self):
+        pass
+
+
+class ReadReplica:
+    """
+    In-memory copy of an SQLite database for read-only queries.
+
+    The copy is taken with the backup API and replaced when PRAGMA
+    data_version on a watch connection shows another connection committed,
+    checked at most once per `staleness` seconds. A refresh builds the new
+    copy while queries keep running on the old one and then swaps it in, so
+    readers never wait for a backup (except for the very first one) and
+    never touch the file or its locks. Results can lag writes by up to
+    `staleness` plus the time of one backup.
+
+    Each copy is a named shared-cache in-memory database, and every thread
+    queries it through a connection of its own, so queries from different
+    threads run side by side; the lock is only taken to swap in a new copy
+    and to open a thread's connection to it. A thread moves to the new copy
+    on its next query, and an old copy is freed once no thread still uses
+    it. Queries are fully fetched, so none keeps a read open on a copy.
+
+    `connect` must accept SQLite URI filenames.
+    """
+
+    def __init__(self, database: str, connect: Callable[[str], sqlite3.Connection],
+                 staleness: float = 1.0):
+        self.database = database
+        self.connect = connect
+        self.staleness = staleness
+        self.refreshes = 0
+        self._copy = None    # keeps the current copy alive between queries
+        self._copy_name = None
+        self._data_version = None
+        self._checked_at = None
+        self._watch = None
+        self._local = threading.local()
+        self._lock = threading.Lock()          # swapping copies and connecting to them
+        self._refresh_lock = threading.Lock()  # one backup at a time
+
+    def execute(self, sql: str, parameters=()) -> ReplicaCursor:
+        """Run a read-only query on the current copy and return its rows."""
+        self.refresh_if_stale()
+        return ReplicaCursor(self._thread_connection().execute(sql, parameters).fetchall())
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        """Return this thread's connection to the current copy, opening it if needed."""
+        local = self._local
+        if getattr(local, 'name', None) != self._copy_name:
+            # Under the lock the copy cannot be swapped out and freed before
+            # the new connection holds on to it
+            with self._lock:
+                name, conn = self._copy_name, self.connect(self._copy_name)
+            old = getattr(local, 'conn', None)
+            if old is not None:
+                old.close()
+            local.name, local.conn = name, conn
+        return local.conn
+
+    def connection(self) -> ReplicaConnection:
+        return ReplicaConnection(self)
+
+    def _check_due(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.staleness
+
+    def refresh_if_stale(self):
+        """Take a new copy if the file changed since the last one was taken."""
+        if self._copy is not None and not self._check_due():
+            return
+        # Another thread is already refreshing: keep serving the current copy
+        if not self._refresh_lock.acquire(blocking=self._copy is None):
+            return
+        try:
+            if self._copy is not None and not self._check_due():
+                return
+            self._checked_at = time.monotonic()
+            if self._watch is None:
+                self._watch = sqlite3.connect(self.database, check_same_thread=False)
+            # Read the version before copying: a commit in between only
+            # causes one extra refresh, never a missed one
+            version = self._watch.execute('PRAGMA data_version').fetchone()[0]
+            if self._copy is not None and version == self._data_version:
+                return
+            name = f'file:library-replica-{next(_copy_ids)}?mode=memory&cache=shared'
+            copy = self.connect(name)
+            self._watch.backup(copy)
+            with self._lock:
+                old, self._copy, self._copy_name = self._copy, copy, name
+                if old is not None:
+                    old.close()
+            self._data_version = version
+            self.refreshes += 1
+        finally:
+            self._refresh_lock.release()
+
+    def close(self):
+        """
+        Drop the copy and close the watch connection. Other threads close
+        their connections to it on their next query.
+        """
+        with self._refresh_lock, self._lock:
+            for conn in (self._copy, self._watch):
+                if conn is not None:
+                    conn.close()
+            own = getattr(self._local, 'conn', None)
+            if own is not None:
+                own.close()
+            self._copy = self._watch = self._local.conn = None
+            self._copy_name = self._local.name = None
+            self._data_version = None
+            self._checked_at = None
@@ -1,11 +1,20 @@
+import os
+
 from .catalog_routes import catalog_bp
 from .borrowing_routes import borrowing_bp
 from .search_routes import search_bp
 from .api_routes import api_bp
+from .async_api_routes import async_api_bp
+from .patron_routes import patron_bp
+
+# Serve /api from the asyncio views instead of the synchronous ones
+# (LIBRARY_API_ASYNC=1 or API_ASYNC in app.config); needs Flask[async]
+API_ASYNC = os.environ.get('LIBRARY_API_ASYNC', '').lower() in ('1', 'true', 'yes')
 
 def register_blueprints(app):
     """Register all route blueprints with the Flask app."""
     app.register_blueprint(catalog_bp)
     app.register_blueprint(borrowing_bp)
     app.register_blueprint(search_bp)
-    app.register_blueprint(api_bp)
+    app.register_blueprint(async_api_bp if app.config.get('API_ASYNC', API_ASYNC) else api_bp)
+    app.register_blueprint(patron_bp)
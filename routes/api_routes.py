@@ -2,8 +2,18 @@
 API Routes - JSON API endpoints
 """
 
-from flask import Blueprint, jsonify, request
-from services.library_service import calculate_late_fee_for_book, search_books_in_catalog
+from flask import Blueprint, Response, jsonify, request
+import metrics
+from services.library_service import (
+    get_late_fee_status, search_books_in_catalog, get_catalog_page, CATALOG_PAGE_SIZE,
+    get_overdue_late_fees, OVERDUE_PAGE_SIZE, get_patron_status_report, pay_all_late_fees,
+    borrow_books_by_patron, return_books_by_patron
+)
+from services.payment_service import PaymentGateway
+from services.catalog_export import EXPORT_FORMATS, export_catalog, parse_updated_since
+from routes.caching import catalog_conditional
+
+EXPORT_MIMETYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -13,27 +23,180 @@ def get_late_fee(patron_id, book_id):
     Calculate late fee for a specific book borrowed by a patron.
     API endpoint for R4: Late Fee Calculation
     """
-    result = calculate_late_fee_for_book(patron_id, book_id)
+    return late_fee_response(get_late_fee_status(patron_id, book_id))
+
+def late_fee_response(result):
     return jsonify(result), 501 if 'not implemented' in result.get('status', '') else 200
 
+@api_bp.route('/late_fees/overdue')
+def overdue_late_fees_api():
+    """
+    List late fees for all open overdue loans, oldest due date first.
+    Batch API for R5: Late Fee Calculation
+    
+    Pass the returned next_cursor as ?cursor= to fetch the following page.
+    """
+    return overdue_response(get_overdue_late_fees(**overdue_args()))
+
+def overdue_args():
+    return {'after': request.args.get('cursor'),
+            'limit': request.args.get('limit', OVERDUE_PAGE_SIZE, type=int)}
+
+def overdue_response(page):
+    return jsonify({
+        'results': page['loans'],
+        'count': len(page['loans']),
+        'page_total_fees': round(sum(loan['fee_amount'] for loan in page['loans']), 2),
+        'limit': page['limit'],
+        'next_cursor': page['next_cursor']
+    })
+
+@api_bp.route('/patron/<patron_id>/status')
+def patron_status_api(patron_id):
+    """
+    Get the status report for a patron.
+    API endpoint for R7: Patron Status Report
+    
+    Pass the returned history_next_cursor as ?history= for older loans.
+    """
+    report = get_patron_status_report(patron_id, history_cursor=request.args.get('history'))
+    return status_report_response(report)
+
+def status_report_response(report):
+    return jsonify(report), 400 if report.get('status') == 'Error' else 200
+
+@api_bp.route('/patron/<patron_id>/pay_fees', methods=['POST'])
+def pay_all_late_fees_api(patron_id):
+    """
+    Pay all of a patron's outstanding late fees in one gateway round trip.
+    
+    Returns 200 when something was paid (or nothing was due), 202 when the
+    only unsettled charges timed out and may still go through, 502 when every
+    charge failed and 400 for an invalid patron ID.
+    """
+    return pay_fees_response(pay_all_late_fees(patron_id, PaymentGateway()))
+
+def pay_fees_response(result):
+    status_codes = {'Error': 400, 'Pending': 202, 'Failed': 502}
+    return jsonify(result), status_codes.get(result['status'], 200)
+
+def batch_args():
+    data = request.get_json(silent=True) or {}
+    return data.get('patron_id'), data.get('book_ids')
+
+def batch_response(result):
+    status_codes = {'Error': 400, 'Failed': 409}
+    return jsonify(result), status_codes.get(result['status'], 200)
+
+@api_bp.route('/borrow/batch', methods=['POST'])
+def borrow_batch_api():
+    """
+    Borrow a stack of books for one patron in one transaction.
+    Batch API for R3: Book Borrowing Interface
+    
+    Body: {"patron_id": "123456", "book_ids": [1, 2, 3]}. Returns per-book
+    results; 400 for an invalid request, 409 when no book could be borrowed.
+    """
+    return batch_response(borrow_books_by_patron(*batch_args()))
+
+@api_bp.route('/return/batch', methods=['POST'])
+def return_batch_api():
+    """
+    Return a stack of books for one patron in one transaction.
+    Batch API for R4: Book Return Processing
+    
+    Body: {"patron_id": "123456", "book_ids": [1, 2, 3]}. Returns per-book
+    results with late fees; 400 for an invalid request, 409 when none of the
+    books was on loan to the patron.
+    """
+    return batch_response(return_books_by_patron(*batch_args()))
+
 @api_bp.route('/search')
+@catalog_conditional
 def search_books_api():
     """
     Search for books via API endpoint.
     Alternative API interface for R5: Book Search Functionality
     """
-    search_term = request.args.get('q', '').strip()
-    search_type = request.args.get('type', 'title')
-    
-    if not search_term:
+    args = search_args()
+    if not args['search_term']:
         return jsonify({'error': 'Search term is required'}), 400
     
     # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
-    
+    return search_response(search_books_in_catalog(**args), **args)
+
+def search_args():
+    return {
+        'search_term': request.args.get('q', '').strip(),
+        'search_type': request.args.get('type', 'title'),
+        'limit': max(1, min(request.args.get('limit', 50, type=int), 200)),
+        'offset': max(request.args.get('offset', 0, type=int), 0)
+    }
+
+def search_response(books, search_term, search_type, limit, offset):
     return jsonify({
         'search_term': search_term,
         'search_type': search_type,
         'results': books,
-        'count': len(books)
+        'count': len(books),
+        'limit': limit,
+        'offset': offset
     })
+
+@api_bp.route('/books')
+@catalog_conditional
+def list_books_api():
+    """
+    List the catalog one page at a time.
+    JSON interface for R2: Book Catalog Display
+    
+    Pass the returned next_cursor as ?cursor= to fetch the following page,
+    or prev_cursor as ?before= to go back.
+    """
+    return books_response(get_catalog_page(**books_args()))
+
+def books_args():
+    return {'after': request.args.get('cursor'), 'before': request.args.get('before'),
+            'limit': request.args.get('limit', CATALOG_PAGE_SIZE, type=int)}
+
+def books_response(page):
+    return jsonify({
+        'results': page['books'],
+        'count': len(page['books']),
+        'limit': page['limit'],
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor']
+    })
+
+@api_bp.route('/export/books')
+def export_books_api():
+    """
+    Stream the whole catalog as JSON lines or CSV for downstream mirrors.
+    
+    Query parameters: format (jsonl|csv), available (1 = only available
+    books), updated_since (ISO 8601, UTC if no offset is given).
+    """
+    fmt = request.args.get('format', 'jsonl')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    try:
+        updated_since = parse_updated_since(request.args.get('updated_since'))
+    except ValueError:
+        return jsonify({'error': 'updated_since must be an ISO 8601 date or datetime'}), 400
+    
+    available_only = request.args.get('available', '') in ('1', 'true', 'yes')
+    chunks = export_catalog(fmt, available_only=available_only, updated_since=updated_since)
+    
+    return Response(chunks, mimetype=EXPORT_MIMETYPES[fmt], headers={
+        'Content-Disposition': f'attachment; filename=books.{fmt}'
+    })
+
+@api_bp.route('/metrics')
+def metrics_api():
+    """
+    Expose request, service and SQL metrics in the Prometheus text format.
+    
+    Collection is off unless the app is configured with METRICS_ENABLED.
+    """
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
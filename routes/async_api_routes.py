@@ -0,0 +1,99 @@
+"""
+Async API Routes - the JSON API endpoints as asyncio views
+
+Same URLs and responses as api_routes; selected with API_ASYNC. Blocking
+service calls run on the bounded executor in services.async_service.
+"""
+
+from flask import Blueprint, jsonify, request
+from services.library_service import (
+    get_late_fee_status, search_books_in_catalog, get_catalog_page,
+    get_overdue_late_fees, pay_all_late_fees, borrow_books_by_patron, return_books_by_patron
+)
+from services.payment_service import PaymentGateway
+from services.async_service import run_blocking, get_patron_status_report_async
+from routes.api_routes import (
+    late_fee_response, overdue_args, overdue_response, status_report_response, pay_fees_response,
+    batch_args, batch_response, search_args, search_response, books_args, books_response,
+    export_books_api, metrics_api
+)
+from routes.caching import catalog_conditional
+
+async_api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+@async_api_bp.route('/late_fee/<patron_id>/<int:book_id>')
+async def get_late_fee(patron_id, book_id):
+    """
+    Calculate late fee for a specific book borrowed by a patron.
+    API endpoint for R4: Late Fee Calculation
+    """
+    return late_fee_response(await run_blocking(get_late_fee_status, patron_id, book_id))
+
+@async_api_bp.route('/late_fees/overdue')
+async def overdue_late_fees_api():
+    """
+    List late fees for all open overdue loans, oldest due date first.
+    Batch API for R5: Late Fee Calculation
+    """
+    return overdue_response(await run_blocking(get_overdue_late_fees, **overdue_args()))
+
+@async_api_bp.route('/patron/<patron_id>/status')
+async def patron_status_api(patron_id):
+    """
+    Get the status report for a patron; its summary, current-loan,
+    outstanding-fee and history queries run concurrently.
+    API endpoint for R7: Patron Status Report
+    """
+    return status_report_response(
+        await get_patron_status_report_async(patron_id, history_cursor=request.args.get('history')))
+
+@async_api_bp.route('/patron/<patron_id>/pay_fees', methods=['POST'])
+async def pay_all_late_fees_api(patron_id):
+    """
+    Pay all of a patron's outstanding late fees in one gateway round trip.
+    The event loop is free while the gateway call is in flight.
+    """
+    return pay_fees_response(await run_blocking(pay_all_late_fees, patron_id, PaymentGateway()))
+
+@async_api_bp.route('/borrow/batch', methods=['POST'])
+async def borrow_batch_api():
+    """
+    Borrow a stack of books for one patron in one transaction.
+    Batch API for R3: Book Borrowing Interface
+    """
+    return batch_response(await run_blocking(borrow_books_by_patron, *batch_args()))
+
+@async_api_bp.route('/return/batch', methods=['POST'])
+async def return_batch_api():
+    """
+    Return a stack of books for one patron in one transaction.
+    Batch API for R4: Book Return Processing
+    """
+    return batch_response(await run_blocking(return_books_by_patron, *batch_args()))
+
+@async_api_bp.route('/search')
+@catalog_conditional
+async def search_books_api():
+    """
+    Search for books via API endpoint.
+    Alternative API interface for R5: Book Search Functionality
+    """
+    args = search_args()
+    if not args['search_term']:
+        return jsonify({'error': 'Search term is required'}), 400
+
+    return search_response(await run_blocking(search_books_in_catalog, **args), **args)
+
+@async_api_bp.route('/books')
+@catalog_conditional
+async def list_books_api():
+    """
+    List the catalog one page at a time.
+    JSON interface for R2: Book Catalog Display
+    """
+    return books_response(await run_blocking(get_catalog_page, **books_args()))
+
+# Streaming and metrics responses never wait on a query up front, so the
+# synchronous views are reused as they are
+async_api_bp.add_url_rule('/export/books', view_func=export_books_api)
+async_api_bp.add_url_rule('/metrics', view_func=metrics_api)
@@ -6,7 +6,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from services.library_service import (
     borrow_book_by_patron,
     return_book_by_patron,
-    get_all_books
+    get_catalog_page
 )
 
 borrowing_bp = Blueprint('borrowing', __name__)
@@ -14,8 +14,8 @@ borrowing_bp = Blueprint('borrowing', __name__)
 @borrowing_bp.route('/borrow', methods=['GET', 'POST'])
 def borrow_book():
     if request.method == "GET":
-        books = get_all_books()
-        return render_template("borrow.html", books=books)
+        page = get_catalog_page(after=request.args.get("after"), before=request.args.get("before"))
+        return render_template("borrow.html", books=page["books"], page=page)
 
     # POST
     patron_id = request.form.get("patron_id")
@@ -24,8 +24,8 @@ def borrow_book():
     success, message = borrow_book_by_patron(patron_id, int(book_id))
     flash(message, "success" if success else "error")
 
-    books = get_all_books()
-    return render_template("borrow.html", books=books)
+    page = get_catalog_page()
+    return render_template("borrow.html", books=page["books"], page=page)
 
 
 @borrowing_bp.route('/return', methods=['GET', 'POST'])
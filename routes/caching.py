@@ -0,0 +1,64 @@
+"""
+HTTP caching helpers - conditional GET support for catalog-backed views
+"""
+
+import inspect
+from functools import wraps
+
+from flask import make_response, request, session
+from database import get_catalog_version
+from services.async_service import run_blocking
+
+
+def _check_catalog_version(version, last_modified):
+    """Return (etag, last_modified, not_modified) for the current request."""
+    etag = f'catalog-{version}'
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        not_modified = since is not None and last_modified.replace(microsecond=0) <= since
+    return etag, last_modified, not_modified
+
+
+def _add_validators(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+    return response
+
+
+def catalog_conditional(view):
+    """
+    Answer unchanged catalog reads with 304 Not Modified.
+
+    The ETag and Last-Modified headers come from the catalog version, which
+    is memoized in memory, so a matching If-None-Match / If-Modified-Since is
+    answered without querying books or rendering a template. Responses that
+    carry flashed messages are always rendered in full. Works on both plain
+    and async views; an async view looks the version up on the executor,
+    since it may query the database (always, with the read replica on).
+    """
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            if '_flashes' in session:
+                return await view(*args, **kwargs)
+
+            etag, last_modified, not_modified = _check_catalog_version(
+                *await run_blocking(get_catalog_version))
+            response = make_response('', 304) if not_modified else make_response(await view(*args, **kwargs))
+            return _add_validators(response, etag, last_modified)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if '_flashes' in session:
+            return view(*args, **kwargs)
+
+        etag, last_modified, not_modified = _check_catalog_version(*get_catalog_version())
+        response = make_response('', 304) if not_modified else make_response(view(*args, **kwargs))
+        return _add_validators(response, etag, last_modified)
+    return wrapper
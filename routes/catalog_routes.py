@@ -3,8 +3,9 @@ Catalog Routes - Book catalog related endpoints
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from database import get_all_books
-from services.library_service import add_book_to_catalog
+from services.library_service import add_book_to_catalog, get_catalog_page
+from services.catalog_import import detect_format, import_books, iter_book_rows
+from routes.caching import catalog_conditional
 
 catalog_bp = Blueprint('catalog', __name__)
 
@@ -14,13 +15,14 @@ def index():
     return redirect(url_for('catalog.catalog'))
 
 @catalog_bp.route('/catalog')
+@catalog_conditional
 def catalog():
     """
-    Display all books in the catalog.
+    Display one page of books in the catalog.
     Implements R2: Book Catalog Display
     """
-    books = get_all_books()
-    return render_template('catalog.html', books=books)
+    page = get_catalog_page(after=request.args.get('after'), before=request.args.get('before'))
+    return render_template('catalog.html', books=page['books'], page=page)
 
 @catalog_bp.route('/add_book', methods=['GET', 'POST'])
 def add_book():
@@ -51,3 +53,29 @@ def add_book():
     else:
         flash(message, 'error')
         return render_template('add_book.html')
+
+@catalog_bp.route('/import_books', methods=['GET', 'POST'])
+def import_books_upload():
+    """
+    Bulk import books from an uploaded CSV or JSON-lines file.
+    Each row follows the R1: Book Catalog Management rules
+    """
+    if request.method == 'GET':
+        return render_template('import_books.html')
+    
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        flash('Please choose a CSV or JSON-lines file to import.', 'error')
+        return render_template('import_books.html')
+    
+    fmt = request.form.get('format') or detect_format(upload.filename)
+    if fmt not in ('csv', 'jsonl'):
+        flash('Unsupported file type. Use .csv or .jsonl.', 'error')
+        return render_template('import_books.html')
+    
+    summary = import_books(iter_book_rows(upload.stream, fmt))
+    
+    flash(f"Imported {summary['imported']} books, rejected {summary['rejected']}.",
+          'success' if summary['imported'] else 'error')
+    return render_template('import_books.html', rejects=summary['rejects'],
+                           rejected=summary['rejected'])
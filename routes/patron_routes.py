@@ -0,0 +1,27 @@
+"""
+Patron Routes - Patron status report endpoints
+"""
+
+from flask import Blueprint, render_template, request, flash
+from services.library_service import get_patron_status_report
+
+patron_bp = Blueprint('patron', __name__)
+
+@patron_bp.route('/patron')
+def patron_status():
+    """
+    Display the status report for a patron.
+    Web interface for R7: Patron Status Report
+    """
+    patron_id = request.args.get('patron_id', '').strip()
+    
+    if not patron_id:
+        return render_template('patron_status.html', patron_id='', report=None)
+    
+    report = get_patron_status_report(patron_id, history_cursor=request.args.get('history'))
+    
+    if report.get('status') == 'Error':
+        flash(report['message'], 'error')
+        return render_template('patron_status.html', patron_id=patron_id, report=None)
+    
+    return render_template('patron_status.html', patron_id=patron_id, report=report)
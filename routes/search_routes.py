@@ -4,10 +4,12 @@ Search Routes - Book search functionality
 
 from flask import Blueprint, render_template, request, flash
 from services.library_service import search_books_in_catalog
+from routes.caching import catalog_conditional
 
 search_bp = Blueprint('search', __name__)
 
 @search_bp.route('/search')
+@catalog_conditional
 def search_books():
     """
     Search for books in the catalog.
@@ -23,6 +25,6 @@ def search_books():
     books = search_books_in_catalog(search_term, search_type)
     
     if not books:
-        flash('Search functionality is not yet implemented.', 'error')
+        flash('No books found matching your search.', 'error')
     
     return render_template('search.html', books=books, search_term=search_term, search_type=search_type)
@@ -0,0 +1,97 @@
+"""
+Async Service - asyncio entry points over the library service functions
+Blocking SQLite and payment gateway calls run on a bounded thread pool so the
+event loop never waits on them; independent lookups run concurrently
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from services.library_service import (
+    HISTORY_PAGE_SIZE, build_patron_status_report, patron_status_lookups
+)
+
+# Upper bound on blocking calls in flight; calls beyond it wait in the
+# executor queue instead of opening more SQLite connections
+ASYNC_MAX_WORKERS = 16
+
+T = TypeVar('T')
+
+_executor = None
+_executor_lock = threading.Lock()
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the shared executor for blocking calls, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ASYNC_MAX_WORKERS,
+                                           thread_name_prefix='library-async')
+        return _executor
+
+
+def shutdown_executor():
+    """Wait for the running calls and drop the executor; the next call starts a new one."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop, running on its own daemon thread."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='library-event-loop', daemon=True).start()
+        return _loop
+
+
+def async_to_sync(func: Callable[..., Awaitable[T]]) -> Callable[..., T]:
+    """
+    Make a coroutine function callable from a request thread.
+
+    The coroutine runs on the shared event loop, in a copy of the caller's
+    context (so Flask's request and app context are visible to it), and the
+    caller waits for its result. Unlike a fresh loop per call, every request
+    in the process shares one loop, so concurrent requests interleave their
+    awaits instead of each paying for a new thread and loop.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return asyncio.run_coroutine_threadsafe(func(*args, **kwargs), get_event_loop()).result()
+    return wrapper
+
+
+async def run_blocking(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run func(*args, **kwargs) on the shared executor and await its result.
+
+    The call does not run in the caller's context: a worker thread has no
+    Flask app context, so it takes its own pooled connection rather than
+    sharing the one pinned to the request, which would not be safe to use
+    from several threads at once.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def get_patron_status_report_async(patron_id: str, history_cursor: Optional[str] = None,
+                                         history_limit: int = HISTORY_PAGE_SIZE) -> Dict:
+    """
+    Get status report for a patron, running its queries concurrently.
+    Async variant of get_patron_status_report (R7: Patron Status Report)
+    """
+    error, history_limit, lookups = patron_status_lookups(patron_id, history_cursor, history_limit)
+    if error:
+        return error
+    results = await asyncio.gather(*(run_blocking(lookup) for lookup in lookups))
+    return build_patron_status_report(patron_id, history_limit, *results)
@@ -0,0 +1,75 @@
+"""
+Catalog Export Service - Streaming JSON-lines and CSV dumps of the books table
+Rows flow from an SQLite cursor to the response in fixed-size text chunks
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from database import iter_books
+
+__all__ = ["EXPORT_FORMATS", "EXPORT_COLUMNS", "parse_updated_since", "export_catalog"]
+
+EXPORT_FORMATS = ("jsonl", "csv")
+EXPORT_COLUMNS = ("id", "title", "author", "isbn", "total_copies", "available_copies", "updated_at")
+ROWS_PER_CHUNK = 500
+
+
+def parse_updated_since(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize an ISO 8601 date or datetime to the UTC format of books.updated_at.
+
+    Naive values are taken as UTC. Raises ValueError for malformed input.
+    """
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def export_catalog(fmt: str, available_only: bool = False,
+                   updated_since: Optional[str] = None) -> Iterator[str]:
+    """
+    Yield the catalog as text chunks of at most ROWS_PER_CHUNK rows.
+
+    The CSV header (or nothing, for JSON lines) is yielded first so the
+    first byte can go out before the query has produced any rows.
+
+    Args:
+        fmt: 'jsonl' or 'csv'
+        available_only: only books with copies available
+        updated_since: normalized timestamp from parse_updated_since()
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    pending = 0
+    for row in iter_books(available_only=available_only, updated_since=updated_since):
+        values = [row[column] for column in EXPORT_COLUMNS]
+        if writer is not None:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))))
+            buffer.write("\n")
+        pending += 1
+        if pending >= ROWS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if pending:
+        yield buffer.getvalue()
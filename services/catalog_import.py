@@ -0,0 +1,133 @@
+"""
+Catalog Import Service - Bulk loading of books from CSV or JSON-lines feeds
+Rows are streamed, validated with the R1 rules and inserted in batches
+"""
+
+import csv
+import io
+import json
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from database import insert_books_batch
+from services.library_service import validate_book_fields
+
+__all__ = ["IMPORT_FORMATS", "detect_format", "iter_book_rows", "import_books"]
+
+IMPORT_FORMATS = ("csv", "jsonl")
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_REJECTS = 1000
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """Guess the feed format from a file name ('csv', 'jsonl' or None)."""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return None
+
+
+def iter_book_rows(stream: IO, fmt: str) -> Iterator[Tuple[int, Dict]]:
+    """
+    Yield (line_number, row) pairs from a CSV or JSON-lines feed, one at a time.
+
+    Args:
+        stream: text or binary file object
+        fmt: 'csv' (header with title,author,isbn,total_copies) or 'jsonl'
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else {"_error": "Malformed JSON line."}
+
+
+def _parse_row(row: Dict) -> Tuple[Optional[Tuple[str, str, str, int, int]], Optional[str]]:
+    """Convert a raw feed row into an insert tuple, or return the R1 error."""
+    if "_error" in row:
+        return None, row["_error"]
+
+    title = row.get("title")
+    author = row.get("author")
+    isbn = str(row.get("isbn") or "").strip()
+    try:
+        total_copies = int(row.get("total_copies"))
+    except (TypeError, ValueError):
+        return None, "Total copies must be a positive integer."
+
+    error = validate_book_fields(title, author, isbn, total_copies)
+    if error:
+        return None, error
+    return (title.strip(), author.strip(), isbn, total_copies, total_copies), None
+
+
+def import_books(rows: Iterable[Tuple[int, Dict]], batch_size: int = DEFAULT_BATCH_SIZE,
+                 on_reject: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Validate and insert a stream of feed rows in chunked transactions.
+
+    Only one batch is held in memory at a time. Every rejected row is passed
+    to on_reject; the first MAX_REPORTED_REJECTS are also returned.
+
+    Args:
+        rows: (line_number, row) pairs, e.g. from iter_book_rows()
+        batch_size: rows per transaction
+        on_reject: optional callback receiving {'line', 'isbn', 'reason'} dicts
+
+    Returns:
+        dict: {'imported': int, 'rejected': int, 'rejects': list}
+    """
+    summary = {"imported": 0, "rejected": 0, "rejects": []}
+
+    def reject(line_number, isbn, reason):
+        entry = {"line": line_number, "isbn": isbn, "reason": reason}
+        summary["rejected"] += 1
+        if len(summary["rejects"]) < MAX_REPORTED_REJECTS:
+            summary["rejects"].append(entry)
+        if on_reject is not None:
+            on_reject(entry)
+
+    batch: List[Tuple[str, str, str, int, int]] = []
+    batch_lines: Dict[str, int] = {}
+
+    def flush():
+        if not batch:
+            return
+        duplicates = insert_books_batch(batch)
+        for isbn in duplicates:
+            reject(batch_lines[isbn], isbn, "A book with this ISBN already exists.")
+        summary["imported"] += len(batch) - len(duplicates)
+        batch.clear()
+        batch_lines.clear()
+
+    for line_number, row in rows:
+        book, error = _parse_row(row)
+        if error:
+            reject(line_number, str(row.get("isbn") or ""), error)
+            continue
+        isbn = book[2]
+        if isbn in batch_lines:
+            reject(line_number, isbn, "Duplicate ISBN within the import file.")
+            continue
+        batch.append(book)
+        batch_lines[isbn] = line_number
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    return summary
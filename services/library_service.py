@@ -3,14 +3,49 @@ Library Service Module - Business Logic Functions
 Contains all the core business logic for the Library Management System
 """
 
+import base64
+import hashlib
+import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from database import (
     get_book_by_id, get_book_by_isbn, get_patron_borrow_count,
     insert_book, insert_borrow_record, update_book_availability,
-    update_borrow_record_return_date, get_all_books
+    update_borrow_record_return_date, get_all_books, get_books_page, search_books,
+    borrow_book_transaction, get_overdue_loans_with_fees, get_patron_summary,
+    get_patron_current_loans, get_patron_history, accrue_late_fees, get_ledger_fee, BORROW_OK, BORROW_BOOK_NOT_FOUND,
+    BORROW_UNAVAILABLE, BORROW_LIMIT_REACHED, get_patron_outstanding_fees, get_open_loan_payments,
+    record_late_fee_payments, get_late_fee_payment, get_payments_by_transaction, record_late_fee_refund,
+    return_book_transaction, get_returned_ledger_fee, RETURN_OK, RETURN_NOT_BORROWED,
+    borrow_books_transaction, return_books_transaction, read_from_primary
 )
+from metrics import timed
+from services.payment_service import process_payments, recent_payments
 
+MAX_BORROWED_BOOKS = 5
+LOAN_PERIOD_DAYS = 14
+LATE_FEE_FIRST_TIER_DAYS = 7
+LATE_FEE_FIRST_TIER_RATE = 0.5
+LATE_FEE_LATER_RATE = 1.0
+LATE_FEE_MAX = 15.0
+OVERDUE_PAGE_SIZE = 100
+HISTORY_PAGE_SIZE = 20
+CATALOG_PAGE_SIZE = 50
+MAX_CATALOG_PAGE_SIZE = 200
+
+def late_fee_payment_key(patron_id: str, book_id: int, record_id: Optional[int],
+                         fee_amount: float) -> str:
+    """Idempotency key for paying a loan's late fee as it stands (patron, book, loan, fee snapshot)."""
+    return f"late-fee:{patron_id}:{book_id}:{record_id}:{fee_amount:.2f}"
+
+
+def late_fee_batch_key(patron_id: str, loans: List[Dict]) -> str:
+    """Idempotency key for paying a patron's outstanding fees as they stand (loans and amounts)."""
+    snapshot = ','.join(f"{loan['record_id']}={loan['outstanding']:.2f}" for loan in loans)
+    return f"late-fees:{patron_id}:{hashlib.sha256(snapshot.encode('utf-8')).hexdigest()[:16]}"
+
+
+@timed
 def pay_late_fees(patron_id: str, book_id: int, payment_gateway) -> Tuple[bool, str]:
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return False, "Invalid patron ID. Must be exactly 6 digits."
@@ -21,25 +56,141 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway) -> Tuple[bool,
     if not book:
         return False, "Book not found."
 
-    fee_info = calculate_late_fee_for_book(patron_id, book_id)
-    fee = float(fee_info.get("fee_amount", 0.0))
+    # Charge what the database file says is owed, never a replica's older view
+    with read_from_primary():
+        fee_info = calculate_late_fee_for_book(patron_id, book_id)
+    fee_amount = round(float(fee_info.get("fee_amount", 0.0)), 2)
 
-    if fee <= 0.0:
+    if fee_amount <= 0.0:
         return False, "No late fee due."
 
-    try:
-        ok, ref = payment_gateway.process_payment(patron_id, round(fee, 2),
-                                                  memo=f"Late fee for book_id={book_id}")
-    except Exception as e:
-        return False, f"Payment error: {type(e).__name__}"
+    # The same fee on a later loan of the book is a new charge
+    loan = get_open_loan_payments(patron_id, book_id)
+    record_id = loan["record_id"] if loan else None
+    key = late_fee_payment_key(patron_id, book_id, record_id, fee_amount)
 
-    if not ok:
-        return False, f"Payment declined: {ref}"
+    def pay() -> Tuple[bool, str]:
+        # A retry of a payment that already went through gets the stored outcome
+        stored = get_late_fee_payment(key, record_id) if record_id is not None else None
+        if stored:
+            return True, f"Paid ${stored['amount']:.2f}. Transaction: {stored['transaction_id']}"
+
+        loan = get_open_loan_payments(patron_id, book_id)
+        fee = round(fee_amount - (loan["paid"] if loan else 0.0), 2)
+        if fee < 0.005:
+            return False, "No late fee due."
+
+        try:
+            ok, ref = payment_gateway.process_payment(patron_id, fee,
+                                                      memo=f"Late fee for book_id={book_id}")
+        except Exception as e:
+            return False, f"Payment error: {type(e).__name__}"
+
+        if not ok:
+            return False, f"Payment declined: {ref}"
+
+        if loan:
+            record_late_fee_payments([(loan["record_id"], patron_id, book_id, fee, ref, key)],
+                                     datetime.now())
+        return True, f"Paid ${fee:.2f}. Transaction: {ref}"
+
+    return recent_payments.run(key, pay)
+
+
+@timed
+def pay_all_late_fees(patron_id: str, payment_gateway) -> Dict:
+    """
+    Pay every outstanding late fee of a patron at once.
+
+    Fees for all overdue loans come from one query, the charges go to the
+    gateway in one batch call (or concurrently, one per book, if it has no
+    batch endpoint) and the successful charges are recorded in one transaction.
+    A charge that timed out while running may still settle, so it is reported
+    as pending rather than failed and the outcome is remembered like a payment:
+    a resubmission of the batch does not charge it again.
+
+    Returns:
+        dict: status ('OK', 'Partial', 'Pending', 'Failed', 'Nothing due' or
+        'Error'), message, paid, pending and failed lists of
+        {book_id, title, amount, ...} and total_paid
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return {'status': 'Error', 'message': 'Invalid patron ID. Must be exactly 6 digits.'}
+
+    nothing_due = {'status': 'Nothing due', 'message': 'No late fee due.',
+                   'paid': [], 'pending': [], 'failed': [], 'total_paid': 0.0}
+    loans = _outstanding_fees(patron_id)
+    if not loans:
+        return nothing_due
 
-    return True, f"Paid ${fee:.2f}. Transaction: {ref}"
+    key = late_fee_batch_key(patron_id, loans)
 
+    def pay() -> Tuple[bool, Dict]:
+        # Re-read inside the key's critical section: an earlier run of the same
+        # batch, here or in another process, may already have settled it
+        now = datetime.now()
+        current = _outstanding_fees(patron_id, now)
+        if not current:
+            return False, nothing_due
 
-def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway) -> Tuple[bool, str]:
+        results = process_payments(payment_gateway, [
+            (patron_id, loan['outstanding'], f"Late fee for book_id={loan['book_id']}") for loan in current
+        ])
+
+        paid, pending, failed = [], [], []
+        for loan, (ok, ref) in zip(current, results):
+            item = {'book_id': loan['book_id'], 'title': loan['title'], 'amount': loan['outstanding']}
+            if ok:
+                paid.append(dict(item, transaction_id=ref))
+            elif ok is None:
+                pending.append(dict(item, reason=ref))
+            else:
+                failed.append(dict(item, reason=ref))
+        record_late_fee_payments([
+            (loan['record_id'], patron_id, loan['book_id'], loan['outstanding'], ref,
+             f"{key}:{loan['record_id']}")
+            for loan, (ok, ref) in zip(current, results) if ok
+        ], now)
+
+        total_paid = round(sum(item['amount'] for item in paid), 2)
+        if not failed and not pending:
+            status = 'OK'
+        elif paid:
+            status = 'Partial'
+        else:
+            status = 'Pending' if pending else 'Failed'
+        message = f"Paid ${total_paid:.2f} for {len(paid)} of {len(current)} books."
+        if pending:
+            message += f" {len(pending)} pending: check with the payment provider before retrying."
+        # Remember pending charges too, so a resubmission cannot charge them twice
+        return bool(paid or pending), {'status': status, 'message': message, 'paid': paid,
+                                       'pending': pending, 'failed': failed, 'total_paid': total_paid}
+
+    # Duplicate submissions of the same batch share one set of charges
+    return recent_payments.run(key, pay)[1]
+
+
+def _outstanding_fees(patron_id: str, now: Optional[datetime] = None) -> List[Dict]:
+    return get_patron_outstanding_fees(
+        patron_id, now or datetime.now(),
+        first_tier_days=LATE_FEE_FIRST_TIER_DAYS,
+        first_tier_rate=LATE_FEE_FIRST_TIER_RATE,
+        later_rate=LATE_FEE_LATER_RATE,
+        max_fee=LATE_FEE_MAX
+    )
+
+
+@timed
+def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway,
+                            idempotency_key: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    Refund part or all of a late fee payment.
+
+    Retries that pass the same idempotency_key get the first outcome. Without
+    one, only duplicates in flight at the same time are merged and nothing is
+    remembered, so a later refund of the same amount is a new refund; callers
+    that retry must pass a key.
+    """
     if not transaction_id or not isinstance(transaction_id, str):
         return False, "Invalid transaction ID."
     if amount <= 0:
@@ -47,17 +198,65 @@ def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway)
     if amount > 15.0:
         return False, "Refund exceeds $15 maximum."
 
-    try:
-        ok, ref = payment_gateway.refund_payment(transaction_id, round(float(amount), 2))
-    except Exception as e:
-        return False, f"Refund error: {type(e).__name__}"
+    amount = round(float(amount), 2)
 
-    if not ok:
-        return False, f"Refund declined: {ref}"
+    def refund() -> Tuple[bool, str]:
+        # Payments recorded in the ledger can only be refunded up to what was paid;
+        # transactions from before the ledger fall back to the $15 check above
+        payments = get_payments_by_transaction(transaction_id)
+        payment = next((p for p in payments if p['amount'] - p['refunded_amount'] >= amount - 0.005), None)
+        if payments and payment is None:
+            refundable = max(p['amount'] - p['refunded_amount'] for p in payments)
+            return False, f"Refund exceeds the ${refundable:.2f} refundable for this transaction."
+
+        try:
+            ok, ref = payment_gateway.refund_payment(transaction_id, amount)
+        except Exception as e:
+            return False, f"Refund error: {type(e).__name__}"
+
+        if not ok:
+            return False, f"Refund declined: {ref}"
+
+        if payment is not None:
+            record_late_fee_refund(payment['id'], amount)
+        return True, f"Refunded ${amount:.2f}. Reference: {ref}"
+
+    if idempotency_key is None:
+        return recent_payments.run(f"refund-in-flight:{transaction_id}:{amount:.2f}", refund,
+                                   remember=False)
+    return recent_payments.run(f"refund:{transaction_id}:{idempotency_key}", refund)
+    
 
-    return True, f"Refunded ${amount:.2f}. Reference: {ref}"
+def validate_book_fields(title: str, author: str, isbn: str, total_copies: int) -> Optional[str]:
+    """
+    Check the R1 field rules for a new book.
     
+    Returns:
+        str: the first validation error message, or None if the fields are valid
+    """
+    # Title
+    if not isinstance(title, str) or not title.strip():
+        return "Title is required."
+    if len(title.strip()) > 200:
+        return "Title must be less than or equal to 200 characters."
+
+    # Author
+    if not isinstance(author, str) or not author.strip():
+        return "Author is required."
+    if len(author.strip()) > 100:
+        return "Author must be less than or equal to 100 characters."
 
+    # ISBN: exactly 13 digits
+    if not isinstance(isbn, str) or not isbn.isdigit() or len(isbn) != 13:
+        return "ISBN must be exactly 13 digits."
+
+    # Copies
+    if not isinstance(total_copies, int) or total_copies <= 0:
+        return "Total copies must be a positive integer."
+
+    return None
+
+@timed
 def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -> Tuple[bool, str]:
     """
     Add a new book to the catalog.
@@ -103,25 +302,9 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
     # else:
     #     return False, "Database error occurred while adding the book."
 
-    # Title
-    if not isinstance(title, str) or not title.strip():
-        return False, "Title is required."
-    if len(title.strip()) > 200:
-        return False, "Title must be less than or equal to 200 characters."
-
-    # Author
-    if not isinstance(author, str) or not author.strip():
-        return False, "Author is required."
-    if len(author.strip()) > 100:
-        return False, "Author must be less than or equal to 100 characters."
-
-    # ISBN: exactly 13 digits
-    if not isinstance(isbn, str) or not isbn.isdigit() or len(isbn) != 13:
-        return False, "ISBN must be exactly 13 digits."
-
-    # Copies
-    if not isinstance(total_copies, int) or total_copies <= 0:
-        return False, "Total copies must be a positive integer."
+    error = validate_book_fields(title, author, isbn, total_copies)
+    if error:
+        return False, error
 
     # Uniqueness check
     if get_book_by_isbn(isbn) is not None:
@@ -134,6 +317,7 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
 
     return True, f'Successfully added "{title.strip()}" with ISBN {isbn}.'
 
+@timed
 def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Allow a patron to borrow a book.
@@ -150,43 +334,165 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return False, "Invalid patron ID. Must be exactly 6 digits."
     
-    # Check if book exists and is available
-    book = get_book_by_id(book_id)
-    if not book:
+    # Create borrow record
+    borrow_date = datetime.now()
+    due_date = borrow_date + timedelta(days=LOAN_PERIOD_DAYS)
+    
+    # Availability, limit check, decrement and insert happen in one transaction
+    outcome, book = borrow_book_transaction(patron_id, book_id, borrow_date, due_date,
+                                            MAX_BORROWED_BOOKS)
+    if outcome == BORROW_BOOK_NOT_FOUND:
         return False, "Book not found."
     
-    if book['available_copies'] <= 0:
+    if outcome == BORROW_UNAVAILABLE:
         return False, "This book is currently not available."
     
-    # Check patron's current borrowed books count
-    current_borrowed = get_patron_borrow_count(patron_id)
-    
-    if current_borrowed >= 5:
-        return False, "You have reached the maximum borrowing limit of 5 books."
+    if outcome == BORROW_LIMIT_REACHED:
+        return False, f"You have reached the maximum borrowing limit of {MAX_BORROWED_BOOKS} books."
     
-    # Create borrow record
-    borrow_date = datetime.now()
-    due_date = borrow_date + timedelta(days=14)
-    
-    # Insert borrow record and update availability
-    borrow_success = insert_borrow_record(patron_id, book_id, borrow_date, due_date)
-    if not borrow_success:
+    if outcome != BORROW_OK:
         return False, "Database error occurred while creating borrow record."
     
-    availability_success = update_book_availability(book_id, -1)
-    if not availability_success:
-        return False, "Database error occurred while updating book availability."
-    
     return True, f'Successfully borrowed "{book["title"]}". Due date: {due_date.strftime("%Y-%m-%d")}.'
 
+@timed
 def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Process book return by a patron.
+    Implements R4 as per requirements
+    
+    Args:
+        patron_id: 6-digit library card ID
+        book_id: ID of the book to return
+        
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    # Validate patron ID
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return False, "Invalid patron ID. Must be exactly 6 digits."
+    
+    # Closing the loan, the availability increment and the fee happen in one transaction
+    outcome, loan = return_book_transaction(
+        patron_id, book_id, datetime.now(),
+        first_tier_days=LATE_FEE_FIRST_TIER_DAYS,
+        first_tier_rate=LATE_FEE_FIRST_TIER_RATE,
+        later_rate=LATE_FEE_LATER_RATE,
+        max_fee=LATE_FEE_MAX
+    )
+    if outcome == RETURN_NOT_BORROWED:
+        return False, "This book is not borrowed by this patron."
+    
+    if outcome != RETURN_OK:
+        return False, "Database error occurred while processing the return."
     
-    TODO: Implement R4 as per requirements
+    message = f'Successfully returned "{loan["title"]}".'
+    if loan['days_overdue'] > 0:
+        message += (f" Returned {loan['days_overdue']} day(s) late. "
+                    f"Late fee: ${loan['fee_amount']:.2f}.")
+    return True, message
+
+def _validate_batch(patron_id: str, book_ids) -> Optional[str]:
+    """Return the first problem with a batch borrow/return request, or None."""
+    if not patron_id or not isinstance(patron_id, str) or not patron_id.isdigit() or len(patron_id) != 6:
+        return "Invalid patron ID. Must be exactly 6 digits."
+    if (not isinstance(book_ids, list) or not book_ids
+            or not all(isinstance(book_id, int) and not isinstance(book_id, bool) for book_id in book_ids)):
+        return "book_ids must be a non-empty list of book IDs."
+    if len(book_ids) > MAX_BORROWED_BOOKS:
+        return f"At most {MAX_BORROWED_BOOKS} books can be processed at once."
+    if len(set(book_ids)) != len(book_ids):
+        return "Each book may appear only once in a batch."
+    return None
+
+def _batch_result(results: List[Dict], verb: str) -> Dict:
+    done = sum(1 for item in results if item['success'])
+    status = 'OK' if done == len(results) else 'Partial' if done else 'Failed'
+    return {'status': status, 'message': f"{verb} {done} of {len(results)} books.", 'results': results}
+
+@timed
+def borrow_books_by_patron(patron_id: str, book_ids: List[int]) -> Dict:
+    """
+    Borrow a stack of books at once, as scanned at a self-checkout kiosk.
+    Batch form of R3: the borrowing limit is checked once for the whole
+    stack and all loans are written in one transaction.
+
+    Returns:
+        dict: status ('OK', 'Partial', 'Failed' or 'Error'), message and
+        results, one {book_id, success, message} per book in the given order
+    """
+    error = _validate_batch(patron_id, book_ids)
+    if error:
+        return {'status': 'Error', 'message': error, 'results': []}
+
+    borrow_date = datetime.now()
+    due_date = borrow_date + timedelta(days=LOAN_PERIOD_DAYS)
+    outcome, books = borrow_books_transaction(patron_id, book_ids, borrow_date, due_date,
+                                              MAX_BORROWED_BOOKS)
+    if outcome == BORROW_LIMIT_REACHED:
+        return {'status': 'Failed', 'results': [],
+                'message': f"Borrowing {len(book_ids)} more books would exceed the limit of "
+                           f"{MAX_BORROWED_BOOKS} books."}
+    if outcome != BORROW_OK:
+        return {'status': 'Error', 'message': "Database error occurred while creating borrow records.",
+                'results': []}
+
+    messages = {
+        BORROW_BOOK_NOT_FOUND: "Book not found.",
+        BORROW_UNAVAILABLE: "This book is currently not available.",
+    }
+    results = []
+    for book_id, item_outcome, book in books:
+        if item_outcome == BORROW_OK:
+            results.append({'book_id': book_id, 'success': True, 'title': book['title'],
+                            'due_date': due_date.strftime("%Y-%m-%d"),
+                            'message': f'Successfully borrowed "{book["title"]}".'})
+        else:
+            results.append({'book_id': book_id, 'success': False, 'message': messages[item_outcome]})
+    return _batch_result(results, 'Borrowed')
+
+@timed
+def return_books_by_patron(patron_id: str, book_ids: List[int]) -> Dict:
+    """
+    Return a stack of books at once.
+    Batch form of R4: all loans are closed, copies restored and late fees
+    computed in one transaction.
+
+    Returns:
+        dict: status ('OK', 'Partial', 'Failed' or 'Error'), message,
+        total_late_fees and results, one {book_id, success, message, ...}
+        per book in the given order
     """
-    return False, "Book return functionality is not yet implemented."
+    error = _validate_batch(patron_id, book_ids)
+    if error:
+        return {'status': 'Error', 'message': error, 'results': []}
 
+    outcome, loans = return_books_transaction(
+        patron_id, book_ids, datetime.now(),
+        first_tier_days=LATE_FEE_FIRST_TIER_DAYS,
+        first_tier_rate=LATE_FEE_FIRST_TIER_RATE,
+        later_rate=LATE_FEE_LATER_RATE,
+        max_fee=LATE_FEE_MAX
+    )
+    if outcome != RETURN_OK:
+        return {'status': 'Error', 'message': "Database error occurred while processing the returns.",
+                'results': []}
+
+    results = []
+    for book_id, item_outcome, loan in loans:
+        if item_outcome != RETURN_OK:
+            results.append({'book_id': book_id, 'success': False,
+                            'message': "This book is not borrowed by this patron."})
+            continue
+        results.append({'book_id': book_id, 'success': True, 'title': loan['title'],
+                        'days_overdue': loan['days_overdue'],
+                        'fee_amount': round(loan['fee_amount'], 2),
+                        'message': f'Successfully returned "{loan["title"]}".'})
+    result = _batch_result(results, 'Returned')
+    result['total_late_fees'] = round(sum(item.get('fee_amount', 0.0) for item in results), 2)
+    return result
+
+@timed
 def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     """
     Calculate late fees for a specific book.
@@ -207,8 +513,26 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     if not book:
         return {'fee_amount': 0.0, 'days_overdue': 0, 'status': 'Error'}
 
+    # Serve from the accrual ledger when it is current for today
+    ledger = get_ledger_fee(patron_id, book_id)
+    if ledger is not None:
+        today = datetime.now().date()
+        accrued_on = datetime.fromisoformat(ledger['accrued_on']).date()
+        if accrued_on == today:
+            return {'fee_amount': round(ledger['fee_amount'], 2),
+                    'days_overdue': ledger['days_overdue'], 'status': 'OK'}
+        if ledger['fee_amount'] >= LATE_FEE_MAX:
+            return {'fee_amount': round(ledger['fee_amount'], 2),
+                    'days_overdue': ledger['days_overdue'] + (today - accrued_on).days,
+                    'status': 'OK'}
+
     borrowed = [r for r in get_patron_borrowed_books(patron_id) if r['book_id'] == book_id]
     if not borrowed:
+        # A late return leaves its final fee in the ledger
+        returned = get_returned_ledger_fee(patron_id, book_id)
+        if returned is not None:
+            return {'fee_amount': round(returned['fee_amount'], 2),
+                    'days_overdue': returned['days_overdue'], 'status': 'OK'}
         return {'fee_amount': 0.0, 'days_overdue': 0, 'status': 'Not overdue'}
 
     due_date = borrowed[0]['due_date']
@@ -217,25 +541,268 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
         return {'fee_amount': 0.0, 'days_overdue': 0, 'status': 'Not overdue'}
 
     days_over = (today.date() - due_date.date()).days
-    first_segment = min(days_over, 7)
-    second_segment = max(0, days_over - 7)
-    fee = 0.5 * first_segment + 1.0 * second_segment
-    fee = min(fee, 15.0)
+    first_segment = min(days_over, LATE_FEE_FIRST_TIER_DAYS)
+    second_segment = max(0, days_over - LATE_FEE_FIRST_TIER_DAYS)
+    fee = LATE_FEE_FIRST_TIER_RATE * first_segment + LATE_FEE_LATER_RATE * second_segment
+    fee = min(fee, LATE_FEE_MAX)
     return {'fee_amount': round(fee, 2), 'days_overdue': days_over, 'status': 'OK'}
 
-def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
+def get_late_fee_status(patron_id: str, book_id: int) -> Dict:
     """
-    Search for books in the catalog.
+    Late fee of a loan as calculate_late_fee_for_book() reports it, plus
+    amount_paid and outstanding (what is still owed after payments) when
+    a fee is due.
+    """
+    result = calculate_late_fee_for_book(patron_id, book_id)
+    if result['status'] == 'OK' and result['fee_amount'] > 0:
+        loan = get_open_loan_payments(patron_id, book_id)
+        paid = round(float(loan['paid']), 2) if loan else 0.0
+        result['amount_paid'] = paid
+        result['outstanding'] = round(max(0.0, result['fee_amount'] - paid), 2)
+    return result
+
+@timed
+def run_late_fee_accrual(now: Optional[datetime] = None) -> int:
+    """
+    Advance the late-fee ledger for all overdue loans to today.
+    Meant to run once a day; safe to run more often.
+    
+    Returns:
+        int: number of ledger rows inserted or changed
+    """
+    return accrue_late_fees(
+        now or datetime.now(),
+        first_tier_days=LATE_FEE_FIRST_TIER_DAYS,
+        first_tier_rate=LATE_FEE_FIRST_TIER_RATE,
+        later_rate=LATE_FEE_LATER_RATE,
+        max_fee=LATE_FEE_MAX
+    )
+
+@timed
+def get_overdue_late_fees(after: Optional[str] = None, limit: int = OVERDUE_PAGE_SIZE) -> Dict:
+    """
+    Compute late fees for every open overdue loan in one set-based query.
+    Batch form of R5: Late Fee Calculation, using the same tiers and cap
+    as calculate_late_fee_for_book().
+    
+    Args:
+        after: cursor returned as next_cursor by the previous page
+        limit: page size, capped at MAX_CATALOG_PAGE_SIZE
+        
+    Returns:
+        dict: {'loans': [...], 'next_cursor', 'limit'}; each loan has
+        record_id, patron_id, book_id, title, due_date, days_overdue and fee_amount
+    """
+    limit = max(1, min(int(limit), MAX_CATALOG_PAGE_SIZE))
+    loans = get_overdue_loans_with_fees(
+        datetime.now(),
+        first_tier_days=LATE_FEE_FIRST_TIER_DAYS,
+        first_tier_rate=LATE_FEE_FIRST_TIER_RATE,
+        later_rate=LATE_FEE_LATER_RATE,
+        max_fee=LATE_FEE_MAX,
+        after=decode_overdue_cursor(after),
+        limit=limit + 1
+    )
+    has_next = len(loans) > limit
+    loans = loans[:limit]
+    for loan in loans:
+        loan['fee_amount'] = round(loan['fee_amount'], 2)
+
+    return {
+        'loans': loans,
+        'next_cursor': encode_cursor([loans[-1]['due_date'], loans[-1]['record_id']]) if has_next else None,
+        'limit': limit
+    }
+
+def encode_cursor(key: List) -> str:
+    """Encode a keyset sort key as an opaque URL-safe cursor."""
+    raw = json.dumps(key).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: Optional[str], types: Tuple[type, ...]) -> Optional[Tuple]:
+    """Decode a cursor from encode_cursor(); None if missing, malformed or of the wrong shape."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(key, list) or len(key) != len(types):
+        return None
+    if not all(isinstance(value, kind) for value, kind in zip(key, types)):
+        return None
+    return tuple(key)
+
+def encode_page_cursor(book: Dict) -> str:
+    """Encode a book's (title, id) sort key as an opaque URL-safe cursor."""
+    return encode_cursor([book['title'], book['id']])
+
+def decode_page_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Decode a cursor from encode_page_cursor(); None if missing or malformed."""
+    return decode_cursor(cursor, (str, int))
+
+def decode_overdue_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Decode an overdue-loans (ISO due_date, record id) cursor; None if missing or malformed."""
+    key = decode_cursor(cursor, (str, int))
+    if key is None:
+        return None
+    try:
+        datetime.fromisoformat(key[0])
+    except ValueError:
+        return None
+    return key
+
+@timed
+def get_catalog_page(after: Optional[str] = None, before: Optional[str] = None,
+                     limit: int = CATALOG_PAGE_SIZE) -> Dict:
+    """
+    Get one page of the catalog.
+    Implements R2: Book Catalog Display, paginated by (title, id)
     
-    TODO: Implement R6 as per requirements
+    Args:
+        after: cursor of the last book on the previous page
+        before: cursor of the first book on the following page (paging back)
+        limit: page size, capped at MAX_CATALOG_PAGE_SIZE
+        
+    Returns:
+        dict: {'books', 'next_cursor', 'prev_cursor', 'limit'}; cursors are
+        None at either end of the catalog
     """
+    limit = max(1, min(int(limit), MAX_CATALOG_PAGE_SIZE))
+    after_key = decode_page_cursor(after)
+    before_key = decode_page_cursor(before)
+
+    if before_key is not None:
+        books = get_books_page(before=before_key, limit=limit + 1)
+        has_prev = len(books) > limit
+        books = books[1:] if has_prev else books
+        has_next = True
+    else:
+        books = get_books_page(after=after_key, limit=limit + 1)
+        has_next = len(books) > limit
+        books = books[:limit]
+        has_prev = after_key is not None
+
+    return {
+        'books': books,
+        'next_cursor': encode_page_cursor(books[-1]) if books and has_next else None,
+        'prev_cursor': encode_page_cursor(books[0]) if books and has_prev else None,
+        'limit': limit
+    }
+
+@timed
+def search_books_in_catalog(search_term: str, search_type: str,
+                            limit: int = 50, offset: int = 0) -> List[Dict]:
+    """
+    Search for books in the catalog.
+    Implements R6: Book Search Functionality
     
-    return []
+    Args:
+        search_term: Text to search for
+        search_type: 'title' or 'author' (partial, case-insensitive) or 'isbn' (exact)
+        limit: Maximum number of results
+        offset: Number of results to skip (for paging through results)
+        
+    Returns:
+        list: Matching books in catalog format, best matches first
+    """
+    if not isinstance(search_term, str) or not search_term.strip():
+        return []
+    search_term = search_term.strip()
+
+    if search_type == 'isbn':
+        if not search_term.isdigit() or len(search_term) != 13 or offset > 0:
+            return []
+        book = get_book_by_isbn(search_term)
+        return [book] if book else []
 
-def get_patron_status_report(patron_id: str) -> Dict:
+    if search_type not in ('title', 'author'):
+        return []
+
+    return search_books(search_term, search_type, limit=limit, offset=offset)
+
+@timed
+def get_patron_status_report(patron_id: str, history_cursor: Optional[str] = None,
+                             history_limit: int = HISTORY_PAGE_SIZE) -> Dict:
     """
     Get status report for a patron.
+    Implements R7: Patron Status Report
+    
+    Counts come from the patron_summary row maintained by the borrow and
+    return paths; current loans and their late fees come from one joined
+    query; total_late_fees is what is still owed net of payments, from the
+    query pay_all_late_fees() charges; history is paged so its cost does
+    not grow with loan count.
     
-    TODO: Implement R7 as per requirements
+    Args:
+        patron_id: 6-digit library card ID
+        history_cursor: next_history_cursor from the previous page
+        history_limit: history page size, capped at MAX_CATALOG_PAGE_SIZE
+        
+    Returns:
+        dict: current_borrowed, borrow_count, total_late_fees, total_loans,
+        last_activity, history and history_next_cursor (status 'Error' with
+        a message for an invalid patron ID)
+    """
+    error, history_limit, lookups = patron_status_lookups(patron_id, history_cursor, history_limit)
+    if error:
+        return error
+    return build_patron_status_report(patron_id, history_limit, *(lookup() for lookup in lookups))
+
+def patron_status_lookups(patron_id: str, history_cursor: Optional[str] = None,
+                          history_limit: int = HISTORY_PAGE_SIZE) -> Tuple[Optional[Dict], int, List]:
     """
-    return {}
+    Validate a status report request and list the queries it needs.
+    
+    The summary, current-loan, outstanding-fee and history queries are
+    independent, so callers may run them in any order or at the same time.
+    
+    Returns:
+        tuple: (error dict or None, clamped history limit, the four queries
+        as zero-argument callables)
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return {'status': 'Error', 'message': 'Invalid patron ID. Must be exactly 6 digits.'}, 0, []
+    history_limit = max(1, min(int(history_limit), MAX_CATALOG_PAGE_SIZE))
+    before = decode_cursor(history_cursor, (int,))
+
+    def current():
+        return get_patron_current_loans(
+            patron_id, datetime.now(),
+            first_tier_days=LATE_FEE_FIRST_TIER_DAYS,
+            first_tier_rate=LATE_FEE_FIRST_TIER_RATE,
+            later_rate=LATE_FEE_LATER_RATE,
+            max_fee=LATE_FEE_MAX
+        )
+
+    def history():
+        return get_patron_history(patron_id, before_id=before[0] if before else None,
+                                  limit=history_limit + 1)
+
+    return None, history_limit, [lambda: get_patron_summary(patron_id), current,
+                                 lambda: _outstanding_fees(patron_id), history]
+
+def build_patron_status_report(patron_id: str, history_limit: int, summary: Optional[Dict],
+                               current: List[Dict], outstanding: List[Dict],
+                               history: List[Dict]) -> Dict:
+    """Assemble a status report from the results of patron_status_lookups()."""
+    summary = summary or {'open_loans': 0, 'total_loans': 0, 'last_activity': None}
+    for loan in current:
+        loan['fee_amount'] = round(loan['fee_amount'], 2)
+        loan['is_overdue'] = loan['days_overdue'] > 0
+
+    has_more = len(history) > history_limit
+    history = history[:history_limit]
+
+    return {
+        'status': 'OK',
+        'patron_id': patron_id,
+        'current_borrowed': current,
+        'borrow_count': summary['open_loans'],
+        'total_late_fees': round(sum(loan['outstanding'] for loan in outstanding), 2),
+        'total_loans': summary['total_loans'],
+        'last_activity': summary['last_activity'],
+        'history': history,
+        'history_next_cursor': encode_cursor([history[-1]['record_id']]) if has_more else None
+    }
@@ -1,6 +1,18 @@
-from typing import Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List, Optional, Tuple
+import threading
+import time
 
-__all__ = ["PaymentGatewayError", "PaymentGateway"]
+__all__ = ["PaymentGatewayError", "PaymentGateway", "process_payments", "RecentResults",
+           "recent_payments"]
+
+# Bounded fan-out used when a gateway has no batch endpoint
+PAYMENT_MAX_WORKERS = 5
+PAYMENT_CALL_TIMEOUT = 10.0  # seconds per gateway call
+# Successful outcomes kept in memory to answer retries without a lookup
+RECENT_RESULTS_TTL = 600.0  # seconds
+RECENT_RESULTS_SIZE = 4096
 
 class PaymentGatewayError(Exception):
     """Raised for gateway-level failures."""
@@ -12,5 +24,131 @@ class PaymentGateway:
         # Stubbed default; real impl would call a provider
         return True, "txn_demo"
 
+    def process_payments(self, payments: List[Tuple[str, float, str]]) -> List[Tuple[bool, str]]:
+        """
+        Charge several (patron_id, amount, memo) payments in one round trip.
+        Returns one (ok, transaction id or decline reason) pair per payment, in order.
+        """
+        return [(True, "txn_demo") for _ in payments]
+
     def refund_payment(self, transaction_id: str, amount: float) -> Tuple[bool, str]:
         return True, "refund_demo"
+
+
+def process_payments(gateway, payments: List[Tuple[str, float, str]],
+                     max_workers: int = PAYMENT_MAX_WORKERS,
+                     timeout: float = PAYMENT_CALL_TIMEOUT) -> List[Tuple[Optional[bool], str]]:
+    """
+    Charge (patron_id, amount, memo) payments, in one batch call when the
+    gateway supports it and otherwise as single calls over a bounded pool.
+
+    A batch call that raises fails every payment rather than falling back,
+    since some charges may already have gone through. A single call that
+    raises fails only its own payment, as does one still queued at the
+    deadline. One already running at the deadline is left to finish and may
+    still settle, so its ok is None (outcome unknown) rather than False:
+    callers must not retry it as a failure.
+
+    Returns:
+        list: (ok, transaction id or failure message) per payment, in order
+    """
+    if not payments:
+        return []
+
+    batch = getattr(gateway, "process_payments", None)
+    if batch is not None:
+        try:
+            results = batch(payments)
+        except NotImplementedError:
+            results = None
+        except Exception as e:
+            return [(False, f"Payment error: {type(e).__name__}")] * len(payments)
+        if isinstance(results, list) and len(results) == len(payments):
+            return [(True, ref) if ok else (False, f"Payment declined: {ref}") for ok, ref in results]
+
+    def charge(payment):
+        patron_id, amount, memo = payment
+        try:
+            ok, ref = gateway.process_payment(patron_id, amount, memo=memo)
+        except Exception as e:
+            return False, f"Payment error: {type(e).__name__}"
+        return (True, ref) if ok else (False, f"Payment declined: {ref}")
+
+    workers = max(1, min(max_workers, len(payments)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="payment")
+    try:
+        futures = [executor.submit(charge, payment) for payment in payments]
+        # Payments beyond the pool size wait for a worker, so they get extra rounds
+        deadline = time.monotonic() + timeout * -(-len(payments) // workers)
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FutureTimeoutError:
+                # Cancel if it has not started; otherwise the charge may still go through
+                if future.cancel():
+                    results.append((False, "Payment error: timeout"))
+                else:
+                    results.append((None, "Payment pending: timeout"))
+        return results
+    finally:
+        # Do not wait for calls that timed out
+        executor.shutdown(wait=False)
+
+
+class RecentResults:
+    """
+    Suppresses duplicate payment and refund requests by idempotency key.
+
+    Successful outcomes are remembered for `ttl` seconds and returned as-is
+    to repeats. Concurrent requests with the same key share one call: the
+    first runs it and the others wait for its outcome. Failures are shared
+    with requests already waiting but not remembered, so a later retry runs.
+    With remember=False only the sharing applies and nothing is stored.
+    """
+
+    def __init__(self, ttl: float = RECENT_RESULTS_TTL, max_size: int = RECENT_RESULTS_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._results = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: str, call: Callable[[], Tuple[bool, Any]],
+            remember: bool = True) -> Tuple[bool, Any]:
+        """Return the remembered (ok, result) outcome for key, or the outcome of call()."""
+        with self._lock:
+            cached = self._results.get(key) if remember else None
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+            pending = self._in_flight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._in_flight[key] = Future()
+        if not leader:
+            return pending.result()
+
+        try:
+            outcome = call()
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            pending.set_result(outcome)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if remember and pending.exception() is None and outcome[0]:
+                    self._results[key] = (time.monotonic() + self.ttl, outcome)
+                    self._results.move_to_end(key)
+                    while len(self._results) > self.max_size:
+                        self._results.popitem(last=False)
+        return outcome
+
+    def clear(self):
+        """Forget every remembered outcome."""
+        with self._lock:
+            self._results.clear()
+
+
+recent_payments = RecentResults()
@@ -0,0 +1,220 @@
+"""
+Synthetic Data Service - Deterministic large-scale catalogs and loan histories
+The same seed and clock always produce the same rows, so tests, benchmarks and
+profiling runs can share identical data
+"""
+
+import random
+import time
+from datetime import datetime
+from itertools import accumulate
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from database import SECONDS_PER_DAY, bulk_load, get_max_book_id, get_open_loan_counts, to_epoch
+from services.library_service import LOAN_PERIOD_DAYS, MAX_BORROWED_BOOKS
+
+__all__ = ["isbn13_check_digit", "generate_dataset"]
+
+ADJECTIVES = (
+    "Silent", "Hidden", "Last", "Golden", "Broken", "Wild", "Secret", "Dark", "Lost", "Little",
+    "Great", "Burning", "Frozen", "Crimson", "Distant", "Forgotten", "Quiet", "Endless", "Bitter",
+    "Hollow", "Iron", "Painted", "Shining", "Stolen", "Sacred", "Restless", "Wandering", "Midnight",
+    "Northern", "Glass", "Velvet", "Final", "Ancient", "Bright", "Savage", "Gentle",
+)
+NOUNS = (
+    "River", "House", "Garden", "Kingdom", "Shadow", "Road", "Sea", "Mountain", "City", "Forest",
+    "Winter", "Summer", "Heart", "Crown", "Storm", "Island", "Bridge", "Mirror", "Letter", "Song",
+    "Empire", "Harbor", "Orchard", "Tower", "Promise", "Fire", "Night", "Station", "Library",
+    "Voyage", "Daughter", "Stranger", "Machine", "Meadow", "Field", "Lantern", "Engine", "Silence",
+)
+FIRST_NAMES = (
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David",
+    "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah",
+    "Charles", "Karen", "Wei", "Aiko", "Omar", "Priya", "Santiago", "Ingrid", "Kwame", "Lucia",
+    "Dmitri", "Amara", "Hiroshi", "Fatima", "Mateo", "Sofia", "Arjun", "Noor", "Emeka", "Chloe",
+)
+LAST_NAMES = (
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+    "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Thompson", "White", "Harris", "Clark", "Lewis", "Walker", "Hall", "Young", "King",
+    "Nguyen", "Chen", "Okafor", "Tanaka", "Kowalski", "Haddad", "Novak", "Silva", "Rossi", "Ivanova",
+    "Patel", "Kim", "Cohen", "Mensah", "Larsen", "Dubois", "Fischer", "Costa", "Murphy", "Sato",
+)
+TITLE_PATTERNS = (
+    "The {adj} {noun}", "{noun} of {noun2}", "The {noun} and the {noun2}", "{adj} {noun}",
+    "A {noun} in {noun2}", "The {adj} {noun} of {noun2}",
+)
+
+# Real ISBN-13s use the 978 and 979 prefixes; 979-8 keeps generated numbers
+# clear of the sample data and leaves 10**8 unique values
+ISBN_PREFIX = "9798"
+ISBN_SPACE = 10 ** 8
+# Coprime with 10**8, so i -> (i * ISBN_STRIDE) % ISBN_SPACE never repeats
+ISBN_STRIDE = 48271
+HISTORY_GAP_DAYS = 30
+MAX_RETURN_DAYS = 28
+MAX_OVERDUE_DAYS = 60
+
+
+def isbn13_check_digit(first12: str) -> str:
+    """Return the ISBN-13 check digit for the first 12 digits."""
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+# Weighted digit sums of every 4-digit block (weights 1, 3, 1, 3) and of the
+# prefix, so a check digit costs two lookups instead of twelve multiplications
+_BLOCK_SUMS = [sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(f"{block:04d}"))
+               for block in range(10000)]
+_PREFIX_SUM = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(ISBN_PREFIX))
+
+
+def _isbn(index: int, offset: int) -> str:
+    number = (offset + index * ISBN_STRIDE) % ISBN_SPACE
+    total = _PREFIX_SUM + _BLOCK_SUMS[number // 10000] + _BLOCK_SUMS[number % 10000]
+    return f"{ISBN_PREFIX}{number:08d}{(10 - total % 10) % 10}"
+
+
+def _zipf_cum_weights(size: int, skew: float) -> List[float]:
+    """Cumulative weights where rank k is picked with probability ~ 1 / k**skew."""
+    return list(accumulate(1.0 / (rank ** skew) for rank in range(1, size + 1)))
+
+
+def _author_name(index: int) -> str:
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    generation = index // (len(FIRST_NAMES) * len(LAST_NAMES))
+    if generation:
+        return f"{first} {chr(ord('A') + (generation - 1) % 26)}. {last}"
+    return f"{first} {last}"
+
+
+def _generate_books(rng: random.Random, count: int, skew: float, first_index: int = 0) -> List[List]:
+    """
+    Build [title, author, isbn, total_copies, available_copies] rows.
+
+    ISBNs are numbered from `first_index`, so loads that continue after the
+    existing books do not repeat the ISBNs of an earlier load with the same seed.
+    """
+    adjectives = rng.choices(ADJECTIVES, cum_weights=_zipf_cum_weights(len(ADJECTIVES), skew), k=count)
+    nouns = rng.choices(NOUNS, cum_weights=_zipf_cum_weights(len(NOUNS), skew), k=count * 2)
+    patterns = rng.choices(TITLE_PATTERNS, k=count)
+    # A few prolific authors and a long tail of one-book authors
+    author_count = max(1, count // 8)
+    author_names = [_author_name(index) for index in range(author_count)]
+    authors = rng.choices(author_names, cum_weights=_zipf_cum_weights(author_count, skew), k=count)
+    copies = rng.choices((1, 2, 3, 4, 5), weights=(35, 30, 20, 10, 5), k=count)
+    offset = rng.randrange(ISBN_SPACE)
+
+    return [[pattern.format(adj=adj, noun=noun, noun2=noun2), author, _isbn(first_index + i, offset), n, n]
+            for i, (pattern, adj, noun, noun2, author, n)
+            in enumerate(zip(patterns, adjectives, nouns[0::2], nouns[1::2], authors, copies))]
+
+
+def generate_dataset(books: int = 10000, patrons: int = 2000, loans: int = 50000,
+                     years: int = 3, open_loans: Optional[int] = None,
+                     overdue_ratio: float = 0.15, popularity_skew: float = 1.1,
+                     seed: int = 42, now: Optional[datetime] = None) -> Dict:
+    """
+    Generate a catalog, patrons and borrow history and bulk load them.
+
+    Books and patrons are picked with a Zipf-like popularity skew, so a few
+    titles and readers account for most loans. Returned loans are spread over
+    the last `years` years; open loans respect the copy and per-patron
+    borrowing limits, and `overdue_ratio` of them are past their due date.
+
+    Args:
+        books: number of books to add
+        patrons: number of distinct patron IDs (at most 900000)
+        loans: total number of loans, open ones included
+        years: span of the returned-loan history
+        open_loans: loans still out (default: one per patron, capped by the limits)
+        overdue_ratio: fraction of open loans that are overdue
+        popularity_skew: Zipf exponent for books, authors, title words and patrons
+        seed: random seed; the same seed and `now` give identical rows
+        now: reference time for all dates (default: the current time)
+
+    Returns:
+        dict: counts of books, patrons, loans, open_loans and overdue_loans,
+        the first book id and the elapsed seconds
+    """
+    if books <= 0 or patrons <= 0 or loans < 0:
+        raise ValueError("books and patrons must be positive and loans non-negative")
+    if patrons > 900000:
+        raise ValueError("Patron IDs are 6 digits; at most 900000 patrons are supported")
+    if not 0.0 <= overdue_ratio <= 1.0:
+        raise ValueError("overdue_ratio must be between 0 and 1")
+
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    now_epoch = to_epoch(now or datetime.now())
+    first_id = get_max_book_id() + 1
+
+    book_rows = _generate_books(rng, books, popularity_skew, first_id - 1)
+    # Popularity rank -> book, shuffled so popular books are spread over the ids
+    ranked_books = list(range(books))
+    rng.shuffle(ranked_books)
+    book_weights = _zipf_cum_weights(books, popularity_skew)
+    patron_ids = [f"{100000 + i:06d}" for i in range(patrons)]
+    rng.shuffle(patron_ids)
+    patron_weights = _zipf_cum_weights(patrons, popularity_skew)
+
+    if open_loans is None:
+        open_loans = patrons
+    open_loans = min(open_loans, loans, patrons * MAX_BORROWED_BOOKS)
+    loan_rows: List[Tuple] = []
+    loan_period = LOAN_PERIOD_DAYS * SECONDS_PER_DAY
+
+    # Open loans: draw in batches, keeping each book and patron within its
+    # limits, counting the loans patrons already have open in the database
+    out_by_patron = get_open_loan_counts()
+    overdue = 0
+    for _ in range(100):
+        wanted = open_loans - len(loan_rows)
+        if wanted <= 0:
+            break
+        candidates = zip(rng.choices(ranked_books, cum_weights=book_weights, k=wanted * 2),
+                         rng.choices(patron_ids, cum_weights=patron_weights, k=wanted * 2))
+        for book, patron in candidates:
+            if len(loan_rows) >= open_loans:
+                break
+            if book_rows[book][4] == 0 or out_by_patron.get(patron, 0) >= MAX_BORROWED_BOOKS:
+                continue
+            book_rows[book][4] -= 1
+            out_by_patron[patron] = out_by_patron.get(patron, 0) + 1
+            if rng.random() < overdue_ratio:
+                overdue += 1
+                due = now_epoch - rng.randint(1, MAX_OVERDUE_DAYS * SECONDS_PER_DAY)
+            else:
+                due = now_epoch + rng.randint(1, loan_period)
+            loan_rows.append((patron, first_id + book, due - loan_period, due, None))
+    opened = len(loan_rows)
+
+    # Returned history, drawn in one batch per column
+    history = loans - opened
+    history_books = rng.choices(ranked_books, cum_weights=book_weights, k=history)
+    history_patrons = rng.choices(patron_ids, cum_weights=patron_weights, k=history)
+    span = max(1, years * 365 - HISTORY_GAP_DAYS) * SECONDS_PER_DAY
+    oldest = now_epoch - span - HISTORY_GAP_DAYS * SECONDS_PER_DAY
+    return_span = (MAX_RETURN_DAYS - 1) * SECONDS_PER_DAY
+    random_float = rng.random
+    # The generator draws each borrow date just before the row draws its return date
+    borrow_dates = (oldest + int(random_float() * span) for _ in range(history))
+    loan_rows.extend((patron, first_id + book, borrowed, borrowed + loan_period,
+                      borrowed + SECONDS_PER_DAY + int(random_float() * return_span))
+                     for patron, book, borrowed in zip(history_patrons, history_books, borrow_dates))
+
+    # Insert in borrow order, as the application would have
+    loan_rows.sort(key=itemgetter(2))
+    bulk_load([(first_id + i, *book) for i, book in enumerate(book_rows)], loan_rows)
+
+    return {
+        'books': books,
+        'patrons': patrons,
+        'loans': len(loan_rows),
+        'open_loans': opened,
+        'overdue_loans': overdue,
+        'first_book_id': first_id,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,208 @@
+"""
+Slow query log module for Library Management System
+Records statements slower than a threshold, with their query plan, to a
+rotating JSON-lines file, and summarizes such files by query fingerprint
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from flask import has_request_context, request
+
+# Off unless a path is configured (LIBRARY_SLOW_QUERY_LOG or SLOW_QUERY_LOG in app.config)
+SLOW_QUERY_LOG = os.environ.get('LIBRARY_SLOW_QUERY_LOG') or None
+SLOW_QUERY_THRESHOLD_MS = 100.0
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+# Statement kinds that EXPLAIN QUERY PLAN can describe
+_EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete', 'replace')
+# Frames inside the connection wrapper are not interesting callers
+_WRAPPER_FRAMES = ('execute', 'executemany', '_observe')
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and replace literal strings and numbers with '?'."""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql: str) -> str:
+    """Short stable identifier for a normalized statement."""
+    return hashlib.sha1(normalized_sql.encode('utf-8')).hexdigest()[:12]
+
+
+def parameter_shape(parameters, many: bool = False):
+    """Describe bound parameters by type only, so no values reach the log."""
+    if many:
+        return {'executemany': True}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def find_callers() -> Dict[str, Optional[str]]:
+    """Return the database helper, service function and route behind the current statement."""
+    callers = {'helper': None, 'service': None, 'route': None}
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        name = frame.f_code.co_name
+        if module == 'database' and callers['helper'] is None and name not in _WRAPPER_FRAMES:
+            callers['helper'] = name
+        elif module.startswith('services.') and callers['service'] is None:
+            callers['service'] = f"{module[len('services.'):]}.{name}"
+        frame = frame.f_back
+    if has_request_context():
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        callers['route'] = f"{request.method} {rule}"
+    return callers
+
+
+class SlowQueryLog:
+    """
+    Writes one JSON line per statement that took at least threshold_ms.
+
+    The EXPLAIN QUERY PLAN output is captured the first time each query
+    fingerprint is logged by this process. Timings cover execute() itself;
+    for SELECT statements that is the time to the first row.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.threshold = SLOW_QUERY_THRESHOLD_MS / 1000
+        self._logger = logging.getLogger('library.slow_queries')
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._handler = None
+        self._explained = set()
+        self._lock = threading.Lock()
+
+    def configure(self, path: Optional[str], threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+                  max_bytes: int = SLOW_QUERY_LOG_MAX_BYTES, backups: int = SLOW_QUERY_LOG_BACKUPS):
+        """Start logging to path (rotating at max_bytes), or stop if path is None."""
+        with self._lock:
+            if self._handler is not None:
+                self._logger.removeHandler(self._handler)
+                self._handler.close()
+                self._handler = None
+            self.path = path
+            self.threshold = threshold_ms / 1000
+            self._explained.clear()
+            if path:
+                self._handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                    encoding='utf-8')
+                self._handler.setFormatter(logging.Formatter('%(message)s'))
+                self._logger.addHandler(self._handler)
+            self.enabled = bool(path)
+
+    def maybe_record(self, conn, sql: str, parameters, seconds: float, many: bool = False):
+        """Log the statement if it ran for at least the threshold."""
+        if seconds < self.threshold:
+            return
+        normalized = normalize_sql(sql)
+        key = fingerprint(normalized)
+        with self._lock:
+            first = key not in self._explained
+            self._explained.add(key)
+        entry = {
+            'ts': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            'duration_ms': round(seconds * 1000, 3),
+            'fingerprint': key,
+            'sql': normalized,
+            'params': parameter_shape(parameters, many),
+            'caller': find_callers(),
+        }
+        if first:
+            entry['plan'] = self._explain(conn, sql, parameters, many)
+        self._logger.info(json.dumps(entry))
+
+    @staticmethod
+    def _explain(conn, sql: str, parameters, many: bool) -> Optional[List[str]]:
+        words = sql.split(None, 1)
+        if many or not words or words[0].lower() not in _EXPLAINABLE:
+            return None
+        try:
+            # Call the base class directly so the plan query is not timed itself
+            rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+        except sqlite3.Error:
+            return None
+        return [row[3] for row in rows]
+
+
+slow_log = SlowQueryLog()
+
+
+def init_app(app):
+    """Configure the slow query log from app.config."""
+    slow_log.configure(app.config.get('SLOW_QUERY_LOG', SLOW_QUERY_LOG),
+                       app.config.get('SLOW_QUERY_THRESHOLD_MS', SLOW_QUERY_THRESHOLD_MS),
+                       app.config.get('SLOW_QUERY_LOG_MAX_BYTES', SLOW_QUERY_LOG_MAX_BYTES),
+                       app.config.get('SLOW_QUERY_LOG_BACKUPS', SLOW_QUERY_LOG_BACKUPS))
+
+
+def log_files(path: str) -> List[str]:
+    """The log file and its rotated backups, oldest first."""
+    rotated = [name for name in glob.glob(glob.escape(path) + '.*') if name.rsplit('.', 1)[1].isdigit()]
+    rotated.sort(key=lambda name: int(name.rsplit('.', 1)[1]), reverse=True)
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def iter_entries(paths: Iterable[str]) -> Iterator[Dict]:
+    """Yield log entries from JSON-lines files, skipping malformed lines."""
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and 'fingerprint' in entry:
+                    yield entry
+
+
+def summarize(entries: Iterable[Dict]) -> List[Dict]:
+    """
+    Group log entries by fingerprint.
+
+    Returns:
+        list: one dict per query with fingerprint, sql, count, total_ms,
+        p99_ms, max_ms, callers and plan, largest total_ms first
+    """
+    groups: Dict[str, Dict] = {}
+    for entry in entries:
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'], 'sql': entry.get('sql'),
+            'durations': [], 'callers': set(), 'plan': None,
+        })
+        group['durations'].append(float(entry.get('duration_ms', 0)))
+        caller = entry.get('caller') or {}
+        group['callers'].add(' / '.join(part for part in (
+            caller.get('route'), caller.get('service'), caller.get('helper')) if part) or 'unknown')
+        if group['plan'] is None and entry.get('plan'):
+            group['plan'] = entry['plan']
+
+    summary = []
+    for group in groups.values():
+        durations = sorted(group.pop('durations'))
+        rank = max(0, -(-99 * len(durations) // 100) - 1)  # nearest-rank p99
+        summary.append(dict(group, count=len(durations), total_ms=round(sum(durations), 3),
+                            p99_ms=durations[rank], max_ms=durations[-1],
+                            callers=sorted(group['callers'])))
+    summary.sort(key=lambda row: row['total_ms'], reverse=True)
+    return summary
@@ -0,0 +1,90 @@
+# tests/test_async_api.py
+import asyncio
+import inspect
+import threading
+import pytest
+import database
+from app import create_app
+from services import async_service
+
+
+@pytest.fixture
+def clients(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "async_api.db"))
+    database.init_database()
+    database.add_sample_data()
+    sync_app = create_app({"TESTING": True, "API_ASYNC": False})
+    async_app = create_app({"TESTING": True, "API_ASYNC": True})
+    yield sync_app.test_client(), async_app.test_client()
+    database.get_pool().close_all()
+
+
+def test_async_views_are_coroutines_on_the_same_urls():
+    app = create_app({"TESTING": True, "API_ASYNC": True})
+    assert inspect.iscoroutinefunction(app.view_functions["api.get_late_fee"])
+    assert inspect.iscoroutinefunction(app.view_functions["api.search_books_api"])
+    assert not inspect.iscoroutinefunction(app.view_functions["api.metrics_api"])
+    sync_rules = {rule.rule for rule in create_app({"API_ASYNC": False}).url_map.iter_rules()}
+    assert {rule.rule for rule in app.url_map.iter_rules()} == sync_rules
+
+
+@pytest.mark.parametrize("path", [
+    "/api/late_fee/123456/3",
+    "/api/late_fee/12/3",
+    "/api/patron/123456/status",
+    "/api/patron/12/status",
+    "/api/search?q=gatsby",
+    "/api/search",
+    "/api/books?limit=2",
+    "/api/late_fees/overdue",
+])
+def test_async_responses_match_sync(clients, path):
+    sync_client, async_client = clients
+    expected, actual = sync_client.get(path), async_client.get(path)
+    assert actual.status_code == expected.status_code
+    assert actual.get_json() == expected.get_json()
+
+
+def test_async_batch_endpoints_and_conditional_get(clients):
+    _, client = clients
+    borrowed = client.post("/api/borrow/batch", json={"patron_id": "654321", "book_ids": [1, 2]})
+    assert borrowed.status_code == 200 and borrowed.get_json()["status"] == "OK"
+    assert client.post("/api/borrow/batch", json={"patron_id": "654321", "book_ids": []}).status_code == 400
+    returned = client.post("/api/return/batch", json={"patron_id": "654321", "book_ids": [1, 2]})
+    assert returned.get_json()["status"] == "OK"
+
+    first = client.get("/api/books")
+    assert client.get("/api/books", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+
+def test_status_report_queries_run_concurrently(monkeypatch):
+    # Each lookup waits for the other three: run one after another they would time out
+    barrier = threading.Barrier(4, timeout=5)
+
+    def lookup(value):
+        def run():
+            barrier.wait()
+            return value
+        return run
+
+    summary = {"open_loans": 0, "total_loans": 2, "last_activity": None}
+    monkeypatch.setattr(async_service, "patron_status_lookups",
+                        lambda patron_id, cursor, limit: (None, limit, [lookup(summary), lookup([]), lookup([]), lookup([])]))
+    report = asyncio.run(async_service.get_patron_status_report_async("123456"))
+    assert report["status"] == "OK" and report["total_loans"] == 2
+
+
+
+def test_async_conditional_get_looks_up_the_version_on_the_executor(clients, monkeypatch):
+    from routes import caching
+    _, client = clients
+    threads = []
+
+    def get_catalog_version():
+        threads.append(threading.current_thread().name)
+        return database.get_catalog_version()
+
+    monkeypatch.setattr(caching, "get_catalog_version", get_catalog_version)
+    first = client.get("/api/books")
+    assert client.get("/api/books", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert len(threads) == 2 and all(name.startswith("library-async") for name in threads)
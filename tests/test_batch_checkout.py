@@ -0,0 +1,77 @@
+# tests/test_batch_checkout.py
+from datetime import datetime, timedelta
+import database
+from app import create_app
+from services import library_service as ls
+
+
+def _books(isbn_prefix, copies):
+    book_ids = []
+    for i, count in enumerate(copies):
+        isbn = f"{isbn_prefix}{i:03d}"
+        assert database.insert_book(f"Kiosk {isbn}", "Kiosk Author", isbn, max(count, 1), count)
+        book_ids.append(database.get_book_by_isbn(isbn)["id"])
+    return book_ids
+
+
+def test_borrow_batch_applies_available_books_in_one_go():
+    books = _books("9220000000", [1, 0, 2])
+    result = ls.borrow_books_by_patron("720001", books + [999999])
+
+    assert result["status"] == "Partial"
+    assert [item["success"] for item in result["results"]] == [True, False, True, False]
+    assert result["results"][1]["message"] == "This book is currently not available."
+    assert result["results"][3]["message"] == "Book not found."
+    assert database.get_patron_borrow_count("720001") == 2
+    assert [database.get_book_by_id(book_id)["available_copies"] for book_id in books] == [0, 0, 1]
+
+
+def test_borrow_batch_checks_limit_against_whole_stack():
+    books = _books("9220000001", [1, 1, 1, 1])
+    assert ls.borrow_book_by_patron("720002", books[0])[0]
+    assert ls.borrow_book_by_patron("720002", books[1])[0]
+
+    result = ls.borrow_books_by_patron("720002", books[2:] + _books("9220000002", [1, 1]))
+    assert result["status"] == "Failed" and "limit of 5" in result["message"]
+    assert database.get_patron_borrow_count("720002") == 2
+    assert database.get_book_by_id(books[2])["available_copies"] == 1
+
+
+def test_batch_requests_are_validated():
+    assert ls.borrow_books_by_patron("72000", [1])["status"] == "Error"
+    assert ls.borrow_books_by_patron("720003", [])["status"] == "Error"
+    assert ls.borrow_books_by_patron("720003", [1, 1])["status"] == "Error"
+    assert ls.return_books_by_patron("720003", ["1"])["status"] == "Error"
+    assert ls.return_books_by_patron("720003", list(range(1, 8)))["status"] == "Error"
+
+
+def test_return_batch_closes_loans_and_reports_fees():
+    books = _books("9220000003", [0, 0, 1])
+    now = datetime.now()
+    for book_id, days_late in zip(books[:2], (10, -2)):
+        due = now - timedelta(days=days_late)
+        assert database.insert_borrow_record("720004", book_id, due - timedelta(days=14), due)
+
+    result = ls.return_books_by_patron("720004", books)
+    assert result["status"] == "Partial" and result["total_late_fees"] == 6.5
+    first, second, third = result["results"]
+    assert first["success"] and first["days_overdue"] == 10 and first["fee_amount"] == 6.5
+    assert second["success"] and second["fee_amount"] == 0.0
+    assert not third["success"] and "not borrowed" in third["message"]
+    assert database.get_patron_borrow_count("720004") == 0
+    assert [database.get_book_by_id(book_id)["available_copies"] for book_id in books] == [1, 1, 1]
+    assert ls.calculate_late_fee_for_book("720004", books[0])["fee_amount"] == 6.5
+
+
+def test_batch_api_endpoints():
+    books = _books("9220000004", [1, 1])
+    client = create_app().test_client()
+
+    response = client.post("/api/borrow/batch", json={"patron_id": "720005", "book_ids": books})
+    assert response.status_code == 200 and response.get_json()["status"] == "OK"
+    response = client.post("/api/borrow/batch", json={"patron_id": "720006", "book_ids": books})
+    assert response.status_code == 409
+    response = client.post("/api/return/batch", json={"patron_id": "720005", "book_ids": books})
+    assert response.status_code == 200
+    assert response.get_json()["message"] == "Returned 2 of 2 books."
+    assert client.post("/api/return/batch", data="not json").status_code == 400
@@ -0,0 +1,82 @@
+# tests/test_benchmarks.py
+import json
+import threading
+import database
+from benchmarks import suite
+from benchmarks.__main__ import main
+
+
+def test_parse_size():
+    assert suite.parse_size("1k") == 1000
+    assert suite.parse_size("100K") == 100000
+    assert suite.parse_size("1M") == 1000000
+    assert suite.parse_size("250") == 250
+
+
+def test_small_suite_reports_percentiles(tmp_path):
+    previous = database.DATABASE
+    report = suite.run_suite([200], iterations=5, heavy_iterations=2, data_dir=str(tmp_path))
+    assert database.DATABASE == previous
+    stats = report["results"]["200"]
+    assert set(stats) >= {"add_book_to_catalog", "borrow_book_by_patron", "get_all_books",
+                          "calculate_late_fee_for_book", "search_books_in_catalog",
+                          "search_books_in_catalog (frequent term)", "GET /catalog"}
+    assert stats["get_all_books"]["iterations"] == 2
+    for entry in stats.values():
+        assert entry["p50_ms"] <= entry["p95_ms"] <= entry["p99_ms"]
+        assert entry["ops_per_sec"] > 0
+
+
+def test_run_size_stops_the_writer_thread_and_replica(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "WRITE_QUEUE_ENABLED", True)
+    monkeypatch.setattr(database, "READ_REPLICA_ENABLED", True)
+    suite.run_size(100, iterations=2, heavy_iterations=1, data_dir=str(tmp_path),
+                   only={"borrow_book_by_patron", "get_all_books"})
+    assert not any(t.name == "library-db-writer" and t.is_alive() for t in threading.enumerate())
+    assert database._read_replica.database != database.DATABASE and database._read_replica._copy is None
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": {"1000": {"a": {"p95_ms": 1.0, "ops_per_sec": 100.0}}}}
+    same = {"results": {"1000": {"a": {"p95_ms": 1.1, "ops_per_sec": 95.0}}}}
+    slower = {"results": {"1000": {"a": {"p95_ms": 2.0, "ops_per_sec": 50.0},
+                                   "new": {"p95_ms": 9.0, "ops_per_sec": 1.0}}}}
+    assert suite.compare(same, baseline) == []
+    metrics = {r["metric"] for r in suite.compare(slower, baseline)}
+    assert metrics == {"p95_ms", "ops_per_sec"}
+
+
+def test_cli_writes_json_and_fails_on_regression(tmp_path, capsys):
+    output = tmp_path / "bench.json"
+    args = ["--sizes", "100", "--iterations", "3", "--heavy-iterations", "1",
+            "--only", "get_all_books", "--data-dir", str(tmp_path)]
+    assert main(args + ["--output", str(output)]) == 0
+    report = json.loads(output.read_text())
+    assert list(report["results"]["100"]) == ["get_all_books"]
+
+    report["results"]["100"]["get_all_books"].update(p95_ms=1e-6, ops_per_sec=1e9)
+    output.write_text(json.dumps(report))
+    assert main(args + ["--baseline", str(output)]) == 1
+    assert "REGRESSION" in capsys.readouterr().err
+
+
+def test_measure_concurrent_counts_every_call():
+    seen = set()
+    lock = threading.Lock()
+
+    def operation(client, i):
+        with lock:
+            seen.add((client, i))
+
+    stats = suite.measure_concurrent(operation, clients=4, iterations=20)
+    assert stats["iterations"] == 20 and stats["clients"] == 4
+    assert seen == {(client, i) for client in range(4) for i in range(5)}
+    assert stats["p50_ms"] <= stats["p99_ms"]
+
+
+def test_concurrent_api_modes_are_opt_in(tmp_path):
+    names = ["concurrent /api (sync)", "concurrent /api (async)"]
+    assert suite.run_size(100, iterations=2, only=names, data_dir=str(tmp_path)) == {}
+    results = suite.run_size(100, iterations=2, only=names, data_dir=str(tmp_path), clients=2)
+    assert list(results) == names
+    assert all(stats["iterations"] == 4 and stats["clients"] == 2 for stats in results.values())
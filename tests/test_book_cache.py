@@ -0,0 +1,49 @@
+# tests/test_book_cache.py
+import database
+from book_cache import BookCache
+from services.library_service import borrow_book_by_patron
+
+
+def test_lookups_hit_cache_and_return_copies():
+    assert database.insert_book("Cached Book", "Cache Author", "9600000000001", 2, 2)
+    first = database.get_book_by_isbn("9600000000001")
+    before = database.get_book_cache_stats()["hits"]
+    first["title"] = "mutated by caller"
+    again = database.get_book_by_id(first["id"])
+    assert again["title"] == "Cached Book"
+    assert database.get_book_cache_stats()["hits"] == before + 1
+
+
+def test_write_paths_invalidate():
+    assert database.insert_book("Invalidate Me", "Cache Author", "9600000000002", 2, 2)
+    book_id = database.get_book_by_isbn("9600000000002")["id"]
+    assert database.update_book_availability(book_id, -1)
+    assert database.get_book_by_id(book_id)["available_copies"] == 1
+    assert borrow_book_by_patron("600001", book_id)[0]
+    assert database.get_book_by_id(book_id)["available_copies"] == 0
+
+
+def test_lru_eviction_and_isbn_index():
+    cache = BookCache(":memory:", max_size=2, check_interval=3600)
+    rows = {i: {"id": i, "isbn": f"isbn{i}", "title": str(i)} for i in range(3)}
+    for i in range(3):
+        cache.get_by_id(i, lambda i=i: rows[i])
+    assert cache.stats()["size"] == 2
+    assert cache.get_by_isbn("isbn0", lambda: None) is None  # evicted with its ISBN entry
+    assert cache.get_by_isbn("isbn2", lambda: None)["id"] == 2
+
+
+def test_external_commit_detected_by_data_version(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "watch.db")
+    writer = sqlite3.connect(path)
+    writer.execute("CREATE TABLE t (x)")
+    writer.commit()
+    cache = BookCache(path, check_interval=0)
+    cache.get_by_id(1, lambda: {"id": 1, "isbn": "x", "title": "old"})
+    assert cache.get_by_id(1, lambda: None)["title"] == "old"
+    writer.execute("INSERT INTO t VALUES (1)")
+    writer.commit()
+    assert cache.get_by_id(1, lambda: {"id": 1, "isbn": "x", "title": "new"})["title"] == "new"
+    cache.close()
+    writer.close()
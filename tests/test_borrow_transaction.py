@@ -0,0 +1,39 @@
+# tests/test_borrow_transaction.py
+import threading
+from datetime import datetime, timedelta
+import database
+from services.library_service import borrow_book_by_patron
+
+
+def test_concurrent_borrows_cannot_oversell_last_copy():
+    assert database.insert_book("Last Copy", "Race Author", "9200000000001", 1, 1)
+    book_id = database.get_book_by_isbn("9200000000001")["id"]
+    results = []
+    barrier = threading.Barrier(6)
+
+    def borrow(patron_id):
+        barrier.wait()
+        results.append(borrow_book_by_patron(patron_id, book_id)[0])
+
+    threads = [threading.Thread(target=borrow, args=(f"70000{i}",)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(True) == 1
+    assert database.get_book_by_id(book_id)["available_copies"] == 0
+    conn = database.get_db_connection()
+    loans = conn.execute("SELECT COUNT(*) FROM borrow_records WHERE book_id = ?", (book_id,)).fetchone()[0]
+    conn.close()
+    assert loans == 1
+
+
+def test_failed_borrow_leaves_no_partial_writes():
+    assert database.insert_book("No Stock", "Race Author", "9200000000002", 1, 0)
+    book_id = database.get_book_by_isbn("9200000000002")["id"]
+    now = datetime.now()
+    outcome, _ = database.borrow_book_transaction("700100", book_id, now, now + timedelta(days=14), 5)
+    assert outcome == database.BORROW_UNAVAILABLE
+    assert database.get_patron_borrow_count("700100") == 0
+
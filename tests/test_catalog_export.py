@@ -0,0 +1,54 @@
+# tests/test_catalog_export.py
+import csv
+import io
+import json
+import sqlite3
+import database
+from app import create_app
+from services import catalog_export
+from services.catalog_export import export_catalog, parse_updated_since
+
+
+def test_jsonl_export_streams_every_book():
+    lines = "".join(export_catalog("jsonl")).splitlines()
+    exported = [json.loads(line)["id"] for line in lines]
+    assert exported == sorted(b["id"] for b in database.get_all_books())
+
+
+def test_csv_export_chunks_and_available_filter(monkeypatch):
+    monkeypatch.setattr(catalog_export, "ROWS_PER_CHUNK", 1)
+    chunks = list(export_catalog("csv", available_only=True))
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert len(chunks) == len(rows) + 1  # header chunk first
+    assert rows and all(int(r["available_copies"]) > 0 for r in rows)
+
+
+def test_updated_since_filter():
+    assert parse_updated_since("2999-01-01") == "2999-01-01T00:00:00"
+    assert parse_updated_since("2024-05-01T12:00:00+02:00") == "2024-05-01T10:00:00"
+    assert list(export_catalog("jsonl", updated_since="2999-01-01T00:00:00")) == []
+
+
+def test_updated_at_added_to_existing_database(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.db")
+    old = sqlite3.connect(path)
+    old.execute("CREATE TABLE books (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+                "author TEXT NOT NULL, isbn TEXT UNIQUE NOT NULL, total_copies INTEGER NOT NULL, "
+                "available_copies INTEGER NOT NULL)")
+    old.execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) "
+                "VALUES ('Old', 'A', '9500000000001', 1, 1)")
+    old.commit()
+    old.close()
+    monkeypatch.setattr(database, "DATABASE", path)
+    database.init_database()
+    assert database.get_book_by_isbn("9500000000001")["updated_at"] is not None
+
+
+def test_export_route():
+    client = create_app().test_client()
+    response = client.get("/api/export/books?format=csv")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.get_data(as_text=True).startswith("id,title,author")
+    assert client.get("/api/export/books?format=xml").status_code == 400
+    assert client.get("/api/export/books?updated_since=yesterday").status_code == 400
@@ -0,0 +1,56 @@
+# tests/test_catalog_import.py
+import io
+import database
+from app import create_app
+from services.catalog_import import import_books, iter_book_rows
+
+CSV_FEED = """title,author,isbn,total_copies
+Import One,Feed Author,9300000000001,2
+Import Two,Feed Author,9300000000002,1
+,No Title,9300000000003,1
+Bad Copies,Feed Author,9300000000004,zero
+Import One Again,Feed Author,9300000000001,1
+Existing,Feed Author,9780743273565,1
+"""
+
+
+def test_csv_import_batches_and_reports_rejects():
+    rows = iter_book_rows(io.StringIO(CSV_FEED), "csv")
+    summary = import_books(rows, batch_size=2)
+    assert summary["imported"] == 2
+    reasons = {r["line"]: r["reason"] for r in summary["rejects"]}
+    assert reasons[4] == "Title is required."
+    assert "positive integer" in reasons[5]
+    assert "already exists" in reasons[6] and "already exists" in reasons[7]
+    assert database.get_book_by_isbn("9300000000002")["available_copies"] == 1
+
+
+def test_jsonl_import_rejects_malformed_lines():
+    feed = io.BytesIO(b'{"title": "Json Book", "author": "A", "isbn": "9300000000010", "total_copies": 3}\n'
+                      b'not json\n')
+    summary = import_books(iter_book_rows(feed, "jsonl"))
+    assert summary["imported"] == 1
+    assert summary["rejects"] == [{"line": 2, "isbn": "", "reason": "Malformed JSON line."}]
+
+
+def test_duplicate_isbn_within_one_batch():
+    feed = io.StringIO('{"title": "T", "author": "A", "isbn": "9300000000020", "total_copies": 1}\n' * 2)
+    summary = import_books(iter_book_rows(feed, "jsonl"))
+    assert summary["imported"] == 1
+    assert summary["rejects"][0]["reason"] == "Duplicate ISBN within the import file."
+
+
+def test_import_command(tmp_path):
+    path = tmp_path / "feed.csv"
+    path.write_text("title,author,isbn,total_copies\nCli Book,Cli Author,9300000000030,1\n")
+    result = create_app().test_cli_runner().invoke(args=["import-books", str(path)])
+    assert result.exit_code == 0
+    assert "Imported 1 books" in result.output
+
+
+def test_import_upload_route():
+    client = create_app().test_client()
+    data = {"file": (io.BytesIO(b"title,author,isbn,total_copies\nUpload Book,U,9300000000040,1\n"), "feed.csv")}
+    response = client.post("/import_books", data=data, content_type="multipart/form-data")
+    assert response.status_code == 200
+    assert "Imported 1 books" in response.get_data(as_text=True)
@@ -0,0 +1,53 @@
+# tests/test_catalog_pagination.py
+import database
+from app import create_app
+from services.library_service import get_catalog_page, decode_page_cursor
+
+
+def _walk(limit):
+    seen, cursor = [], None
+    while True:
+        page = get_catalog_page(after=cursor, limit=limit)
+        seen.extend(book["id"] for book in page["books"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+def test_keyset_pages_cover_catalog_in_order():
+    for i in range(5):
+        assert database.insert_book("Same Title", "Dup Author", f"94000000000{i:02d}", 1, 1)
+    expected = [b["id"] for b in sorted(database.get_all_books(), key=lambda b: (b["title"], b["id"]))]
+    assert _walk(limit=3) == expected
+
+
+def test_before_cursor_returns_previous_page():
+    first = get_catalog_page(limit=2)
+    second = get_catalog_page(after=first["next_cursor"], limit=2)
+    back = get_catalog_page(before=second["prev_cursor"], limit=2)
+    assert [b["id"] for b in back["books"]] == [b["id"] for b in first["books"]]
+    assert back["prev_cursor"] is None
+
+
+def test_malformed_cursor_falls_back_to_first_page():
+    assert decode_page_cursor("not-a-cursor!") is None
+    assert get_catalog_page(after="garbage", limit=2)["books"] == get_catalog_page(limit=2)["books"]
+
+
+def test_api_books_cursor():
+    client = create_app().test_client()
+    first = client.get("/api/books?limit=1").get_json()
+    second = client.get(f"/api/books?limit=1&cursor={first['next_cursor']}").get_json()
+    assert first["count"] == 1 and second["count"] == 1
+    assert first["results"][0]["id"] != second["results"][0]["id"]
+
+
+def test_catalog_and_borrow_pages_render_controls(monkeypatch):
+    import routes.catalog_routes as catalog_routes
+    import routes.borrowing_routes as borrowing_routes
+    small_page = lambda after=None, before=None: get_catalog_page(after=after, before=before, limit=1)
+    monkeypatch.setattr(catalog_routes, "get_catalog_page", small_page)
+    monkeypatch.setattr(borrowing_routes, "get_catalog_page", small_page)
+    client = create_app().test_client()
+    assert "?after=" in client.get("/catalog").get_data(as_text=True)
+    assert "?after=" in client.get("/borrow").get_data(as_text=True)
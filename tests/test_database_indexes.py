@@ -0,0 +1,38 @@
+# tests/test_database_indexes.py
+import database
+
+
+def test_indexes_created_idempotently():
+    database.init_database()
+    database.init_database()
+    conn = database.get_db_connection()
+    names = {row["name"] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert {"idx_borrow_open_patron_date", "idx_borrow_open_book", "idx_borrow_open_due",
+            "idx_books_title_nocase", "idx_books_author_nocase"} <= names
+
+
+def test_hot_queries_use_indexes():
+    assert database.verify_hot_queries_use_indexes() == []
+
+
+def test_patron_count_plan_uses_partial_index():
+    plans = database.explain_hot_queries()
+    assert "idx_borrow_open_patron_date" in plans["get_patron_borrow_count"]
+
+
+def test_verify_rejects_temp_sorts_and_the_wrong_index(monkeypatch):
+    monkeypatch.setattr(database, "HOT_QUERIES", {
+        "sorted": ("SELECT * FROM borrow_records WHERE patron_id = ? ORDER BY due_date", ("123456",)),
+        "history_index": ("SELECT * FROM borrow_records WHERE patron_id = ?", ("123456",)),
+    })
+    monkeypatch.setattr(database, "HOT_QUERY_INDEXES", {"history_index": ("idx_borrow_open_patron_date",)})
+    assert database.verify_hot_queries_use_indexes() == ["sorted", "history_index"]
+
+
+def test_patron_fee_queries_stay_off_the_loan_history():
+    plans = database.explain_hot_queries()
+    for name in ("get_patron_current_loans", "get_patron_outstanding_fees",
+                 "get_open_loan_payments", "get_returned_ledger_fee"):
+        assert "idx_borrow_patron_history" not in plans[name]
@@ -0,0 +1,79 @@
+# tests/test_database_pool.py
+import threading
+from flask import Flask
+import database
+
+
+def test_connection_is_reused_after_close():
+    conn = database.get_db_connection()
+    conn.close()
+    again = database.get_db_connection()
+    assert again is conn
+    again.close()
+
+
+def test_pragmas_applied_on_open():
+    conn = database.get_db_connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    conn.close()
+
+
+def test_app_context_pins_one_connection():
+    app = Flask(__name__)
+    database.init_app(app)
+    with app.app_context():
+        first = database.get_db_connection()
+        first.close()  # ignored while pinned
+        assert database.get_db_connection() is first
+        assert database.get_book_by_id(1) is not None
+    assert not first.pinned
+
+
+def test_pool_is_thread_safe():
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(50):
+                database.get_book_by_id(1)
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_released_connections_beyond_max_idle_are_closed():
+    pool = database.ConnectionPool(database.DATABASE, max_idle=1)
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second  # acquire never waits for a free connection
+    first.close()
+    second.close()
+    assert pool.acquire() is first
+    pool.close_all()
+
+
+def test_nested_write_transaction_uses_savepoint():
+    app = Flask(__name__)
+    database.init_app(app)
+    with app.app_context():
+        with database.write_transaction() as conn:
+            conn.execute("UPDATE books SET available_copies = available_copies WHERE id = 1")
+            try:
+                with database.write_transaction() as inner:
+                    assert inner is conn
+                    conn.execute("UPDATE books SET title = 'Nested' WHERE id = 1")
+                    raise RuntimeError("inner")
+            except RuntimeError:
+                pass
+            # The outer transaction survives the inner rollback
+            assert conn.in_transaction
+            with database.write_transaction():
+                conn.execute("UPDATE books SET title = title || '' WHERE id = 1")
+        assert not conn.in_transaction
+    assert database.get_book_by_id(1)["title"] != "Nested"
@@ -0,0 +1,51 @@
+# tests/test_fee_ledger.py
+from datetime import datetime, timedelta
+import database
+from app import create_app
+from services import library_service as ls
+
+
+def _overdue(patron_id, isbn, days_late):
+    assert database.insert_book(f"Ledger {isbn}", "Ledger Author", isbn, 1, 1)
+    book_id = database.get_book_by_isbn(isbn)["id"]
+    due = datetime.now() - timedelta(days=days_late)
+    assert database.insert_borrow_record(patron_id, book_id, due - timedelta(days=14), due)
+    return book_id
+
+
+def test_accrual_is_idempotent_and_matches_live_fee():
+    book_id = _overdue("830001", "9820000000001", 9)
+    live = ls.calculate_late_fee_for_book("830001", book_id)
+    assert ls.run_late_fee_accrual() >= 1
+    assert ls.run_late_fee_accrual() == 0
+    ledger = database.get_ledger_fee("830001", book_id)
+    assert ledger["fee_amount"] == live["fee_amount"] == 5.5
+    assert ls.calculate_late_fee_for_book("830001", book_id) == live
+
+
+def test_next_day_advances_only_uncapped_loans():
+    growing = _overdue("830002", "9820000000002", 3)
+    capped = _overdue("830003", "9820000000003", 40)
+    yesterday = datetime.now() - timedelta(days=1)
+    ls.run_late_fee_accrual(yesterday)
+    before = database.get_ledger_fee("830003", capped)
+    assert before["fee_amount"] == 15.0
+
+    ls.run_late_fee_accrual()
+    assert database.get_ledger_fee("830002", growing)["days_overdue"] == 3
+    assert database.get_ledger_fee("830003", capped) == before  # untouched once capped
+    assert ls.calculate_late_fee_for_book("830003", capped)["days_overdue"] == 40
+
+
+def test_fee_api_reads_ledger(monkeypatch):
+    book_id = _overdue("830004", "9820000000004", 2)
+    ls.run_late_fee_accrual()
+    monkeypatch.setattr(database, "get_patron_borrowed_books",
+                        lambda pid: (_ for _ in ()).throw(AssertionError("live path used")))
+    data = create_app().test_client().get(f"/api/late_fee/830004/{book_id}").get_json()
+    assert data["fee_amount"] == 1.0
+
+
+def test_accrue_command():
+    result = create_app().test_cli_runner().invoke(args=["accrue-late-fees"])
+    assert result.exit_code == 0 and "Accrued late fees" in result.output
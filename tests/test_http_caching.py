@@ -0,0 +1,45 @@
+# tests/test_http_caching.py
+import database
+from app import create_app
+from services import library_service
+
+
+def test_catalog_revalidates_with_etag():
+    client = create_app().test_client()
+    first = client.get("/catalog")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.headers["Last-Modified"]
+
+    again = client.get("/catalog", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.get_data() == b""
+
+    assert database.insert_book("Etag Buster", "Cache Author", "9700000000001", 1, 1)
+    changed = client.get("/catalog", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+
+def test_not_modified_skips_view(monkeypatch):
+    client = create_app().test_client()
+    etag = client.get("/api/search?q=gatsby").headers["ETag"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("search should not run for a 304")
+    monkeypatch.setattr("routes.api_routes.search_books_in_catalog", fail)
+    assert client.get("/api/search?q=gatsby", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_if_modified_since():
+    client = create_app().test_client()
+    last_modified = client.get("/search?q=gatsby&type=title").headers["Last-Modified"]
+    response = client.get("/search?q=gatsby&type=title", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+
+def test_every_books_write_bumps_version():
+    version, _ = database.get_catalog_version()
+    assert database.insert_book("Version Bump", "Cache Author", "9700000000002", 1, 1)
+    book_id = database.get_book_by_isbn("9700000000002")["id"]
+    assert database.get_catalog_version()[0] > version
+    version, _ = database.get_catalog_version()
+    assert library_service.borrow_book_by_patron("700200", book_id)[0]
+    assert database.get_catalog_version()[0] > version
@@ -0,0 +1,80 @@
+# tests/test_metrics.py
+import pytest
+import database
+import metrics
+from app import create_app
+from services import library_service as ls
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    metrics.registry.reset()
+    metrics.registry.enabled = True
+    yield app.test_client()
+    metrics.registry.enabled = False
+    metrics.registry.reset()
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("demo_seconds", "Demo.", ("name",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(5.0, "a")
+    lines = histogram.samples()
+    assert 'demo_seconds_bucket{name="a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{name="a",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{name="a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{name="a"} 3' in lines
+    assert histogram.count("a") == 3
+
+
+def test_requests_services_and_sql_are_recorded(client):
+    assert client.get("/api/late_fee/123456/3").status_code == 200
+    assert client.get("/catalog").status_code == 200
+
+    assert metrics.REQUEST_LATENCY.count("GET", "/api/late_fee/<patron_id>/<int:book_id>", 200) == 1
+    assert metrics.SERVICE_LATENCY.count("calculate_late_fee_for_book") == 1
+    assert metrics.SERVICE_LATENCY.count("get_catalog_page") == 1
+    assert metrics.SQL_LATENCY.count("select") > 0
+    assert metrics.SQL_TRACED_STATEMENTS.value("select") > 0
+
+    body = client.get("/api/metrics").get_data(as_text=True)
+    assert "library_metrics_enabled 1" in body
+    assert "# TYPE library_http_request_duration_seconds histogram" in body
+    assert 'endpoint="/catalog"' in body
+    assert 'library_service_call_duration_seconds_count{function="get_catalog_page"} 1' in body
+
+
+def test_unhandled_exceptions_are_recorded_as_500s(client):
+    app = client.application
+
+    @app.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    assert client.get("/boom").status_code == 500
+    app.config["PROPAGATE_EXCEPTIONS"] = True
+    with pytest.raises(RuntimeError):
+        client.get("/boom")
+    assert metrics.REQUEST_LATENCY.count("GET", "/boom", 500) == 2
+
+
+def test_trace_callback_sees_trigger_statements(client):
+    assert ls.add_book_to_catalog("Metrics Book", "Metrics Author", "9860000000001", 1)[0]
+    assert metrics.SQL_LATENCY.count("insert") >= 1
+    # The insert fires the touch, version and full-text triggers
+    assert metrics.SQL_TRACED_STATEMENTS.value("trigger") >= 3
+
+
+def test_nothing_recorded_while_disabled():
+    create_app()
+    metrics.registry.reset()
+    assert not metrics.registry.enabled
+    ls.calculate_late_fee_for_book("123456", 3)
+    database.get_book_by_id(1)
+    assert metrics.SERVICE_LATENCY.count("calculate_late_fee_for_book") == 0
+    assert metrics.SQL_LATENCY.count("select") == 0
+    conn = database.get_db_connection()
+    assert not conn.instrumented
+    conn.close()
@@ -0,0 +1,118 @@
+# tests/test_migrations.py
+import re
+import sqlite3
+import threading
+import pytest
+import database
+import migrations
+from app import create_app
+
+ALL_VERSIONS = list(range(1, migrations.LATEST_VERSION + 1))
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "migrated.db")
+    monkeypatch.setattr(database, "DATABASE", path)
+    yield path
+    database.get_pool().close_all()
+
+
+def test_fresh_database_is_migrated_once(fresh_db):
+    assert migrations.get_schema_version() == 0
+    assert [m.version for m in migrations.migrate()] == ALL_VERSIONS
+    assert migrations.get_schema_version() == migrations.LATEST_VERSION
+    assert migrations.migrate() == []
+    status = migrations.migration_status()
+    assert status[0]["name"] == "0001_baseline" and all(s["applied_at"] for s in status)
+
+
+def test_up_to_date_check_is_a_single_query(fresh_db, monkeypatch):
+    migrations.migrate()
+    conn = database.open_connection(fresh_db)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    monkeypatch.setattr(migrations, "get_db_connection", lambda: conn)
+    assert migrations.migrate() == []
+    assert statements == [migrations.SQL_CURRENT_VERSION]
+
+
+def test_pre_migration_database_is_baselined(fresh_db):
+    old = sqlite3.connect(fresh_db)
+    old.execute("CREATE TABLE books (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+                "author TEXT NOT NULL, isbn TEXT UNIQUE NOT NULL, total_copies INTEGER NOT NULL, "
+                "available_copies INTEGER NOT NULL)")
+    old.execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) "
+                "VALUES ('Kept Book', 'A', '9850000000001', 1, 1)")
+    old.commit()
+    old.close()
+
+    assert [m.version for m in migrations.migrate()] == ALL_VERSIONS
+    assert database.get_book_by_isbn("9850000000001")["updated_at"]
+    assert [book["title"] for book in database.search_books("kept", "title")] == ["Kept Book"]
+
+
+def test_migrated_schema_matches_the_live_ddl(fresh_db):
+    # bulk_load() rebuilds indexes and triggers from the live statements in
+    # database.py, which must describe what the migrations created
+    migrations.migrate()
+    statements = database.INDEXES + database.TOUCH_TRIGGERS + database.VERSION_TRIGGERS + \
+        database.PATRON_SUMMARY_TRIGGERS + database.FTS_TRIGGERS
+    declared = {m.group(1) for m in (re.match(r"\s*CREATE (?:INDEX|TRIGGER) IF NOT EXISTS (\w+)", statement)
+                                     for statement in statements) if m}
+    conn = database.get_db_connection()
+    created = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL")}
+    conn.close()
+    assert created == declared
+
+
+def test_failed_migration_rolls_back(fresh_db, monkeypatch):
+    migrations.migrate()
+
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("boom")
+
+    latest = migrations.LATEST_VERSION
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS + [
+        migrations.Migration(latest + 1, f"{latest + 1:04d}_broken", "Broken", broken)])
+    monkeypatch.setattr(migrations, "LATEST_VERSION", latest + 1)
+    with pytest.raises(RuntimeError, match="boom"):
+        migrations.migrate()
+    assert migrations.get_schema_version() == latest
+    assert migrations.migration_status()[-1]["applied_at"] is None
+    conn = database.get_db_connection()
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+    conn.close()
+
+
+def test_concurrent_workers_apply_each_migration_once(fresh_db):
+    applied = []
+    threads = [threading.Thread(target=lambda: applied.extend(migrations.migrate())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(m.version for m in applied) == ALL_VERSIONS
+    assert len(migrations.migration_status()) == len(ALL_VERSIONS)
+
+
+def test_startup_seeds_only_when_asked(fresh_db):
+    create_app()
+    assert database.get_all_books() == []
+    create_app({"SEED_SAMPLE_DATA": True})
+    assert len(database.get_all_books()) == 3
+
+
+def test_startup_without_auto_migrate_leaves_schema_to_cli(fresh_db):
+    app = create_app({"AUTO_MIGRATE": False})
+    assert migrations.get_schema_version() == 0
+    runner = app.test_cli_runner()
+    assert "pending" in runner.invoke(args=["migrate", "--status"]).output
+    result = runner.invoke(args=["migrate"])
+    assert result.exit_code == 0, result.output
+    assert "Applied 0001_baseline" in result.output
+    assert migrations.get_schema_version() == migrations.LATEST_VERSION
+    assert "Sample data is in place." in runner.invoke(args=["seed-sample-data"]).output
+    assert len(database.get_all_books()) == 3
@@ -0,0 +1,62 @@
+# tests/test_overdue_fees.py
+from datetime import datetime, timedelta
+import database
+from app import create_app
+from services import library_service as ls
+
+
+def _overdue_loan(patron_id, isbn, days_late, hours=0):
+    assert database.insert_book(f"Overdue {isbn}", "Fee Author", isbn, 1, 1)
+    book_id = database.get_book_by_isbn(isbn)["id"]
+    due = datetime.now() - timedelta(days=days_late, hours=hours)
+    assert database.insert_borrow_record(patron_id, book_id, due - timedelta(days=14), due)
+    return book_id
+
+
+def test_batch_fees_match_per_book_function():
+    cases = [(0, 2), (1, 0), (3, 0), (7, 0), (8, 0), (11, 5), (40, 0)]
+    expected = {}
+    for i, (days, hours) in enumerate(cases):
+        patron_id = f"81{i:04d}"
+        book_id = _overdue_loan(patron_id, f"98000000000{i:02d}", days, hours)
+        expected[(patron_id, book_id)] = ls.calculate_late_fee_for_book(patron_id, book_id)
+
+    seen, cursor = {}, None
+    while True:
+        page = ls.get_overdue_late_fees(after=cursor, limit=3)
+        for loan in page["loans"]:
+            seen[(loan["patron_id"], loan["book_id"])] = loan
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    for key, single in expected.items():
+        assert seen[key]["fee_amount"] == single["fee_amount"]
+        assert seen[key]["days_overdue"] == single["days_overdue"]
+
+
+def test_loans_not_yet_due_or_returned_are_excluded():
+    book_id = _overdue_loan("819001", "9800000000100", -3)
+    returned_id = _overdue_loan("819002", "9800000000101", 5)
+    assert database.update_borrow_record_return_date("819002", returned_id, datetime.now())
+    ids = {loan["book_id"] for loan in ls.get_overdue_late_fees(limit=200)["loans"]}
+    assert book_id not in ids and returned_id not in ids
+
+
+def test_overdue_endpoint_pages():
+    _overdue_loan("819003", "9800000000102", 4)
+    _overdue_loan("819004", "9800000000103", 6)
+    client = create_app().test_client()
+    data = client.get("/api/late_fees/overdue?limit=1").get_json()
+    assert data["count"] == 1 and data["next_cursor"]
+    following = client.get(f"/api/late_fees/overdue?limit=1&cursor={data['next_cursor']}").get_json()
+    assert following["results"][0]["record_id"] != data["results"][0]["record_id"]
+
+
+def test_malformed_cursor_date_starts_from_the_first_page():
+    client = create_app().test_client()
+    first = client.get("/api/late_fees/overdue?limit=1").get_json()
+    bad = ls.encode_cursor(["not-a-date", 1])
+    response = client.get(f"/api/late_fees/overdue?limit=1&cursor={bad}")
+    assert response.status_code == 200
+    assert response.get_json()["results"] == first["results"]
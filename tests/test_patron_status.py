@@ -0,0 +1,58 @@
+# tests/test_patron_status.py
+from datetime import datetime, timedelta
+import database
+from app import create_app
+from services import library_service as ls
+
+
+def _book(isbn):
+    assert database.insert_book(f"Status {isbn}", "Status Author", isbn, 2, 2)
+    return database.get_book_by_isbn(isbn)["id"]
+
+
+def test_summary_maintained_by_borrow_and_return():
+    patron_id = "820001"
+    first, second = _book("9810000000001"), _book("9810000000002")
+    assert ls.borrow_book_by_patron(patron_id, first)[0]
+    assert ls.borrow_book_by_patron(patron_id, second)[0]
+    assert database.update_borrow_record_return_date(patron_id, first, datetime.now())
+
+    summary = database.get_patron_summary(patron_id)
+    assert summary["open_loans"] == 1 and summary["total_loans"] == 2
+
+    report = ls.get_patron_status_report(patron_id)
+    assert report["borrow_count"] == 1
+    assert [loan["book_id"] for loan in report["current_borrowed"]] == [second]
+    assert {loan["book_id"] for loan in report["history"]} == {first, second}
+
+
+def test_report_fees_match_per_book_calculation():
+    patron_id = "820002"
+    book_id = _book("9810000000003")
+    due = datetime.now() - timedelta(days=10)
+    assert database.insert_borrow_record(patron_id, book_id, due - timedelta(days=14), due)
+    report = ls.get_patron_status_report(patron_id)
+    expected = ls.calculate_late_fee_for_book(patron_id, book_id)["fee_amount"]
+    assert report["total_late_fees"] == expected == 6.5
+    assert report["current_borrowed"][0]["is_overdue"] is True
+
+
+def test_history_is_paginated():
+    patron_id = "820003"
+    for i in range(3):
+        book_id = _book(f"981000000001{i}")
+        assert ls.borrow_book_by_patron(patron_id, book_id)[0]
+    page = ls.get_patron_status_report(patron_id, history_limit=2)
+    rest = ls.get_patron_status_report(patron_id, history_cursor=page["history_next_cursor"], history_limit=2)
+    assert len(page["history"]) == 2 and len(rest["history"]) == 1
+    assert rest["history_next_cursor"] is None
+
+
+def test_invalid_patron_and_routes():
+    assert ls.get_patron_status_report("12ab56")["status"] == "Error"
+    client = create_app().test_client()
+    assert client.get("/api/patron/12ab56/status").status_code == 400
+    data = client.get("/api/patron/123456/status").get_json()
+    assert data["borrow_count"] >= 1
+    page = client.get("/patron?patron_id=123456").get_data(as_text=True)
+    assert "Currently Borrowed" in page and "1984" in page
@@ -0,0 +1,165 @@
+# tests/test_pay_all_fees.py
+import time
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+import database
+from app import create_app
+from services import library_service as ls
+from services.payment_service import PaymentGateway, PaymentGatewayError, process_payments
+
+
+def _overdue_books(patron_id, isbn_prefix, days_late):
+    book_ids = []
+    for i, days in enumerate(days_late):
+        isbn = f"{isbn_prefix}{i:03d}"
+        assert database.insert_book(f"Pay {isbn}", "Pay Author", isbn, 1, 1)
+        book_id = database.get_book_by_isbn(isbn)["id"]
+        due = datetime.now() - timedelta(days=days)
+        assert database.insert_borrow_record(patron_id, book_id, due - timedelta(days=14), due)
+        book_ids.append(book_id)
+    return book_ids
+
+
+class SingleOnlyGateway:
+    """Gateway without a batch endpoint."""
+
+    def __init__(self, delay=0.0, decline=()):
+        self.delay = delay
+        self.decline = decline
+        self.calls = []
+
+    def process_payment(self, patron_id, amount, memo=""):
+        self.calls.append(memo)
+        time.sleep(self.delay)
+        if any(memo.endswith(f"={book_id}") for book_id in self.decline):
+            return False, "DECLINED"
+        return True, f"txn_{len(self.calls)}"
+
+
+def test_pay_all_uses_one_batch_call_and_records_payments():
+    books = _overdue_books("850001", "9870000000", [3, 10, 40])
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payments.return_value = [(True, "t1"), (True, "t2"), (True, "t3")]
+
+    result = ls.pay_all_late_fees("850001", gateway)
+
+    assert result["status"] == "OK" and result["total_paid"] == 1.5 + 6.5 + 15.0
+    gateway.process_payments.assert_called_once_with([
+        ("850001", 1.5, f"Late fee for book_id={books[0]}"),
+        ("850001", 6.5, f"Late fee for book_id={books[1]}"),
+        ("850001", 15.0, f"Late fee for book_id={books[2]}"),
+    ])
+    gateway.process_payment.assert_not_called()
+    # Everything is settled now, for the batch and the single-book path alike
+    assert ls.pay_all_late_fees("850001", gateway)["status"] == "Nothing due"
+    ok, msg = ls.pay_late_fees("850001", books[0], gateway)
+    assert not ok and msg == "No late fee due."
+
+
+def test_fallback_fans_out_concurrently_and_keeps_partial_results():
+    books = _overdue_books("850002", "9870000001", [5, 6, 7, 8])
+    gateway = SingleOnlyGateway(delay=0.2, decline=[books[1]])
+
+    started = time.monotonic()
+    result = ls.pay_all_late_fees("850002", gateway)
+    assert time.monotonic() - started < 0.6  # four 0.2s calls in parallel
+
+    assert result["status"] == "Partial"
+    assert [item["book_id"] for item in result["paid"]] == [books[0], books[2], books[3]]
+    assert result["failed"][0]["reason"] == "Payment declined: DECLINED"
+    # Only the declined book is still owed
+    owed = ls.pay_all_late_fees("850002", SingleOnlyGateway())
+    assert [item["book_id"] for item in owed["paid"]] == [books[1]]
+
+
+def test_slow_single_calls_are_pending_not_failed():
+    gateway = SingleOnlyGateway(delay=0.5)
+    results = process_payments(gateway, [("850003", 1.0, "a"), ("850003", 2.0, "b")], timeout=0.1)
+    assert results == [(None, "Payment pending: timeout")] * 2
+
+
+def test_timed_out_charges_are_not_retried(monkeypatch):
+    [book_id] = _overdue_books("850009", "9870000009", [9])
+    gateway = SingleOnlyGateway(delay=0.3)
+    monkeypatch.setattr(ls, "process_payments",
+                        lambda gw, payments: process_payments(gw, payments, timeout=0.05))
+
+    result = ls.pay_all_late_fees("850009", gateway)
+    assert result["status"] == "Pending" and result["failed"] == []
+    assert [item["book_id"] for item in result["pending"]] == [book_id]
+    # A resubmission gets the same answer instead of a second charge
+    assert ls.pay_all_late_fees("850009", gateway) == result
+    time.sleep(0.4)
+    assert len(gateway.calls) == 1
+
+
+def test_batch_error_does_not_fall_back():
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payments.side_effect = PaymentGatewayError("boom")
+    results = process_payments(gateway, [("850004", 1.0, "a")])
+    assert results == [(False, "Payment error: PaymentGatewayError")]
+    gateway.process_payment.assert_not_called()
+
+
+def test_pay_fees_route():
+    _overdue_books("850005", "9870000002", [9])
+    client = create_app().test_client()
+    response = client.post("/api/patron/850005/pay_fees")
+    assert response.status_code == 200 and response.get_json()["total_paid"] == 5.5
+    assert client.post("/api/patron/85000X/pay_fees").status_code == 400
+
+
+def test_pay_all_collects_final_fees_of_late_returns():
+    [book_id] = _overdue_books("850005", "9870000005", [16])
+    ok, msg = ls.return_book_by_patron("850005", book_id)
+    assert ok and "Late fee: $12.50" in msg
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payments.return_value = [(True, "t_final")]
+
+    result = ls.pay_all_late_fees("850005", gateway)
+    assert result["status"] == "OK" and result["total_paid"] == 12.5
+    assert database.get_open_loan_payments("850005", book_id)["paid"] == 12.5
+    assert ls.pay_all_late_fees("850005", gateway)["status"] == "Nothing due"
+    ok, msg = ls.pay_late_fees("850005", book_id, gateway)
+    assert not ok and msg == "No late fee due."
+
+
+def test_duplicate_pay_all_submissions_charge_once():
+    import threading
+    from services.payment_service import recent_payments
+    recent_payments.clear()
+    _overdue_books("850006", "9870000006", [5, 9])
+    gateway = SingleOnlyGateway(delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ls.pay_all_late_fees("850006", gateway)))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(gateway.calls) == 2
+    assert all(result == results[0] and result["status"] == "OK" for result in results)
+    recent_payments.clear()
+    assert ls.pay_all_late_fees("850006", gateway)["status"] == "Nothing due"
+    conn = database.get_db_connection()
+    keys = {row[0] for row in conn.execute(
+        "SELECT idempotency_key FROM late_fee_payments WHERE patron_id = '850006'")}
+    conn.close()
+    assert len(keys) == 2 and all(key and key.startswith("late-fees:850006:") for key in keys)
+
+
+def test_status_report_and_fee_api_show_fees_net_of_payments():
+    books = _overdue_books("850007", "9870000007", [5, 16])
+    client = create_app().test_client()
+    assert ls.get_patron_status_report("850007")["total_loans"] == 2
+    assert ls.get_patron_status_report("850007")["total_late_fees"] == 2.5 + 12.5
+
+    ok, msg = ls.return_book_by_patron("850007", books[1])
+    assert ok and "Late fee: $12.50" in msg
+    assert ls.get_patron_status_report("850007")["total_late_fees"] == 2.5 + 12.5
+
+    assert ls.pay_all_late_fees("850007", SingleOnlyGateway())["status"] == "OK"
+    assert ls.get_patron_status_report("850007")["total_late_fees"] == 0.0
+    data = client.get(f"/api/late_fee/850007/{books[0]}").get_json()
+    assert data["fee_amount"] == 2.5 and data["amount_paid"] == 2.5 and data["outstanding"] == 0.0
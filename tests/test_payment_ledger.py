@@ -0,0 +1,212 @@
+# tests/test_payment_ledger.py
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+import pytest
+import database
+from services import library_service as ls
+from services.payment_service import PaymentGateway, RecentResults, recent_payments
+
+
+@pytest.fixture(autouse=True)
+def _forget_recent_payments():
+    recent_payments.clear()
+    yield
+    recent_payments.clear()
+
+
+def _overdue(patron_id, isbn, days_late):
+    assert database.insert_book(f"Idem {isbn}", "Idem Author", isbn, 1, 1)
+    book_id = database.get_book_by_isbn(isbn)["id"]
+    due = datetime.now() - timedelta(days=days_late)
+    assert database.insert_borrow_record(patron_id, book_id, due - timedelta(days=14), due)
+    return book_id
+
+
+class SlowGateway:
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def process_payment(self, patron_id, amount, memo=""):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return True, f"txn_slow_{self.calls}"
+
+
+def test_retry_returns_stored_outcome_without_charging_again():
+    book_id = _overdue("860001", "9870000090001", 5)
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.return_value = (True, "txn_idem_1")
+
+    first = ls.pay_late_fees("860001", book_id, gateway)
+    assert first == (True, "Paid $2.50. Transaction: txn_idem_1")
+    assert ls.pay_late_fees("860001", book_id, gateway) == first
+    # A restarted process has no recent results but still finds the ledger row
+    recent_payments.clear()
+    assert ls.pay_late_fees("860001", book_id, gateway) == first
+    gateway.process_payment.assert_called_once()
+
+    record_id = database.get_open_loan_payments("860001", book_id)["record_id"]
+    stored = database.get_late_fee_payment(ls.late_fee_payment_key("860001", book_id, record_id, 2.5),
+                                           record_id)
+    assert stored["transaction_id"] == "txn_idem_1" and stored["amount"] == 2.5
+
+
+def test_same_fee_on_a_later_loan_of_the_book_is_charged_again():
+    book_id = _overdue("860007", "9870000090007", 4)
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.side_effect = [(True, "txn_loan_a"), (True, "txn_loan_b")]
+    assert ls.pay_late_fees("860007", book_id, gateway) == (True, "Paid $2.00. Transaction: txn_loan_a")
+    assert ls.return_book_by_patron("860007", book_id)[0]
+
+    due = datetime.now() - timedelta(days=4)
+    assert database.insert_borrow_record("860007", book_id, due - timedelta(days=14), due)
+    database.update_book_availability(book_id, -1)
+    status = ls.get_late_fee_status("860007", book_id)
+    assert status["outstanding"] == 2.0
+    assert status["amount_paid"] == 0.0 and isinstance(status["amount_paid"], float)
+    assert ls.pay_late_fees("860007", book_id, gateway) == (True, "Paid $2.00. Transaction: txn_loan_b")
+    assert ls.get_late_fee_status("860007", book_id)["outstanding"] == 0.0
+
+
+def test_declined_payment_is_not_remembered():
+    book_id = _overdue("860002", "9870000090002", 4)
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.side_effect = [(False, "card expired"), (True, "txn_idem_2")]
+
+    assert ls.pay_late_fees("860002", book_id, gateway) == (False, "Payment declined: card expired")
+    assert ls.pay_late_fees("860002", book_id, gateway) == (True, "Paid $2.00. Transaction: txn_idem_2")
+    assert gateway.process_payment.call_count == 2
+
+
+def test_concurrent_duplicates_share_one_gateway_call():
+    book_id = _overdue("860003", "9870000090003", 6)
+    gateway = SlowGateway(delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ls.pay_late_fees("860003", book_id, gateway)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert gateway.calls == 1
+    assert results == [(True, "Paid $3.00. Transaction: txn_slow_1")] * 5
+    assert len(database.get_payments_by_transaction("txn_slow_1")) == 1
+
+
+def test_recent_results_expire_and_evict():
+    cache = RecentResults(ttl=0.05, max_size=2)
+    calls = []
+
+    def call(name):
+        def run():
+            calls.append(name)
+            return True, name
+        return run
+
+    assert cache.run("a", call("a")) == (True, "a")
+    assert cache.run("a", call("a")) == (True, "a")
+    assert calls == ["a"]
+    cache.run("b", call("b"))
+    cache.run("c", call("c"))  # evicts "a", the least recently stored
+    cache.run("a", call("a"))
+    assert calls == ["a", "b", "c", "a"]
+    time.sleep(0.06)
+    cache.run("c", call("c"))
+    assert calls[-1] == "c"
+
+
+def test_refunds_are_checked_against_the_ledger():
+    book_id = _overdue("860004", "9870000090004", 10)
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.return_value = (True, "txn_idem_4")
+    gateway.refund_payment.return_value = (True, "refund_idem_4")
+    assert ls.pay_late_fees("860004", book_id, gateway)[0]  # $6.50
+
+    assert ls.refund_late_fee_payment("txn_idem_4", 4.0, gateway, idempotency_key="r-1") == \
+        (True, "Refunded $4.00. Reference: refund_idem_4")
+    # A retry of the same refund is answered from memory
+    assert ls.refund_late_fee_payment("txn_idem_4", 4.0, gateway, idempotency_key="r-1")[0]
+    gateway.refund_payment.assert_called_once_with("txn_idem_4", 4.0)
+
+    ok, msg = ls.refund_late_fee_payment("txn_idem_4", 3.0, gateway)
+    assert not ok and msg == "Refund exceeds the $2.50 refundable for this transaction."
+    assert ls.refund_late_fee_payment("txn_idem_4", 2.5, gateway)[0]
+    assert database.get_payments_by_transaction("txn_idem_4")[0]["refunded_amount"] == 6.5
+    assert gateway.refund_payment.call_count == 2
+
+
+def test_unknown_transaction_keeps_the_plain_refund_rules():
+    gateway = Mock(spec=PaymentGateway)
+    gateway.refund_payment.return_value = (True, "refund_legacy")
+    assert ls.refund_late_fee_payment("txn_before_ledger", 12.0, gateway)[0]
+    assert ls.refund_late_fee_payment("txn_before_ledger", 16.0, gateway) == (False, "Refund exceeds $15 maximum.")
+
+
+def test_existing_payment_table_gains_idempotency_columns(tmp_path, monkeypatch):
+    path = str(tmp_path / "old_payments.db")
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE late_fee_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            record_id INTEGER NOT NULL,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            transaction_id TEXT NOT NULL,
+            paid_at INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("INSERT INTO late_fee_payments (record_id, patron_id, book_id, amount, transaction_id, paid_at) "
+                 "VALUES (1, '860005', 1, 3.0, 'txn_old', 0)")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(database, "DATABASE", path)
+    database.init_database()
+    [row] = database.get_payments_by_transaction("txn_old")
+    assert row["idempotency_key"] is None and row["refunded_amount"] == 0
+    assert database.record_late_fee_refund(row["id"], 3.0)
+    assert not database.record_late_fee_refund(row["id"], 0.01)
+
+
+def test_repeated_partial_refunds_of_the_same_amount_both_happen():
+    book_id = _overdue("860006", "9870000090006", 10)
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.return_value = (True, "txn_idem_6")
+    gateway.refund_payment.side_effect = [(True, "r1"), (True, "r2")]
+    assert ls.pay_late_fees("860006", book_id, gateway)[0]  # $6.50
+
+    assert ls.refund_late_fee_payment("txn_idem_6", 1.0, gateway) == (True, "Refunded $1.00. Reference: r1")
+    assert ls.refund_late_fee_payment("txn_idem_6", 1.0, gateway) == (True, "Refunded $1.00. Reference: r2")
+    assert gateway.refund_payment.call_count == 2
+    assert database.get_payments_by_transaction("txn_idem_6")[0]["refunded_amount"] == 2.0
+
+
+def test_refunds_without_a_key_are_not_remembered():
+    gateway = Mock(spec=PaymentGateway)
+    gateway.refund_payment.side_effect = [(True, "r_legacy_1"), (True, "r_legacy_2")]
+    assert ls.refund_late_fee_payment("txn_no_ledger", 5.0, gateway) == \
+        (True, "Refunded $5.00. Reference: r_legacy_1")
+    assert ls.refund_late_fee_payment("txn_no_ledger", 5.0, gateway) == \
+        (True, "Refunded $5.00. Reference: r_legacy_2")
+
+
+def test_refunds_without_a_key_share_a_call_already_in_flight():
+    gateway = Mock(spec=PaymentGateway)
+    gateway.refund_payment.side_effect = lambda txn, amount: (time.sleep(0.2), (True, "r_shared"))[1]
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        ls.refund_late_fee_payment("txn_in_flight", 5.0, gateway))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [(True, "Refunded $5.00. Reference: r_shared")] * 3
+    gateway.refund_payment.assert_called_once()
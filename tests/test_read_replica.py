@@ -0,0 +1,92 @@
+# tests/test_read_replica.py
+import pytest
+import database
+from app import create_app
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "replicated.db"))
+    monkeypatch.setattr(database, "READ_REPLICA_ENABLED", True)
+    monkeypatch.setattr(database, "READ_REPLICA_STALENESS", 60.0)
+    database.init_database()
+    database.add_sample_data()
+    yield database.get_read_replica()
+    database.get_read_replica().close()
+
+
+def test_reads_come_from_copy_until_file_changes(replica):
+    assert len(database.get_all_books()) == 3
+    assert replica.refreshes == 1
+    assert database.insert_book("Replica Harbor", "Copy Author", "9240000000001", 1, 1)
+
+    # Within the staleness bound the copy is served as it was
+    assert database.search_books("harbor", "title") == []
+    assert len(database.get_books_page(limit=10)) == 3
+    # Writes and the book cache still go to the file
+    assert database.get_book_by_isbn("9240000000001")["title"] == "Replica Harbor"
+
+    replica.staleness = 0
+    assert [book["isbn"] for book in database.search_books("harbor", "title")] == ["9240000000001"]
+    assert replica.refreshes == 2
+    # No commits since the last copy: nothing to refresh
+    database.get_all_books()
+    assert replica.refreshes == 2
+
+
+def test_read_from_primary_bypasses_replica(replica):
+    database.get_all_books()
+    assert database.insert_book("Primary Only", "Copy Author", "9240000000002", 1, 1)
+    assert len(database.get_all_books()) == 3
+    with database.read_from_primary():
+        assert len(database.get_all_books()) == 4
+    assert len(database.get_all_books()) == 3
+
+
+def test_catalog_version_matches_replica_pages(replica):
+    client = create_app().test_client()
+    first = client.get("/api/books")
+    assert database.insert_book("Versioned", "Copy Author", "9240000000003", 1, 1)
+    # The copy is stale, so the old ETag still describes what it serves
+    assert client.get("/api/books", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    replica.staleness = 0
+    fresh = client.get("/api/books", headers={"If-None-Match": first.headers["ETag"]})
+    assert fresh.status_code == 200 and fresh.get_json()["count"] == 4
+
+
+def test_replica_cursor_reads_like_sqlite_cursor(replica):
+    conn = database.get_read_connection()
+    cursor = conn.execute("SELECT id FROM books ORDER BY id")
+    assert cursor.fetchone()["id"] == 1
+    assert [row["id"] for row in cursor] == [2, 3]
+    assert cursor.fetchone() is None
+    conn.close()
+
+
+def test_threads_query_the_copy_side_by_side(tmp_path):
+    import threading
+    from read_replica import ReadReplica
+    path = str(tmp_path / "side_by_side.db")
+    source = database.open_connection(path)
+    source.execute("CREATE TABLE t (x INTEGER)")
+    source.commit()
+    source.close()
+    # Each query waits inside SQLite for the other: one at a time they would time out
+    barrier = threading.Barrier(2, timeout=5)
+
+    def connect(name):
+        conn = database.open_connection(name, uri=True)
+        conn.create_function("meet", 0, lambda: barrier.wait())
+        return conn
+
+    replica = ReadReplica(path, connect, staleness=60.0)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        replica.execute("SELECT meet() FROM (SELECT 1)").fetchone())) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 2 and replica.refreshes == 1
+    replica.close()
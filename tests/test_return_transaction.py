@@ -0,0 +1,79 @@
+# tests/test_return_transaction.py
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+import database
+from services import library_service as ls
+from services.payment_service import PaymentGateway, recent_payments
+
+
+def _borrowed(patron_id, isbn, days_late, copies=1):
+    assert database.insert_book(f"Return {isbn}", "Return Author", isbn, copies, copies - 1)
+    book_id = database.get_book_by_isbn(isbn)["id"]
+    due = datetime.now() - timedelta(days=days_late)
+    assert database.insert_borrow_record(patron_id, book_id, due - timedelta(days=14), due)
+    return book_id
+
+
+def test_return_closes_loan_and_restores_copy_together():
+    book_id = _borrowed("710001", "9210000000001", -3, copies=2)
+    ok, msg = ls.return_book_by_patron("710001", book_id)
+    assert ok and msg == f'Successfully returned "Return 9210000000001".'
+    assert database.get_book_by_id(book_id)["available_copies"] == 2
+    assert database.get_patron_borrow_count("710001") == 0
+    assert ls.calculate_late_fee_for_book("710001", book_id)["fee_amount"] == 0.0
+
+    ok, msg = ls.return_book_by_patron("710001", book_id)
+    assert not ok and "not borrowed" in msg
+    assert database.get_book_by_id(book_id)["available_copies"] == 2
+
+
+def test_late_return_reports_and_keeps_final_fee():
+    book_id = _borrowed("710002", "9210000000002", 10)
+    outcome, loan = database.return_book_transaction("710002", book_id, datetime.now(), 7, 0.5, 1.0, 15.0)
+    assert outcome == database.RETURN_OK
+    assert loan["days_overdue"] == 10 and loan["fee_amount"] == 6.5
+    assert loan["due_date"].date() == (datetime.now() - timedelta(days=10)).date()
+
+    # The fee no longer grows, and the ledger keeps it payable once
+    database.accrue_late_fees(datetime.now() + timedelta(days=5), 7, 0.5, 1.0, 15.0)
+    assert ls.calculate_late_fee_for_book("710002", book_id) == {
+        "fee_amount": 6.5, "days_overdue": 10, "status": "OK"}
+    recent_payments.clear()
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.return_value = (True, "txn_return_2")
+    assert ls.pay_late_fees("710002", book_id, gateway)[0]
+    recent_payments.clear()
+    assert ls.pay_late_fees("710002", book_id, gateway)[0]
+    gateway.process_payment.assert_called_once()
+    assert database.get_open_loan_payments("710002", book_id)["paid"] == 6.5
+
+
+def test_service_message_includes_late_fee():
+    book_id = _borrowed("710003", "9210000000003", 3)
+    ok, msg = ls.return_book_by_patron("710003", book_id)
+    assert ok and msg.endswith("Returned 3 day(s) late. Late fee: $1.50.")
+
+
+def test_concurrent_returns_close_one_loan_once():
+    book_id = _borrowed("710004", "9210000000004", 0, copies=3)
+    results = []
+    barrier = threading.Barrier(4)
+
+    def give_back():
+        barrier.wait()
+        results.append(ls.return_book_by_patron("710004", book_id)[0])
+
+    threads = [threading.Thread(target=give_back) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(True) == 1
+    assert database.get_book_by_id(book_id)["available_copies"] == 3
+
+
+def test_invalid_patron_rejected():
+    ok, msg = ls.return_book_by_patron("12ab", 1)
+    assert not ok and "Invalid patron ID" in msg
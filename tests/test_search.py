@@ -0,0 +1,57 @@
+# tests/test_search.py
+import database
+from app import create_app
+from services.library_service import search_books_in_catalog
+
+
+def test_fts_prefix_and_multiword_title():
+    assert database.insert_book("Search Engines In Practice", "Ada Quill", "9100000000001", 1, 1)
+    results = search_books_in_catalog("sear ENGINE", "title")
+    assert [r["isbn"] for r in results] == ["9100000000001"]
+
+
+def test_fts_follows_title_updates():
+    assert database.insert_book("Oldname Atlas", "Ben Rook", "9100000000002", 1, 1)
+    book = database.get_book_by_isbn("9100000000002")
+    conn = database.get_db_connection()
+    conn.execute("UPDATE books SET title = 'Newname Atlas' WHERE id = ?", (book["id"],))
+    conn.commit()
+    conn.close()
+    assert search_books_in_catalog("oldname", "title") == []
+    assert search_books_in_catalog("newname", "title")[0]["id"] == book["id"]
+
+
+def test_search_limit_offset():
+    for i in range(3):
+        assert database.insert_book(f"Pagination Volume {i}", "Cy Ledger", f"91000000001{i:02d}", 1, 1)
+    first = search_books_in_catalog("pagination", "title", limit=2)
+    rest = search_books_in_catalog("pagination", "title", limit=2, offset=2)
+    assert len(first) == 2 and len(rest) == 1
+    assert {r["id"] for r in first}.isdisjoint({r["id"] for r in rest})
+
+
+def test_search_rejects_unknown_type_and_punctuation_only():
+    assert search_books_in_catalog("anything", "publisher") == []
+    assert search_books_in_catalog('"*()', "title") == []
+
+
+def test_api_search_returns_results():
+    client = create_app().test_client()
+    data = client.get("/api/search?q=gatsby&type=title").get_json()
+    assert data["count"] == 1
+    assert data["results"][0]["isbn"] == "9780743273565"
+
+
+def test_broad_terms_are_ranked_among_a_bounded_set_of_matches(monkeypatch):
+    monkeypatch.setattr(database, "SEARCH_RANK_CANDIDATES", 3)
+    # Five matches; the best one (shortest title) comes after the first three
+    for i in range(4):
+        assert database.insert_book(f"Broadterm Chronicle Volume Number {i}", "Di Stack",
+                                    f"91000000002{i:02d}", 1, 1)
+    assert database.insert_book("Broadterm", "Di Stack", "9100000000299", 1, 1)
+
+    ranked = search_books_in_catalog("broadterm", "title", limit=2)
+    assert "9100000000299" not in [r["isbn"] for r in ranked]
+    # A page past the candidate bound widens it to cover the page
+    everything = search_books_in_catalog("broadterm", "title", limit=5)
+    assert everything[0]["isbn"] == "9100000000299" and len(everything) == 5
@@ -11,27 +11,26 @@ def test_borrow_invalid_patron_id(monkeypatch):
     assert not ok and "Invalid patron ID" in msg
 
 def test_borrow_book_not_found(monkeypatch):
-    monkeypatch.setattr(ls, "get_book_by_id", lambda _id: None)
+    monkeypatch.setattr(ls, "borrow_book_transaction", lambda *a: (ls.BORROW_BOOK_NOT_FOUND, None))
     ok, msg = ls.borrow_book_by_patron("123456", 99)
     assert not ok and "Book not found" in msg
 
 def test_borrow_no_copies(monkeypatch):
-    monkeypatch.setattr(ls, "get_book_by_id", lambda _id: {"id": 1, "title": "X", "available_copies": 0})
+    monkeypatch.setattr(ls, "borrow_book_transaction",
+                        lambda *a: (ls.BORROW_UNAVAILABLE, {"id": 1, "title": "X", "available_copies": 0}))
     ok, msg = ls.borrow_book_by_patron("123456", 1)
     assert not ok and "not available" in msg
 
 def test_borrow_limit_reached(monkeypatch):
-    monkeypatch.setattr(ls, "get_book_by_id", lambda _id: {"id": 1, "title": "X", "available_copies": 2})
-    monkeypatch.setattr(ls, "get_patron_borrow_count", lambda pid: 5)
+    monkeypatch.setattr(ls, "borrow_book_transaction",
+                        lambda *a: (ls.BORROW_LIMIT_REACHED, {"id": 1, "title": "X", "available_copies": 2}))
     ok, msg = ls.borrow_book_by_patron("123456", 1)
     assert not ok and "maximum borrowing limit" in msg
 
 def test_borrow_happy_path(monkeypatch):
     # make everything succeed
-    monkeypatch.setattr(ls, "get_book_by_id", lambda _id: {"id": 1, "title": "X", "available_copies": 2})
-    monkeypatch.setattr(ls, "get_patron_borrow_count", lambda pid: 0)
-    monkeypatch.setattr(ls, "insert_borrow_record", lambda *a, **k: True)
-    monkeypatch.setattr(ls, "update_book_availability", lambda *a, **k: True)
+    monkeypatch.setattr(ls, "borrow_book_transaction",
+                        lambda *a: (ls.BORROW_OK, {"id": 1, "title": "X", "available_copies": 1}))
     ok, msg = ls.borrow_book_by_patron("123456", 1)
     assert ok and "Successfully borrowed" in msg and "Due date:" in msg
 
@@ -0,0 +1,80 @@
+# tests/test_slow_query_log.py
+import json
+import pytest
+import database
+import slow_query_log
+from app import create_app
+from slow_query_log import normalize_sql, slow_log, summarize
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = str(tmp_path / "slow.jsonl")
+    slow_log.configure(path, threshold_ms=0)
+    yield path
+    slow_log.configure(None)
+
+
+def _entries(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_normalize_sql_strips_literals():
+    sql = "SELECT *  FROM books\n WHERE isbn = '978''0' AND id > 42 AND title = ?"
+    assert normalize_sql(sql) == "SELECT * FROM books WHERE isbn = ? AND id > ? AND title = ?"
+    assert normalize_sql("SELECT * FROM books_fts5 WHERE id = 7") == "SELECT * FROM books_fts5 WHERE id = ?"
+
+
+def test_slow_statement_logged_with_plan_and_callers(log_path):
+    app = create_app()
+    app.config["SLOW_QUERY_LOG"] = log_path
+    slow_query_log.init_app(app)
+    slow_log.threshold = 0
+    assert app.test_client().get("/api/late_fee/123456/3").status_code == 200
+    database.get_patron_borrow_count("123456")
+
+    entries = _entries(log_path)
+    fee = [e for e in entries if e["caller"]["helper"] == "get_patron_borrowed_books"]
+    assert fee and fee[0]["caller"]["route"] == "GET /api/late_fee/<patron_id>/<int:book_id>"
+    assert fee[0]["caller"]["service"] == "library_service.calculate_late_fee_for_book"
+    assert fee[0]["params"] == {"patron_id": "str", "now": "int"}
+
+    count = [e for e in entries if e["caller"]["helper"] == "get_patron_borrow_count"]
+    assert count[0]["params"] == ["str"] and count[0]["caller"]["route"] is None
+    assert any("idx_borrow_open_patron_date" in step for step in count[0]["plan"])
+    # The plan is only captured the first time a fingerprint is seen
+    database.get_patron_borrow_count("123456")
+    again = [e for e in _entries(log_path) if e["fingerprint"] == count[0]["fingerprint"]]
+    assert len(again) == 2 and "plan" not in again[1]
+
+
+def test_fast_statements_not_logged(log_path):
+    slow_log.threshold = 10.0
+    database.get_patron_borrow_count("123456")
+    assert _entries(log_path) == []
+
+
+def test_summary_groups_by_fingerprint():
+    entries = [{"fingerprint": "a", "sql": "SELECT ?", "duration_ms": ms,
+                "caller": {"helper": "h", "service": None, "route": None}} for ms in range(1, 101)]
+    entries.append({"fingerprint": "b", "sql": "UPDATE", "duration_ms": 1.0, "caller": {},
+                    "plan": ["SCAN books"]})
+    summary = summarize(entries)
+    assert [row["fingerprint"] for row in summary] == ["a", "b"]
+    assert summary[0]["count"] == 100 and summary[0]["total_ms"] == 5050
+    assert summary[0]["p99_ms"] == 99 and summary[0]["max_ms"] == 100
+    assert summary[0]["callers"] == ["h"] and summary[1]["plan"] == ["SCAN books"]
+
+
+def test_slow_queries_command_reads_rotated_files(tmp_path):
+    path = tmp_path / "slow.jsonl"
+    line = {"fingerprint": "abc", "sql": "SELECT 1", "duration_ms": 5.0, "caller": {}}
+    path.write_text(json.dumps(line) + "\n")
+    (tmp_path / "slow.jsonl.1").write_text(json.dumps(line) + "\nnot json\n")
+    runner = create_app().test_cli_runner()
+    result = runner.invoke(args=["slow-queries", str(path)])
+    assert result.exit_code == 0, result.output
+    assert "abc  count=2  total=10.0ms" in result.output
+    result = runner.invoke(args=["slow-queries", str(path), "--json"])
+    assert json.loads(result.output)[0]["count"] == 2
@@ -0,0 +1,131 @@
+# tests/test_synthetic_data.py
+from datetime import datetime
+import pytest
+import database
+from app import create_app
+from services import synthetic_data
+from services.synthetic_data import generate_dataset, isbn13_check_digit
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+def _generate(tmp_path, monkeypatch, name, **options):
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / name))
+    database.init_database()
+    summary = generate_dataset(now=NOW, **options)
+    conn = database.get_db_connection()
+    books = [tuple(row) for row in conn.execute(
+        "SELECT id, title, author, isbn, total_copies, available_copies FROM books ORDER BY id")]
+    loans = [tuple(row) for row in conn.execute(
+        "SELECT patron_id, book_id, borrow_date, due_date, return_date FROM borrow_records ORDER BY id")]
+    conn.close()
+    return summary, books, loans
+
+
+def test_same_seed_gives_identical_rows(tmp_path, monkeypatch):
+    options = dict(books=500, patrons=50, loans=2000, seed=7)
+    _, books, loans = _generate(tmp_path, monkeypatch, "a.db", **options)
+    _, again_books, again_loans = _generate(tmp_path, monkeypatch, "b.db", **options)
+    assert books == again_books and loans == again_loans
+    _, other_books, _ = _generate(tmp_path, monkeypatch, "c.db", **dict(options, seed=8))
+    assert other_books != books
+
+
+def test_second_load_keeps_patrons_within_the_borrowing_limit(tmp_path, monkeypatch):
+    options = dict(books=50, patrons=4, loans=20, open_loans=20)
+    _generate(tmp_path, monkeypatch, "limit.db", **options)
+    second = generate_dataset(now=NOW, seed=43, **options)
+    assert second["open_loans"] == 0
+    conn = database.get_db_connection()
+    most = conn.execute("SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM borrow_records "
+                        "WHERE return_date IS NULL GROUP BY patron_id)").fetchone()[0]
+    conn.close()
+    assert most == 5
+
+
+def test_dataset_respects_schema_rules(tmp_path, monkeypatch):
+    summary, books, loans = _generate(tmp_path, monkeypatch, "rules.db", books=400, patrons=40,
+                                      loans=3000, open_loans=100, overdue_ratio=0.3)
+    assert summary["loans"] == len(loans) == 3000
+    isbns = [book[3] for book in books]
+    assert len(set(isbns)) == len(isbns)
+    assert all(len(isbn) == 13 and isbn[-1] == isbn13_check_digit(isbn[:12]) for isbn in isbns)
+
+    open_by_book, open_by_patron = {}, {}
+    for patron, book_id, borrowed, due, returned in loans:
+        assert len(patron) == 6 and patron.isdigit()
+        assert borrowed < due and (returned is None or returned > borrowed)
+        if returned is None:
+            open_by_book[book_id] = open_by_book.get(book_id, 0) + 1
+            open_by_patron[patron] = open_by_patron.get(patron, 0) + 1
+    assert sum(open_by_book.values()) == summary["open_loans"]
+    assert max(open_by_patron.values()) <= 5
+    for book_id, _, _, _, total, available in books:
+        assert available == total - open_by_book.get(book_id, 0) >= 0
+
+    overdue = sum(1 for loan in loans if loan[4] is None and loan[3] < database.to_epoch(NOW))
+    assert overdue == summary["overdue_loans"] > 0
+    # Popularity skew: the busiest tenth of the books carries most of the history
+    counts = sorted((sum(1 for loan in loans if loan[1] == book[0]) for book in books), reverse=True)
+    assert sum(counts[:40]) > sum(counts) / 2
+
+
+def test_triggers_and_derived_tables_after_load(tmp_path, monkeypatch):
+    summary, _, loans = _generate(tmp_path, monkeypatch, "derived.db", books=300, patrons=30, loans=900)
+    conn = database.get_db_connection()
+    triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    opened = conn.execute("SELECT SUM(open_loans), SUM(total_loans) FROM patron_summary").fetchone()
+    fts = conn.execute("SELECT COUNT(*) FROM books_fts").fetchone()[0]
+    conn.close()
+    assert {"books_fts_ai", "books_touch_ai", "books_version_ai", "patron_summary_borrow"} <= triggers
+    assert tuple(opened) == (summary["open_loans"], 900)
+    assert fts == 300
+    assert database.verify_hot_queries_use_indexes() == []
+    assert database.insert_book("After Load", "Author", "9780000000999", 1, 1)
+    assert database.search_books("After Load", "title", 5, 0)
+
+
+def test_invalid_options_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "bad.db"))
+    database.init_database()
+    with pytest.raises(ValueError):
+        generate_dataset(books=10, patrons=0)
+    with pytest.raises(ValueError):
+        generate_dataset(books=10, patrons=10, overdue_ratio=2)
+
+
+def test_generate_data_command(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "cli.db"))
+    result = create_app().test_cli_runner().invoke(
+        args=["generate-data", "--books", "50", "--patrons", "10", "--loans", "100", "--seed", "3"])
+    assert result.exit_code == 0, result.output
+    assert "Generated 50 books and 100 loans" in result.output
+    assert len(database.get_all_books()) == 50  # sample data is opt-in
+
+
+def test_second_load_with_same_seed_gets_new_isbns(tmp_path, monkeypatch):
+    _generate(tmp_path, monkeypatch, "twice.db", books=100, patrons=10, loans=200, seed=5)
+    generate_dataset(books=100, patrons=10, loans=200, seed=5, now=NOW)
+    assert len(database.get_all_books()) == 200
+
+
+def test_generate_data_command_reports_isbn_clash(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "clash.db"))
+    monkeypatch.setattr(synthetic_data, "_isbn", lambda index, offset: "9798000000001")
+    result = create_app().test_cli_runner().invoke(
+        args=["generate-data", "--books", "10", "--patrons", "5", "--loans", "0"])
+    assert result.exit_code == 1
+    assert "clash with existing data" in result.output
+    assert database.get_all_books() == []
+
+
+def test_bulk_loaded_summary_counts_returns_as_activity(tmp_path, monkeypatch):
+    _, _, loans = _generate(tmp_path, monkeypatch, "activity.db", books=100, patrons=10, loans=500)
+    conn = database.get_db_connection()
+    backfilled = conn.execute("""
+        SELECT patron_id, MAX(MAX(borrow_date), COALESCE(MAX(return_date), 0))
+        FROM borrow_records GROUP BY patron_id""").fetchall()
+    conn.close()
+    for patron_id, last_activity in backfilled:
+        assert database.get_patron_summary(patron_id)["last_activity"] == \
+            database.epoch_to_iso(last_activity)
@@ -0,0 +1,58 @@
+# tests/test_timestamp_storage.py
+import sqlite3
+from datetime import datetime, timedelta
+import database
+
+
+def test_epoch_round_trip_keeps_local_calendar_day():
+    moment = datetime(2024, 3, 10, 23, 59, 30)
+    seconds = database.to_epoch(moment)
+    assert isinstance(seconds, int)
+    assert database.from_epoch(seconds) == moment
+    assert seconds // database.SECONDS_PER_DAY == (moment.date() - datetime(1970, 1, 1).date()).days
+    assert database.epoch_to_iso(None) is None
+
+
+def test_borrow_dates_stored_as_integers():
+    assert database.insert_book("Epoch Book", "Epoch Author", "9840000000001", 1, 1)
+    book_id = database.get_book_by_isbn("9840000000001")["id"]
+    due = datetime.now().replace(microsecond=0) + timedelta(days=3)
+    assert database.insert_borrow_record("840001", book_id, due - timedelta(days=14), due)
+
+    conn = database.get_db_connection()
+    row = conn.execute("SELECT typeof(borrow_date), typeof(due_date) FROM borrow_records "
+                       "WHERE patron_id = '840001'").fetchone()
+    conn.close()
+    assert tuple(row) == ("integer", "integer")
+
+    loan = database.get_patron_borrowed_books("840001")[0]
+    assert loan["due_date"] == due and not loan["is_overdue"]
+    history = database.get_patron_history("840001")
+    assert history[0]["due_date"] == due.isoformat()
+
+
+def test_text_dates_migrated_on_init(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.db")
+    old = sqlite3.connect(path)
+    old.execute("CREATE TABLE books (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+                "author TEXT NOT NULL, isbn TEXT UNIQUE NOT NULL, total_copies INTEGER NOT NULL, "
+                "available_copies INTEGER NOT NULL)")
+    old.execute("CREATE TABLE borrow_records (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "patron_id TEXT NOT NULL, book_id INTEGER NOT NULL, borrow_date TEXT NOT NULL, "
+                "due_date TEXT NOT NULL, return_date TEXT)")
+    old.execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) "
+                "VALUES ('Old', 'A', '9840000000002', 2, 1)")
+    old.execute("INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date) "
+                "VALUES ('840002', 1, '2024-01-01T10:30:00.123456', '2024-01-15T10:30:00.123456')")
+    old.commit()
+    old.close()
+
+    monkeypatch.setattr(database, "DATABASE", path)
+    database.init_database()
+    loan = database.get_patron_borrowed_books("840002")[0]
+    assert loan["due_date"] == datetime(2024, 1, 15, 10, 30)
+    assert loan["is_overdue"]
+    summary = database.get_patron_summary("840002")
+    assert summary["open_loans"] == 1
+    assert summary["last_activity"] == "2024-01-01T10:30:00"
+    assert database.verify_hot_queries_use_indexes() == []
@@ -0,0 +1,83 @@
+# tests/test_write_queue.py
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import pytest
+import database
+from write_queue import WriteQueue
+
+
+@pytest.fixture
+def queued_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "queued.db"))
+    monkeypatch.setattr(database, "WRITE_QUEUE_ENABLED", True)
+    monkeypatch.setattr(database, "WRITE_QUEUE_WINDOW", 0.01)
+    database.init_database()
+    yield database.get_write_queue()
+    database.get_write_queue().close()
+
+
+def test_concurrent_writes_share_commits(queued_db):
+    assert database.insert_book("Queued", "Writer", "9230000000001", 40, 40)
+    book_id = database.get_book_by_isbn("9230000000001")["id"]
+    before = queued_db.transactions
+    barrier = threading.Barrier(20)
+    results = []
+
+    def borrow(i):
+        barrier.wait()
+        now = datetime.now()
+        results.append(database.insert_borrow_record(f"{730000 + i}", book_id, now, now + timedelta(days=14)))
+        results.append(database.update_book_availability(book_id, -1))
+
+    threads = [threading.Thread(target=borrow, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [True] * 40
+    assert database.get_book_by_id(book_id)["available_copies"] == 20
+    assert queued_db.transactions - before < 40
+
+
+def test_failed_operation_rolls_back_alone(tmp_path):
+    path = str(tmp_path / "isolated.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (name TEXT UNIQUE)")
+    conn.commit()
+    conn.close()
+    writer = WriteQueue(path, lambda p: sqlite3.connect(p, check_same_thread=False), window=0.05)
+
+    def insert(name):
+        return lambda c: c.execute("INSERT INTO items VALUES (?)", (name,)).rowcount
+
+    def insert_twice(c):
+        c.execute("INSERT INTO items VALUES ('partial')")
+        c.execute("INSERT INTO items VALUES ('a')")  # duplicate of the first write
+
+    futures = [writer.submit(insert("a")), writer.submit(insert_twice), writer.submit(insert("b"))]
+    assert futures[0].result() == 1 and futures[2].result() == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result()
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit(insert("c"))
+
+    conn = sqlite3.connect(path)
+    assert [row[0] for row in conn.execute("SELECT name FROM items ORDER BY name")] == ["a", "b"]
+    conn.close()
+    assert writer.transactions == 1 and writer.operations == 3
+
+
+def test_service_paths_run_through_queue(queued_db):
+    from services.library_service import borrow_book_by_patron, return_book_by_patron
+    assert database.insert_book("Queued Service", "Writer", "9230000000002", 1, 1)
+    book_id = database.get_book_by_isbn("9230000000002")["id"]
+    before = queued_db.operations
+    assert borrow_book_by_patron("730100", book_id)[0]
+    assert not borrow_book_by_patron("730101", book_id)[0]
+    assert return_book_by_patron("730100", book_id)[0]
+    assert queued_db.operations - before == 3
+    assert database.get_book_by_id(book_id)["available_copies"] == 1
+
@@ -0,0 +1,139 @@
+"""
+Write queue module for Library Management System
+Serializes database writes through one writer thread that commits the writes
+arriving within a short window in a single transaction (group commit)
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+# Seconds to wait for more writes after the first one. At 0 a transaction
+# takes whatever queued up while the previous one was committing, which with
+# synchronous=NORMAL beats waiting; raise it when commits are fsync-bound.
+GROUP_COMMIT_WINDOW = 0.0
+GROUP_COMMIT_MAX_BATCH = 64
+
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    A dedicated writer thread that owns one connection.
+
+    Request threads submit write operations, callables taking the connection
+    and returning a result. The writer runs every operation that arrives
+    within `window` seconds of the first (up to `max_batch`) in one BEGIN
+    IMMEDIATE transaction, each inside its own savepoint, and commits once.
+    An operation that raises is rolled back alone; the others still commit.
+    Each caller's future resolves only after the commit, so a result is
+    never reported for a write that was not made durable.
+    """
+
+    def __init__(self, database: str, connect: Callable[[str], sqlite3.Connection],
+                 window: float = GROUP_COMMIT_WINDOW, max_batch: int = GROUP_COMMIT_MAX_BATCH):
+        self.database = database
+        self.connect = connect
+        self.window = window
+        self.max_batch = max_batch
+        self.transactions = 0
+        self.operations = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def submit(self, operation: Callable[[sqlite3.Connection], object]) -> Future:
+        """Queue operation(conn) and return a future for its result."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('write queue is closed')
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='library-db-writer', daemon=True)
+                self._thread.start()
+            self._queue.put((operation, future))
+        return future
+
+    def run(self, operation: Callable[[sqlite3.Connection], object]):
+        """Run operation(conn) on the writer thread and return its result once committed."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError('write operations cannot be queued from the writer thread')
+        return self.submit(operation).result()
+
+    def close(self):
+        """Finish the queued writes and stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            self._queue.put(_STOP)
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        conn = self.connect(self.database)
+        try:
+            while True:
+                batch, stop = self._collect(self._queue.get())
+                if batch:
+                    self._commit(conn, batch)
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _collect(self, first) -> Tuple[List, bool]:
+        """Gather the writes arriving within the window after the first one."""
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _commit(self, conn: sqlite3.Connection, batch: List):
+        outcomes: List[Optional[Tuple[bool, object]]] = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for operation, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    outcomes.append(None)
+                    continue
+                conn.execute('SAVEPOINT write_op')
+                try:
+                    outcomes.append((True, operation(conn)))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO write_op')
+                    outcomes.append((False, e))
+                conn.execute('RELEASE write_op')
+            conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.transactions += 1
+        for (_, future), outcome in zip(batch, outcomes):
+            if outcome is None:
+                continue
+            self.operations += 1
+            ok, value = outcome
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)